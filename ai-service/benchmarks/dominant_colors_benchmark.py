@@ -0,0 +1,88 @@
+"""
+Dominant color benchmark: latency and accuracy of the sampled modes
+against the exhaustive KMeans path.
+
+Usage (from ai-service/):
+    python benchmarks/dominant_colors_benchmark.py [image ...]
+
+Without arguments a set of synthetic photos is generated. Accuracy is
+reported as the mean distance from each exhaustive center to the nearest
+center of the mode (RGB units), and as the ratio of mean per-pixel
+quantization error against the exhaustive result (1.0 = as good).
+"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.color_analysis import dominant_colors, sample_pixels  # noqa: E402
+
+K = 5
+PIXEL_BUDGET = 65536
+
+
+def synthetic_images():
+    """Smooth color fields with a few dominant regions and sensor noise"""
+    rng = np.random.default_rng(7)
+    for width, height in [(640, 480), (1600, 1200), (3000, 2000)]:
+        palette = rng.integers(0, 256, size=(6, 3))
+        labels = cv2.resize(rng.integers(0, 6, size=(6, 8)).astype(np.uint8), (width, height),
+                            interpolation=cv2.INTER_NEAREST)
+        image = palette[labels].astype(np.float32)
+        image = cv2.GaussianBlur(image, (0, 0), 5) + rng.normal(0, 8, image.shape)
+        yield f"synthetic {width}x{height}", np.clip(image, 0, 255).astype(np.uint8)
+
+
+def quantization_error(pixels, centers):
+    centers = np.asarray(centers, dtype=np.float32)
+    distances = np.linalg.norm(pixels[:, None, :].astype(np.float32) - centers[None, :, :], axis=2)
+    return float(distances.min(axis=1).mean())
+
+
+def center_distance(reference, centers):
+    reference = np.asarray(reference, dtype=np.float32)
+    centers = np.asarray(centers, dtype=np.float32)
+    distances = np.linalg.norm(reference[:, None, :] - centers[None, :, :], axis=2)
+    return float(distances.min(axis=1).mean())
+
+
+def run(name, image):
+    all_pixels = sample_pixels(image, None)
+    error_pixels = sample_pixels(image, 200000)
+    results = {}
+    for mode in ("kmeans", "minibatch", "histogram"):
+        pixels = all_pixels if mode == "kmeans" else sample_pixels(image, PIXEL_BUDGET)
+        start = time.perf_counter()
+        centers = dominant_colors(pixels, K, mode)
+        results[mode] = (time.perf_counter() - start, centers)
+
+    reference_time, reference = results["kmeans"]
+    reference_error = quantization_error(error_pixels, reference)
+    print(f"\n{name} ({image.shape[1]}x{image.shape[0]}, {len(all_pixels):,} px)")
+    print(f"  {'mode':<10} {'latency':>10} {'speedup':>8} {'center dist':>12} {'error ratio':>12}")
+    for mode, (elapsed, centers) in results.items():
+        print(
+            f"  {mode:<10} {elapsed * 1000:>8.1f}ms {reference_time / elapsed:>7.1f}x "
+            f"{center_distance(reference, centers):>12.1f} "
+            f"{quantization_error(error_pixels, centers) / reference_error:>12.3f}"
+        )
+
+
+def main():
+    if len(sys.argv) > 1:
+        images = ((path, cv2.imread(path)) for path in sys.argv[1:])
+    else:
+        images = synthetic_images()
+    for name, image in images:
+        if image is None:
+            print(f"\n{name}: could not be read")
+            continue
+        run(name, image)
+
+
+if __name__ == "__main__":
+    main()
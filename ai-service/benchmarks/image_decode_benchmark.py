@@ -0,0 +1,144 @@
+"""
+Image decode benchmark: latency and peak memory of the cv2.imdecode
+decoder against the PIL path it replaced.
+
+Usage (from ai-service/):
+    python benchmarks/image_decode_benchmark.py [image ...]
+
+Without arguments a 12 MP photo (JPEG), an A4 scan at 300 DPI (PNG) and
+a transparent 12 MP PNG are generated. Every decode runs in a fresh
+process; peak memory is the growth of the process's peak RSS during the
+decode (Linux resets the peak through /proc/self/clear_refs, elsewhere
+the lifetime peak is used and small decodes may read 0).
+"""
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_decoder import analysis_size, decode_gray, decode_image  # noqa: E402
+
+ANALYSIS_MAX_PIXELS = 4_000_000
+REPEATS = 3
+
+
+def legacy_ocr(content):
+    """bytes -> PIL -> RGB array -> BGR -> gray, as OCR did before"""
+    image = np.array(Image.open(io.BytesIO(content)).convert("RGB"))
+    return cv2.cvtColor(cv2.cvtColor(image, cv2.COLOR_RGB2BGR), cv2.COLOR_BGR2GRAY)
+
+
+def legacy_analysis(content):
+    """PIL draft decode, RGB conversion and BGR copy, as image analysis did before"""
+    source = Image.open(io.BytesIO(content))
+    width, height = source.size
+    target = analysis_size(width, height, ANALYSIS_MAX_PIXELS)
+    if target != (width, height):
+        for denominator in (2, 4, 8):
+            size = (-(-width // denominator), -(-height // denominator))
+            if size[0] * size[1] <= ANALYSIS_MAX_PIXELS:
+                break
+        source.draft("RGB", size)
+    rgb = np.asarray(source if source.mode == "RGB" else source.convert("RGB"))
+    if rgb.shape[0] * rgb.shape[1] > target[0] * target[1]:
+        rgb = cv2.resize(rgb, target, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+
+DECODERS = {
+    "ocr: pil": legacy_ocr,
+    "ocr: decode_gray": decode_gray,
+    "analysis: pil": legacy_analysis,
+    "analysis: decode_image": lambda content: decode_image(content, analysis_max_pixels=ANALYSIS_MAX_PIXELS).bgr,
+}
+
+
+def reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(decoder_name, path):
+    """Decode once in this (fresh) process: (seconds, peak RSS growth in bytes, output shape)"""
+    with open(path, "rb") as f:
+        content = f.read()
+    decoder = DECODERS[decoder_name]
+    reset_peak_rss()
+    baseline = peak_rss_bytes()
+    start = time.perf_counter()
+    pixels = decoder(content)
+    elapsed = time.perf_counter() - start
+    return elapsed, max(0, peak_rss_bytes() - baseline), pixels.shape
+
+
+def synthetic_images(directory):
+    rng = np.random.default_rng(7)
+    width, height = 4000, 3000
+    photo = cv2.resize(rng.integers(0, 256, (60, 80, 3), dtype=np.uint8), (width, height), interpolation=cv2.INTER_CUBIC)
+    photo = np.clip(photo + rng.normal(0, 6, photo.shape), 0, 255).astype(np.uint8)
+    scan = np.full((3508, 2480), 245, np.uint8)
+    for row in range(200, 3300, 60):
+        scan[row:row + 25, 200:2200] = rng.integers(0, 60, (25, 2000), dtype=np.uint8)
+    alpha = np.zeros((height, width), np.uint8)
+    alpha[500:2500, 500:3500] = 255
+
+    for name, image, ext, params in [
+        ("photo 4000x3000", photo, ".jpg", [cv2.IMWRITE_JPEG_QUALITY, 90]),
+        ("a4 scan 2480x3508", scan, ".png", []),
+        ("transparent 4000x3000", np.dstack([photo, alpha]), ".png", []),
+    ]:
+        path = os.path.join(directory, name.split()[0] + ext)
+        cv2.imwrite(path, image, params)
+        yield name, path
+
+
+def run(pool, name, path):
+    print(f"\n{name} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+    print(f"  {'decoder':<24} {'latency':>10} {'peak mem':>10} {'output':>16}")
+    for decoder_name in DECODERS:
+        samples = [pool.apply(measure, (decoder_name, path)) for _ in range(REPEATS)]
+        elapsed = min(sample[0] for sample in samples)
+        peak = min(sample[1] for sample in samples)
+        shape = "x".join(str(n) for n in samples[0][2])
+        print(f"  {decoder_name:<24} {elapsed * 1000:>8.1f}ms {peak / 1024 / 1024:>8.1f}MB {shape:>16}")
+
+
+def main():
+    # maxtasksperchild=1: every measurement starts from a fresh process
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory, context.Pool(1, maxtasksperchild=1) as pool:
+        if len(sys.argv) > 1:
+            images = ((path, path) for path in sys.argv[1:])
+        else:
+            images = synthetic_images(directory)
+        for name, path in images:
+            run(pool, name, path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+PDF rasterization DPI benchmark: OCR accuracy, latency and page size of
+fixed-DPI rendering against the adaptive x-height probe.
+
+Usage (from ai-service/):
+    python benchmarks/pdf_dpi_benchmark.py [--font FONT.ttf] [--target-x-height PX] [document.pdf ...]
+
+Without PDFs, US-letter pages of invoice-like text at 7 to 14 pt are
+drawn with the given TrueType font at each resolution, the way Poppler
+rasterizes vector text, and accuracy is the character similarity to the
+known text. With PDFs (needs Poppler), pages are rendered with pdf2image
+and accuracy is measured against the 300 DPI reading. Render time
+includes the probe and the x-height estimate (synthetic pages are drawn
+by PIL, slower than Poppler); OCR time is the best of 3 runs on loaded
+tesserocr engines when available, else pytesseract.
+"""
+import argparse
+import difflib
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pdf_dpi import PageDPIPlanner, estimate_x_height  # noqa: E402
+from utils.tesseract import TesseractPool, parse_tesseract_data  # noqa: E402
+
+PAGE_INCHES = (8.5, 11)
+MARGIN_INCHES = 0.75
+FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+)
+WORDS = (
+    "patient provider invoice total amount due date service claim policy member "
+    "deductible copay balance charges payment account number procedure diagnosis "
+    "hospital pharmacy office visit laboratory radiology consultation insurance "
+    "statement period reference vehicle repair parts labor estimate"
+).split()
+# (name, [(point size, lines), ...])
+PAGES = [
+    ("large print 14pt", [(14, 30)]),
+    ("typed bill 11pt", [(11, 40)]),
+    ("statement 9pt", [(9, 50)]),
+    ("fine print 7pt", [(7, 60)]),
+    ("12pt + 7pt footer", [(12, 25), (7, 12)]),
+]
+FIXED_DPIS = (300, 200, 150)
+REPEATS = 3
+
+
+def text_lines(count, rng):
+    lines = []
+    for _ in range(count):
+        words = rng.sample(WORDS, 6)
+        lines.append(f"{' '.join(words).capitalize()} {rng.randint(1000, 99999)} ${rng.randint(10, 9999)}.{rng.randint(0, 99):02d}")
+    return lines
+
+
+def synthetic_page(blocks, font_path, dpi):
+    """Gray page with the blocks' lines drawn at dpi; also returns the text"""
+    width, height = int(PAGE_INCHES[0] * dpi), int(PAGE_INCHES[1] * dpi)
+    page = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(page)
+    rng = random.Random(7)
+    y = MARGIN_INCHES * dpi
+    truth = []
+    for points, count in blocks:
+        font = ImageFont.truetype(font_path, max(1, round(points * dpi / 72)))
+        for line in text_lines(count, rng):
+            if y + points * 1.4 * dpi / 72 > height - MARGIN_INCHES * dpi:
+                break
+            draw.text((MARGIN_INCHES * dpi, y), line, fill=0, font=font)
+            truth.append(line)
+            y += points * 1.4 * dpi / 72
+        y += points * dpi / 72
+    return np.asarray(page), "\n".join(truth)
+
+
+def similarity(text, reference):
+    return difflib.SequenceMatcher(None, " ".join(text.split()), " ".join(reference.split()), autojunk=False).ratio()
+
+
+class Reader:
+    def __init__(self):
+        self.pool = TesseractPool(workers=1)
+        if not self.pool.start():
+            self.pool = None
+
+    def __call__(self, gray):
+        if self.pool:
+            data = self.pool.recognize(gray, "--psm 6")
+        else:
+            import pytesseract
+            data = pytesseract.image_to_data(Image.fromarray(gray), config="--psm 6", output_type=pytesseract.Output.DICT)
+        return parse_tesseract_data(data)["text"]
+
+
+def adaptive_render(render, planner):
+    """(page, dpi) through the probe, as OCRService renders it"""
+    if not planner.should_probe("general"):
+        return render(planner.dpi), planner.dpi
+    probe = render(planner.probe_dpi)
+    dpi = planner.choose(estimate_x_height(probe), "general")
+    return (probe if dpi == planner.probe_dpi else render(dpi)), dpi
+
+
+def run_page(name, render, reference, read, planner):
+    print(f"\n{name}")
+    print(f"  {'mode':<14} {'dpi':>5} {'megapixels':>11} {'render':>9} {'ocr':>9} {'accuracy':>9}")
+    if reference is None:
+        reference = read(render(300))
+    modes = [(f"fixed {dpi}", lambda dpi=dpi: (render(dpi), dpi)) for dpi in FIXED_DPIS]
+    modes.append(("adaptive", lambda: adaptive_render(render, planner)))
+    for mode, rasterize in modes:
+        start = time.perf_counter()
+        page, dpi = rasterize()
+        rendering = time.perf_counter() - start
+        ocr = float("inf")
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            text = read(page)
+            ocr = min(ocr, time.perf_counter() - start)
+        print(f"  {mode:<14} {dpi:>5} {page.size / 1e6:>11.2f} {rendering * 1000:>7.0f}ms {ocr * 1000:>7.0f}ms {similarity(text, reference):>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--font", default=next((f for f in FONT_CANDIDATES if os.path.isfile(f)), None))
+    parser.add_argument("--target-x-height", type=float, default=10.0)
+    parser.add_argument("--floor", type=int, default=150)
+    args = parser.parse_args()
+
+    planner = PageDPIPlanner(target_x_height=args.target_x_height, floors={"general": args.floor})
+    read = Reader()
+    print(f"OCR: {'tesserocr' if read.pool else 'pytesseract'}, target x-height {args.target_x_height:g}px, floor {args.floor} DPI")
+
+    if args.pdfs:
+        from pdf2image import convert_from_path, pdfinfo_from_path
+        for path in args.pdfs:
+            for number in range(1, int(pdfinfo_from_path(path)["Pages"]) + 1):
+                def render(dpi, path=path, number=number):
+                    pages = convert_from_path(path, dpi=dpi, grayscale=True, first_page=number, last_page=number)
+                    return np.asarray(pages[0])
+                run_page(f"{os.path.basename(path)} page {number}", render, None, read, planner)
+        return
+
+    if not args.font:
+        sys.exit("No TrueType font found, pass --font")
+    for name, blocks in PAGES:
+        reference = synthetic_page(blocks, args.font, 300)[1]
+        run_page(name, lambda dpi, blocks=blocks: synthetic_page(blocks, args.font, dpi)[0], reference, read, planner)
+
+
+if __name__ == "__main__":
+    main()
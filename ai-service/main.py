@@ -18,6 +18,17 @@ from services.ocr_service import OCRService
 from services.fraud_detection_service import FraudDetectionService
 from services.image_analysis_service import ImageAnalysisService
 from services.document_validator import DocumentValidator
+from utils.executor import AnalysisExecutor
+from utils.cache import ResultCache, content_key
+from utils.deadline import Deadline
+from utils.hash_index import PerceptualHashIndex
+from utils.job_queue import JobQueue, JobStore
+from utils.keyword_matcher import VocabularyRegistry
+from utils.ocr_router import OCREngineRouter
+from utils.pdf_dpi import PageDPIPlanner
+from utils.tesseract import TesseractPool
+from utils.image_decoder import ImageTooLargeError
+from utils.uploads import RequestSizeLimitMiddleware, SpooledUpload, UploadTooLargeError, read_upload
 from utils.logger import setup_logger, log_api_request, log_performance, log_error_with_context
 from utils.auth import verify_api_key, check_rate_limit
 from models.analysis_models import *
@@ -33,10 +44,63 @@ AI_SERVICE_CONFIG = {
     "host": "0.0.0.0",
     "port": 8001,
     "max_file_size_mb": 50,
-    "processing_timeout_seconds": 300,
+    "upload_spool_max_mb": 4,    # Uploads above this are spooled to disk and memory-mapped
+    "upload_chunk_kb": 1024,     # Read size while streaming an upload
+    "upload_spool_dir": None,    # Spool location (None: system temp dir)
+    "processing_timeout_seconds": 300,  # Per-request budget; requests may ask for less
     "use_gpu": False,  # CPU ONLY - NO GPU
-    "batch_size": 4,   # Smaller batch for CPU
+    "batch_size": 4,   # Smaller batch for CPU; max EasyOCR pages per detector pass
+    "ocr_batch_window_ms": 10,  # How long a page waits for others to share its EasyOCR batch
     "log_level": "INFO",
+    "process_workers": max(1, (os.cpu_count() or 2) - 1),  # GIL-bound NumPy kernels
+    "thread_workers": min(32, (os.cpu_count() or 1) * 2),  # OpenCV / OCR engines / PDF rasterization
+    "pdf_streaming": True,   # Rasterize and OCR PDF pages lazily
+    "pdf_page_window": 2,    # Max PDF pages held in memory per document
+    "pdf_dpi_mode": "adaptive",  # "fixed" renders every PDF page at pdf_dpi
+    "pdf_dpi": 300,          # Fixed DPI, and the most adaptive mode renders a page at
+    "pdf_probe_dpi": 150,    # First render: measures a page's print size, read as-is when it suffices
+    "pdf_target_x_height_px": 10,  # Lowercase letter height pages are rendered to (Tesseract reads 8px+ cleanly)
+    "pdf_dpi_floors": {      # Lowest DPI per document type ("general" covers the rest); at pdf_dpi, no probe
+        "general": 150,
+        "receipt": 200,        # Thermal prints: faint, small type
+        "prescription": 200,   # Handwriting has no reliable x-height
+        "insurance_card": 300, # Card-sized pages with fine print
+        "photo_id": 300,
+    },
+    "ocr_accept_confidence": 0.5,  # A page read at this confidence skips the other OCR engine
+    "ocr_router_min_samples": 10,  # Runs per engine before a route picks its first engine
+    "ocr_router_explore_every": 20,  # Every Nth page of a route tries the runner-up first
+    "ocr_race": False,       # Run both engines on unreliable routes, keep the first confident one
+    "tesseract_workers": 2,  # Tesseract engines kept loaded (needs tesserocr, else one process per page)
+    "tesseract_lang": "eng",
+    "tessdata_path": None,   # None: TESSDATA_PREFIX or the distribution's tessdata directory
+    "pipeline_version": "2.9.0",  # Bump when analysis output changes; part of every cache key
+    "result_cache_max_mb": 256,
+    "result_cache_path": "temp/result_cache.sqlite3",  # None disables the disk tier
+    "result_cache_disk_max_mb": 2048,
+    "fraud_cache_size": 10000,         # Memoized analyze_text reports
+    "fraud_cache_ttl_seconds": 3600,
+    "fraud_stats_window": 10000,       # Analyses covered by rolling score statistics
+    "fraud_model_dir": "temp/fraud_models",  # Versioned trained model artifacts (None disables training)
+    "fraud_model_weight": 0.2,         # Max score added for statistical outliers
+    "fraud_model_keep_versions": 5,
+    "fraud_model_min_samples": 20,     # Claims required to retrain
+    "vocabulary_path": "config/vocabularies.json",  # Optional keyword additions, hot-reloaded
+    "vocabulary_check_seconds": 5,
+    "dominant_color_mode": "histogram",     # histogram | minibatch | kmeans (exhaustive)
+    "dominant_color_pixel_budget": 65536,   # Pixels sampled for dominant colors
+    "image_max_pixels": 100_000_000,        # Hard limit, checked from the header before decoding
+    "image_analysis_max_pixels": 4_000_000, # Analysis resolution; JPEGs use reduced DCT decoding
+    "image_hash_index_path": "temp/image_hashes.sqlite3",  # Perceptual hashes of every analyzed image
+    "image_hash_max_distance": 6,           # Hamming distance counted as a near-duplicate (max 11)
+    "batch_max_files": 50,    # Documents accepted per /batch/process-documents request
+    "batch_concurrency": 4,   # Documents of one batch processed at the same time
+    "job_store_path": "temp/jobs.sqlite3",  # Durable queue for /jobs; survives restarts
+    "job_workers": 2,                 # Jobs processed at the same time
+    "job_retention_seconds": 86400,   # Finished jobs and results kept this long
+    "job_max_attempts": 3,            # Starts before an interrupted job is given up
+    "job_webhook_timeout_seconds": 10,
+    "job_webhook_allowed_hosts": [],  # Hosts webhooks may target (".example.com" covers subdomains); empty: any public host
 }
 
 # Force CPU usage - no GPU shit
@@ -45,6 +109,11 @@ os.environ["PYTORCH_DISABLE_CUDA"] = "1"  # Disable PyTorch CUDA
 logger.info("🖥️ AI Service configured for CPU-only operation")
 
 # Initialize services
+analysis_executor = None
+result_cache = None
+hash_index = None
+job_queue = None
+vocabularies = None
 ocr_service = None
 fraud_service = None
 image_service = None
@@ -59,27 +128,93 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting GuardChain AI Service (CPU Mode)...")
     
-    global ocr_service, fraud_service, image_service, document_validator
+    global analysis_executor, result_cache, hash_index, job_queue, vocabularies, ocr_service, fraud_service, image_service, document_validator
     
     try:
+        # Worker pools shared by every service for blocking analysis work
+        analysis_executor = AnalysisExecutor(
+            process_workers=AI_SERVICE_CONFIG["process_workers"],
+            thread_workers=AI_SERVICE_CONFIG["thread_workers"],
+        )
+        analysis_executor.start()
+        
+        # Content-addressed cache for document and image results
+        result_cache = ResultCache(
+            max_bytes=AI_SERVICE_CONFIG["result_cache_max_mb"] * 1024 * 1024,
+            disk_path=AI_SERVICE_CONFIG["result_cache_path"],
+            disk_max_bytes=AI_SERVICE_CONFIG["result_cache_disk_max_mb"] * 1024 * 1024,
+        )
+        
+        # Near-duplicate index for images reused across claims
+        hash_index = PerceptualHashIndex(
+            path=AI_SERVICE_CONFIG["image_hash_index_path"],
+            max_distance=AI_SERVICE_CONFIG["image_hash_max_distance"],
+        )
+        
+        # Keyword vocabularies shared by the fraud and validation checks
+        vocabularies = VocabularyRegistry(
+            path=AI_SERVICE_CONFIG["vocabulary_path"],
+            check_interval_seconds=AI_SERVICE_CONFIG["vocabulary_check_seconds"],
+        )
+        
         # Initialize OCR Service (CPU only)
         logger.info("📖 Initializing OCR Service...")
-        ocr_service = OCRService()
+        ocr_service = OCRService(
+            executor=analysis_executor,
+            pdf_streaming=AI_SERVICE_CONFIG["pdf_streaming"],
+            pdf_page_window=AI_SERVICE_CONFIG["pdf_page_window"],
+            router=OCREngineRouter(
+                accept_confidence=AI_SERVICE_CONFIG["ocr_accept_confidence"],
+                min_samples=AI_SERVICE_CONFIG["ocr_router_min_samples"],
+                explore_every=AI_SERVICE_CONFIG["ocr_router_explore_every"],
+                race=AI_SERVICE_CONFIG["ocr_race"],
+            ),
+            tesseract_pool=TesseractPool(
+                workers=AI_SERVICE_CONFIG["tesseract_workers"],
+                lang=AI_SERVICE_CONFIG["tesseract_lang"],
+                tessdata_path=AI_SERVICE_CONFIG["tessdata_path"],
+            ),
+            easyocr_batch_size=AI_SERVICE_CONFIG["batch_size"],
+            easyocr_batch_window_ms=AI_SERVICE_CONFIG["ocr_batch_window_ms"],
+            dpi_planner=PageDPIPlanner(
+                mode=AI_SERVICE_CONFIG["pdf_dpi_mode"],
+                dpi=AI_SERVICE_CONFIG["pdf_dpi"],
+                probe_dpi=AI_SERVICE_CONFIG["pdf_probe_dpi"],
+                target_x_height=AI_SERVICE_CONFIG["pdf_target_x_height_px"],
+                floors=AI_SERVICE_CONFIG["pdf_dpi_floors"],
+            ),
+        )
         await ocr_service.initialize()
         
         # Initialize Fraud Detection Service (CPU only)
         logger.info("🛡️ Initializing Fraud Detection Service...")
-        fraud_service = FraudDetectionService()
+        fraud_service = FraudDetectionService(
+            cache_size=AI_SERVICE_CONFIG["fraud_cache_size"],
+            cache_ttl_seconds=AI_SERVICE_CONFIG["fraud_cache_ttl_seconds"],
+            stats_window=AI_SERVICE_CONFIG["fraud_stats_window"],
+            vocabularies=vocabularies,
+            model_dir=AI_SERVICE_CONFIG["fraud_model_dir"],
+            model_weight=AI_SERVICE_CONFIG["fraud_model_weight"],
+            model_keep_versions=AI_SERVICE_CONFIG["fraud_model_keep_versions"],
+            min_training_samples=AI_SERVICE_CONFIG["fraud_model_min_samples"],
+        )
         await fraud_service.initialize()
         
         # Initialize Image Analysis Service (CPU only)
         logger.info("🖼️ Initializing Image Analysis Service...")
-        image_service = ImageAnalysisService()
+        image_service = ImageAnalysisService(
+            executor=analysis_executor,
+            dominant_color_mode=AI_SERVICE_CONFIG["dominant_color_mode"],
+            dominant_color_pixel_budget=AI_SERVICE_CONFIG["dominant_color_pixel_budget"],
+            max_pixels=AI_SERVICE_CONFIG["image_max_pixels"],
+            analysis_max_pixels=AI_SERVICE_CONFIG["image_analysis_max_pixels"],
+            hash_index=hash_index,
+        )
         await image_service.initialize()
         
         # Initialize Document Validator
         logger.info("📋 Initializing Document Validator...")
-        document_validator = DocumentValidator()
+        document_validator = DocumentValidator(vocabularies=vocabularies)
         
         # Test Google Gemini connection (optional)
         try:
@@ -93,6 +228,20 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"⚠️ Google Gemini not available (optional): {e}")
         
+        # Background jobs for long-running OCR and image analysis
+        job_queue = JobQueue(
+            JobStore(
+                path=AI_SERVICE_CONFIG["job_store_path"],
+                retention_seconds=AI_SERVICE_CONFIG["job_retention_seconds"],
+            ),
+            handlers={"document": run_document_job, "image": run_image_job},
+            workers=AI_SERVICE_CONFIG["job_workers"],
+            max_attempts=AI_SERVICE_CONFIG["job_max_attempts"],
+            webhook_timeout_seconds=AI_SERVICE_CONFIG["job_webhook_timeout_seconds"],
+            webhook_allowed_hosts=AI_SERVICE_CONFIG["job_webhook_allowed_hosts"],
+        )
+        await job_queue.start()
+        
         logger.info("✅ AI Service initialized successfully (CPU Mode)!")
         
     except Exception as e:
@@ -103,6 +252,17 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Shutting down AI Service...")
+    if job_queue:
+        await job_queue.stop()
+        job_queue.store.close()
+    if analysis_executor:
+        analysis_executor.shutdown()
+    if ocr_service and ocr_service.tesseract_pool:
+        ocr_service.tesseract_pool.close()
+    if result_cache:
+        result_cache.close()
+    if hash_index is not None:
+        hash_index.close()
 
 # Create FastAPI app with lifespan
 app = FastAPI(
@@ -114,6 +274,17 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Oversized bodies are refused before the multipart parser spools them
+# (added before CORS so CORS stays outermost and also covers the 413)
+MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+max_upload_bytes = AI_SERVICE_CONFIG["max_file_size_mb"] * 1024 * 1024
+max_batch_bytes = AI_SERVICE_CONFIG["batch_max_files"] * max_upload_bytes + MULTIPART_OVERHEAD_BYTES
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    max_bytes=max_upload_bytes + MULTIPART_OVERHEAD_BYTES,
+    path_limits={"/batch/process-documents": max_batch_bytes, "/batch-process": max_batch_bytes},
+)
+
 # CORS middleware for frontend integration
 app.add_middleware(
     CORSMiddleware,
@@ -156,6 +327,7 @@ async def root():
             "analyze_claim": "/analyze-claim",
             "process_document": "/process-document",
             "analyze_image": "/analyze-image",
+            "jobs": "/jobs",
             "gemini_analyze": "/gemini-analyze"
         }
     }
@@ -185,7 +357,18 @@ async def health_check():
             "port": AI_SERVICE_CONFIG["port"],
             "max_file_size_mb": AI_SERVICE_CONFIG["max_file_size_mb"],
             "processing_timeout": AI_SERVICE_CONFIG["processing_timeout_seconds"]
-        }
+        },
+        "executor": analysis_executor.get_stats() if analysis_executor else {},
+        "ocr_router": ocr_service.router.get_stats() if ocr_service else {},
+        "tesseract_pool": ocr_service.tesseract_pool.get_stats() if ocr_service and ocr_service.tesseract_pool else {},
+        "easyocr_batcher": ocr_service.easyocr_batcher.get_stats() if ocr_service else {},
+        "pdf_dpi": ocr_service.dpi_planner.get_stats() if ocr_service else {},
+        "result_cache": await analysis_executor.run_thread(result_cache.get_stats) if result_cache else {},
+        "image_hash_index": hash_index.get_stats() if hash_index is not None else {},
+        "jobs": job_queue.get_stats() if job_queue else {},
+        "fraud_statistics": fraud_service.get_fraud_statistics() if fraud_service else {},
+        "fraud_model": fraud_service.get_model_info() if fraud_service else {},
+        "vocabularies": vocabularies.get_stats() if vocabularies else {}
     }
     
     # Check if any critical service is down
@@ -195,6 +378,32 @@ async def health_check():
     
     return health_status
 
+def claim_analysis_response(
+    request: ClaimAnalysisRequest,
+    fraud_analysis: Dict[str, Any],
+    processing_time: float,
+) -> ClaimAnalysisResponse:
+    """API response for one claim from its fraud analysis report"""
+    return ClaimAnalysisResponse(
+        claimId=request.claimId,
+        claimType=request.claimType,
+        fraudScore=fraud_analysis["fraud_score"],
+        authenticityScore=fraud_analysis.get("confidence", 0.8),
+        estimatedAmount=request.requestedAmount,
+        confidence=fraud_analysis.get("confidence", 0.8),
+        detectedIssues=fraud_analysis.get("issues", []),
+        fraudAnalysis=FraudAnalysisResult(
+            fraudScore=fraud_analysis["fraud_score"],
+            riskFactors=fraud_analysis.get("risk_factors", []),
+            consistencyCheck={},
+            anomalies=fraud_analysis.get("issues", [])
+        ),
+        recommendation=fraud_analysis.get("recommendation", "manual_review"),
+        reasoning=f"CPU-based AI analysis completed with {fraud_analysis.get('confidence', 0.8):.1%} confidence",
+        processedAt=time.strftime("%Y-%m-%d %H:%M:%S"),
+        processingTime=processing_time
+    )
+
 # Main AI endpoints
 @app.post("/analyze-claim", response_model=ClaimAnalysisResponse, tags=["AI Analysis"])
 async def analyze_claim(
@@ -218,26 +427,7 @@ async def analyze_claim(
             request.requestedAmount
         )
         
-        # Prepare response
-        response = ClaimAnalysisResponse(
-            claimId=request.claimId,
-            claimType=request.claimType,
-            fraudScore=fraud_analysis["fraud_score"],
-            authenticityScore=fraud_analysis.get("confidence", 0.8),
-            estimatedAmount=request.requestedAmount,
-            confidence=fraud_analysis.get("confidence", 0.8),
-            detectedIssues=fraud_analysis.get("issues", []),
-            fraudAnalysis=FraudAnalysisResult(
-                fraudScore=fraud_analysis["fraud_score"],
-                riskFactors=fraud_analysis.get("risk_factors", []),
-                consistencyCheck={},
-                anomalies=fraud_analysis.get("issues", [])
-            ),
-            recommendation=fraud_analysis.get("recommendation", "manual_review"),
-            reasoning=f"CPU-based AI analysis completed with {fraud_analysis.get('confidence', 0.8):.1%} confidence",
-            processedAt=time.strftime("%Y-%m-%d %H:%M:%S"),
-            processingTime=time.time() - start_time
-        )
+        response = claim_analysis_response(request, fraud_analysis, time.time() - start_time)
         
         logger.info(f"✅ Claim analysis completed in {time.time() - start_time:.2f}s")
         return response
@@ -246,91 +436,455 @@ async def analyze_claim(
         logger.error(f"❌ Error analyzing claim: {e}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
-@app.post("/process-document", response_model=DocumentProcessingResponse, tags=["Document Processing"])
-async def process_document(
-    file: UploadFile = File(...),
-    document_type: str = Form("general"),
-    background_tasks: BackgroundTasks = BackgroundTasks()
-):
-    """Process document with OCR and validation"""
+@app.post("/analyze-claims", response_model=BatchClaimAnalysisResponse, tags=["AI Analysis"])
+async def analyze_claims(request: BatchClaimAnalysisRequest):
+    """Fraud scoring for many claims at once, e.g. re-scoring the claim book"""
     start_time = time.time()
     
     try:
-        # File size check
-        content = await file.read()
-        if len(content) > AI_SERVICE_CONFIG["max_file_size_mb"] * 1024 * 1024:
-            raise HTTPException(status_code=413, detail="File too large")
+        logger.info(f"🔍 Analyzing {len(request.claims)} claims")
         
-        logger.info(f"📄 Processing document {file.filename}")
+        if not fraud_service or not fraud_service.is_ready():
+            raise HTTPException(status_code=503, detail="Fraud detection service not available")
         
-        if not ocr_service or not ocr_service.is_ready():
-            raise HTTPException(status_code=503, detail="OCR service not available")
+        analyses = await fraud_service.analyze_texts([
+            (claim.description, claim.claimType.value, claim.requestedAmount) for claim in request.claims
+        ])
         
-        # Process document
-        ocr_result = await ocr_service.process_document(content, file.filename, document_type)
+        elapsed = time.time() - start_time
+        per_claim = elapsed / len(request.claims)
+        results = [
+            claim_analysis_response(claim, analysis, per_claim)
+            for claim, analysis in zip(request.claims, analyses)
+        ]
         
-        # Validate document
-        validation_result = await document_validator.validate_document(
-            content, file.filename, document_type, ocr_result["text"]
+        total_time = time.time() - start_time
+        logger.info(f"✅ {len(results)} claims analyzed in {total_time:.2f}s")
+        return BatchClaimAnalysisResponse(
+            totalClaims=len(results),
+            results=results,
+            totalProcessingTime=total_time,
+            claimsPerSecond=len(results) / max(total_time, 1e-9),
         )
         
-        # Prepare response
-        response = DocumentProcessingResponse(
-            filename=file.filename,
-            documentType=DocumentType(document_type),
-            status=AnalysisStatus.SUCCESS,
-            text=ocr_result["text"],
-            confidence=ocr_result["confidence"],
-            validation=DocumentValidation(
-                isValid=validation_result["is_valid"],
-                validationScore=validation_result["validation_score"],
-                issues=validation_result["issues"],
-                extractedData=validation_result["extracted_data"]
-            ),
-            extractedFields=ocr_result.get("structured_data", {}),
-            metadata=ocr_result.get("metadata", {}),
-            processingTime=time.time() - start_time
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error analyzing claims: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch analysis failed: {str(e)}")
+
+@app.post("/models/fraud/retrain", response_model=FraudModelRetrainResponse, tags=["AI Analysis"])
+async def retrain_fraud_model(request: BatchClaimAnalysisRequest):
+    """Retrain the fraud anomaly model on historical claims and hot-swap it"""
+    try:
+        if not fraud_service or not fraud_service.is_ready():
+            raise HTTPException(status_code=503, detail="Fraud detection service not available")
+        if fraud_service.training:
+            raise HTTPException(status_code=409, detail="A fraud model retrain is already running")
+        
+        metadata = await fraud_service.update_model([
+            {
+                "description": claim.description,
+                "claim_type": claim.claimType.value,
+                "requested_amount": claim.requestedAmount,
+            }
+            for claim in request.claims
+        ])
+        
+        return FraudModelRetrainResponse(
+            version=metadata["version"],
+            trainingSamples=metadata["training_samples"],
+            trainingTime=metadata["training_seconds"],
+            loadTime=metadata["load_seconds"],
         )
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Error retraining fraud model: {e}")
+        raise HTTPException(status_code=500, detail=f"Retraining failed: {str(e)}")
+
+def document_pipeline_version() -> str:
+    """Cache version for document results, which also depend on the keyword vocabularies"""
+    if not vocabularies:
+        return AI_SERVICE_CONFIG["pipeline_version"]
+    vocabularies.refresh()
+    return f"{AI_SERVICE_CONFIG['pipeline_version']}+{vocabularies.fingerprint}"
+
+async def receive_upload(file: UploadFile) -> SpooledUpload:
+    """Stream an upload to memory or a spool file, answering 413 as soon as it crosses max_file_size_mb"""
+    try:
+        return await read_upload(
+            file,
+            max_bytes=AI_SERVICE_CONFIG["max_file_size_mb"] * 1024 * 1024,
+            spool_max_bytes=AI_SERVICE_CONFIG["upload_spool_max_mb"] * 1024 * 1024,
+            chunk_size=AI_SERVICE_CONFIG["upload_chunk_kb"] * 1024,
+            spool_dir=AI_SERVICE_CONFIG["upload_spool_dir"],
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+def request_deadline(timeout_seconds: Optional[float] = None) -> Deadline:
+    """Deadline for one request: the configured processing timeout, or a tighter budget from the caller"""
+    budget = AI_SERVICE_CONFIG["processing_timeout_seconds"]
+    if timeout_seconds is not None and timeout_seconds > 0:
+        budget = min(budget, timeout_seconds) if budget else timeout_seconds
+    return Deadline(budget or None)
+
+async def process_document_content(
+    upload: SpooledUpload,
+    document_type: str,
+    start_time: float,
+    deadline: Optional[Deadline] = None,
+) -> DocumentProcessingResponse:
+    """OCR and validate one uploaded document, using the result cache; partial results are not cached"""
+    deadline = deadline or request_deadline()
+    filename = upload.filename
+    if upload.size > AI_SERVICE_CONFIG["max_file_size_mb"] * 1024 * 1024:
+        raise HTTPException(status_code=413, detail="File too large")
+    
+    logger.info(f"📄 Processing document {filename}")
+    
+    # Identical uploads return the stored result
+    file_ext = filename.lower().split('.')[-1] if '.' in filename else ''
+    cache_key = content_key(
+        upload.digest,
+        "document",
+        f"{document_type}:{file_ext}",
+        document_pipeline_version(),
+    )
+    cached = await analysis_executor.run_thread(result_cache.get, cache_key) if result_cache else None
+    if cached:
+        cached["filename"] = filename
+        cached["metadata"] = {**cached.get("metadata", {}), "filename": filename, "cached": True}
+        cached["processingTime"] = time.time() - start_time
+        logger.info(f"⚡ Document served from cache: {filename}")
+        return DocumentProcessingResponse(**cached)
+    
+    if not ocr_service or not ocr_service.is_ready():
+        raise HTTPException(status_code=503, detail="OCR service not available")
+    
+    # Process document
+    # Spilled uploads are handed over as the spool file's path and mmap
+    ocr_result = await ocr_service.process_document(
+        upload.content, filename, document_type, deadline, path=upload.path if upload.spilled else None
+    )
+    
+    # Validate document
+    validation_result = await document_validator.validate_document(
+        upload.content, filename, document_type, ocr_result["text"], deadline
+    )
+    
+    metadata = ocr_result.get("metadata", {})
+    if deadline.partial:
+        metadata = {**metadata, "deadline": deadline.summary()}
+        logger.warning(f"⏱️ {filename} processed partially, skipped: {', '.join(deadline.skipped)}")
+    
+    # Prepare response
+    response = DocumentProcessingResponse(
+        filename=filename,
+        documentType=DocumentType(document_type),
+        status=AnalysisStatus.PARTIAL if deadline.partial else AnalysisStatus.SUCCESS,
+        text=ocr_result["text"],
+        confidence=ocr_result["confidence"],
+        validation=DocumentValidation(
+            isValid=validation_result["is_valid"],
+            validationScore=validation_result["validation_score"],
+            issues=validation_result["issues"],
+            extractedData=validation_result["extracted_data"]
+        ),
+        extractedFields=ocr_result.get("structured_data", {}),
+        metadata=metadata,
+        processingTime=time.time() - start_time
+    )
+    
+    # Empty text usually means an engine failure, which should be retried
+    if result_cache and ocr_result["text"] and not deadline.partial:
+        await analysis_executor.run_thread(result_cache.put, cache_key, response.model_dump(mode="json"))
+    
+    return response
+
+@app.post("/process-document", response_model=DocumentProcessingResponse, tags=["Document Processing"])
+async def process_document(
+    file: UploadFile = File(...),
+    document_type: str = Form("general"),
+    timeout_seconds: Optional[float] = Form(None, gt=0),
+    background_tasks: BackgroundTasks = BackgroundTasks()
+):
+    """Process document with OCR and validation"""
+    start_time = time.time()
+    deadline = request_deadline(timeout_seconds)
+    
+    upload = None
+    try:
+        upload = await receive_upload(file)
+        response = await process_document_content(upload, document_type, start_time, deadline)
+        
         logger.info(f"✅ Document processed in {time.time() - start_time:.2f}s")
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error processing document: {e}")
         raise HTTPException(status_code=500, detail=f"Document processing failed: {str(e)}")
+    finally:
+        if upload:
+            upload.close()
+
+@app.post("/batch/process-documents", response_model=BatchProcessingResponse, tags=["Document Processing"])
+@app.post("/batch-process", response_model=BatchProcessingResponse, tags=["Document Processing"], include_in_schema=False)
+async def batch_process_documents(
+    files: List[UploadFile] = File(...),
+    document_types: Optional[List[str]] = Form(None),
+    timeout_seconds: Optional[float] = Form(None, gt=0),
+):
+    """Process many documents concurrently; a single document type applies to every file"""
+    start_time = time.time()
+    # One budget for the whole batch; each file tracks its own skipped stages
+    batch_deadline = request_deadline(timeout_seconds)
+    
+    if len(files) > AI_SERVICE_CONFIG["batch_max_files"]:
+        raise HTTPException(status_code=413, detail=f"At most {AI_SERVICE_CONFIG['batch_max_files']} files per batch")
+    document_types = document_types or ["general"]
+    if len(document_types) not in (1, len(files)):
+        raise HTTPException(status_code=400, detail="Provide one document type, or one per file")
+    
+    logger.info(f"📚 Batch processing {len(files)} documents")
+    
+    # Every document shares the same OCR engines and worker pools; the
+    # semaphore keeps one large batch from monopolizing them
+    semaphore = asyncio.Semaphore(AI_SERVICE_CONFIG["batch_concurrency"])
+    
+    async def process_one(file: UploadFile, document_type: str) -> DocumentProcessingResponse:
+        async with semaphore:
+            file_start = time.time()
+            upload = None
+            try:
+                upload = await receive_upload(file)
+                return await process_document_content(
+                    upload, document_type, file_start, Deadline(batch_deadline.remaining())
+                )
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.error(f"❌ Error processing {file.filename} in batch: {detail}")
+                return DocumentProcessingResponse(
+                    filename=file.filename or "",
+                    documentType=document_type if document_type in DocumentType._value2member_map_ else DocumentType.GENERAL,
+                    status=AnalysisStatus.FAILED,
+                    text="",
+                    confidence=0.0,
+                    validation=DocumentValidation(isValid=False, validationScore=0.0, issues=[detail]),
+                    metadata={"error": detail},
+                    processingTime=time.time() - file_start,
+                )
+            finally:
+                if upload:
+                    upload.close()
+    
+    types = document_types if len(document_types) == len(files) else document_types * len(files)
+    results = await asyncio.gather(*(process_one(file, doc_type) for file, doc_type in zip(files, types)))
+    
+    failed = sum(1 for result in results if result.status == AnalysisStatus.FAILED)
+    total_time = time.time() - start_time
+    logger.info(f"✅ Batch of {len(files)} documents processed in {total_time:.2f}s ({failed} failed)")
+    
+    return BatchProcessingResponse(
+        totalDocuments=len(files),
+        successfullyProcessed=len(files) - failed,
+        failed=failed,
+        results=results,
+        totalProcessingTime=total_time,
+    )
+
+async def analyze_image_content(
+    upload: SpooledUpload,
+    analysis_type: str,
+    claim_id: Optional[str],
+    start_time: float,
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Any]:
+    """Analyze one uploaded image, using the result cache; partial results are not cached"""
+    deadline = deadline or request_deadline()
+    filename = upload.filename
+    if upload.size > AI_SERVICE_CONFIG["max_file_size_mb"] * 1024 * 1024:
+        raise HTTPException(status_code=413, detail="File too large")
+    
+    logger.info(f"🖼️ Analyzing image {filename}")
+    
+    # Identical uploads return the stored result
+    digest = upload.digest
+    cache_key = content_key(
+        digest,
+        "image",
+        analysis_type,
+        AI_SERVICE_CONFIG["pipeline_version"],
+    )
+    cached = await analysis_executor.run_thread(result_cache.get, cache_key) if result_cache else None
+    if cached:
+        cached["filename"] = filename
+        cached["cached"] = True
+        # Matches depend on what was indexed since, so they are never served stale
+        if image_service:
+            cached["duplicate_check"] = await image_service.check_duplicates(
+                cached.get("basic_info", {}).get("perceptual_hashes", {}),
+                digest,
+                claim_id,
+                filename,
+            )
+        cached["processing_time"] = time.time() - start_time
+        logger.info(f"⚡ Image analysis served from cache: {filename}")
+        return cached
+    
+    if not image_service or not image_service.is_ready():
+        raise HTTPException(status_code=503, detail="Image analysis service not available")
+    
+    try:
+        analysis_result = await image_service.analyze_image(
+            upload.content, filename, analysis_type, claim_id=claim_id, content_hash=digest, deadline=deadline
+        )
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    if result_cache and "error" not in analysis_result and not deadline.partial:
+        await analysis_executor.run_thread(result_cache.put, cache_key, analysis_result)
+    
+    return analysis_result
 
 @app.post("/analyze-image", tags=["Image Analysis"])
 async def analyze_image(
     file: UploadFile = File(...),
     analysis_type: str = Form("general"),
+    claim_id: Optional[str] = Form(None),
+    timeout_seconds: Optional[float] = Form(None, gt=0),
     background_tasks: BackgroundTasks = BackgroundTasks()
 ):
     """Analyze image for authenticity and damage assessment"""
     start_time = time.time()
+    deadline = request_deadline(timeout_seconds)
+    upload = None
     
     try:
         # File validation
         if not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        content = await file.read()
-        if len(content) > AI_SERVICE_CONFIG["max_file_size_mb"] * 1024 * 1024:
-            raise HTTPException(status_code=413, detail="File too large")
-        
-        logger.info(f"🖼️ Analyzing image {file.filename}")
-        
-        if not image_service or not image_service.is_ready():
-            raise HTTPException(status_code=503, detail="Image analysis service not available")
-        
-        # Analyze image
-        analysis_result = await image_service.analyze_image(content, file.filename, analysis_type)
+        upload = await receive_upload(file)
+        analysis_result = await analyze_image_content(upload, analysis_type, claim_id, start_time, deadline)
         
         logger.info(f"✅ Image analyzed in {time.time() - start_time:.2f}s")
         return analysis_result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error analyzing image: {e}")
         raise HTTPException(status_code=500, detail=f"Image analysis failed: {str(e)}")
+    finally:
+        if upload:
+            upload.close()
+
+async def run_document_job(job: Dict[str, Any], content: bytes) -> Dict[str, Any]:
+    """Job handler: OCR and validation of a queued document"""
+    response = await process_document_content(
+        SpooledUpload.from_bytes(content, job["filename"]), job["params"]["document_type"], time.time(),
+        request_deadline(job["params"].get("timeout_seconds")),
+    )
+    return response.model_dump(mode="json")
+
+async def run_image_job(job: Dict[str, Any], content: bytes) -> Dict[str, Any]:
+    """Job handler: analysis of a queued image"""
+    return await analyze_image_content(
+        SpooledUpload.from_bytes(content, job["filename"]), job["params"]["analysis_type"], job["params"].get("claim_id"), time.time(),
+        request_deadline(job["params"].get("timeout_seconds")),
+    )
+
+@app.post("/jobs", response_model=JobSubmissionResponse, status_code=202, tags=["Jobs"])
+async def submit_job(
+    file: UploadFile = File(...),
+    job_type: JobType = Form(JobType.DOCUMENT),
+    document_type: DocumentType = Form(DocumentType.GENERAL),
+    analysis_type: str = Form("general"),
+    claim_id: Optional[str] = Form(None),
+    webhook_url: Optional[str] = Form(None),
+    timeout_seconds: Optional[float] = Form(None, gt=0),
+):
+    """Queue a document or image for background processing; poll GET /jobs/{id} or wait for the webhook"""
+    if not job_queue:
+        raise HTTPException(status_code=503, detail="Job queue not available")
+    if webhook_url:
+        try:
+            await job_queue.check_webhook(webhook_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    upload = await receive_upload(file)
+    
+    if job_type == JobType.IMAGE:
+        params = {"analysis_type": analysis_type, "claim_id": claim_id}
+    else:
+        params = {"document_type": document_type.value}
+    # The budget starts when a worker picks the job up, not at submission
+    params["timeout_seconds"] = timeout_seconds
+    
+    try:
+        job = await job_queue.submit(job_type.value, file.filename, params, upload.content, webhook_url)
+    except Exception as e:
+        logger.error(f"❌ Error queuing job: {e}")
+        raise HTTPException(status_code=500, detail=f"Job submission failed: {str(e)}")
+    finally:
+        upload.close()
+    
+    logger.info(f"📬 Queued {job_type.value} job {job['id']} for {file.filename}")
+    return JobSubmissionResponse(jobId=job["id"], status=job["status"], statusUrl=f"/jobs/{job['id']}")
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse, tags=["Jobs"])
+async def get_job(job_id: str):
+    """Status of a queued job, with its result once completed"""
+    if not job_queue:
+        raise HTTPException(status_code=503, detail="Job queue not available")
+    
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return JobStatusResponse(**JobQueue.describe(job))
+
+@app.post("/image-hashes/lookup", response_model=ImageHashLookupResponse, tags=["Image Analysis"])
+async def lookup_image_hashes(request: ImageHashLookupRequest):
+    """Bulk near-duplicate lookup of perceptual hashes against every indexed image"""
+    start_time = time.time()
+    
+    if hash_index is None:
+        raise HTTPException(status_code=503, detail="Image hash index not available")
+    
+    try:
+        queries = [{kind: int(value, 16) for kind, value in hashes.items()} for hashes in request.hashes]
+    except ValueError:
+        queries = None
+    if queries is None or any(value >> 64 for query in queries for value in query.values()):
+        raise HTTPException(status_code=400, detail="Hashes must be 64-bit hexadecimal strings")
+    
+    try:
+        def lookup_all():
+            return [hash_index.lookup(query, request.maxDistance, limit=request.limit) for query in queries]
+        
+        matches = await analysis_executor.run_thread(lookup_all)
+        results = [{"index": i, "match_count": len(m), "matches": m} for i, m in enumerate(matches)]
+        
+        logger.info(f"🔎 Looked up {len(queries)} image hash sets in {time.time() - start_time:.3f}s")
+        return ImageHashLookupResponse(
+            results=results,
+            indexedImages=len(hash_index),
+            processingTime=time.time() - start_time,
+        )
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Image hash lookup failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Image hash lookup failed: {str(e)}")
 
 @app.post("/gemini-analyze", tags=["Advanced AI"])
 async def gemini_analyze(
@@ -350,7 +904,8 @@ async def gemini_analyze(
         result = await gemini_service.analyze_claim_advanced(
             document_text=data.get("document_text", ""),
             claim_type=data.get("claim_type", "general"),
-            images=data.get("images", [])
+            images=data.get("images", []),
+            deadline=request_deadline(float(data["timeout_seconds"]) if data.get("timeout_seconds") else None)
         )
         
         logger.info(f"✅ Gemini analysis completed in {time.time() - start_time:.2f}s")
@@ -22,6 +22,16 @@ class DocumentType(str, Enum):
     INSURANCE_CARD = "insurance_card"
     GENERAL = "general"
 
+class JobType(str, Enum):
+    DOCUMENT = "document"
+    IMAGE = "image"
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
 class AnalysisStatus(str, Enum):
     SUCCESS = "success"
     PARTIAL = "partial"
@@ -37,6 +47,9 @@ class ClaimAnalysisRequest(BaseModel):
     images: Optional[List[str]] = Field(None, description="List of image IPFS hashes")
     metadata: Optional[Dict[str, Any]] = Field(None, description="Additional claim metadata")
 
+class BatchClaimAnalysisRequest(BaseModel):
+    claims: List[ClaimAnalysisRequest] = Field(..., min_length=1, max_length=10000, description="Claims to score")
+
 class DocumentProcessingRequest(BaseModel):
     documentHash: str = Field(..., description="IPFS hash of document")
     documentType: DocumentType = Field(DocumentType.GENERAL, description="Type of document")
@@ -128,7 +141,7 @@ class DocumentProcessingResponse(BaseModel):
     validation: DocumentValidation = Field(..., description="Validation results")
     
     # Extracted data
-    extractedFields: Optional[Dict[str, str]] = Field(None, description="Extracted structured fields")
+    extractedFields: Optional[Dict[str, Any]] = Field(None, description="Extracted structured fields")
     detectedAmounts: Optional[List[float]] = Field(None, description="Monetary amounts found")
     detectedDates: Optional[List[str]] = Field(None, description="Dates found in document")
     
@@ -143,6 +156,46 @@ class BatchProcessingResponse(BaseModel):
     results: List[DocumentProcessingResponse] = Field(..., description="Individual processing results")
     totalProcessingTime: float = Field(..., description="Total processing time")
 
+class BatchClaimAnalysisResponse(BaseModel):
+    totalClaims: int = Field(..., description="Total claims analyzed")
+    results: List[ClaimAnalysisResponse] = Field(..., description="Individual analyses, in request order")
+    totalProcessingTime: float = Field(..., description="Total processing time")
+    claimsPerSecond: float = Field(..., description="Throughput of this batch")
+
+class FraudModelRetrainResponse(BaseModel):
+    version: str = Field(..., description="Version of the newly trained model, now live")
+    trainingSamples: int = Field(..., description="Claims the model was trained on")
+    trainingTime: float = Field(..., description="Time spent fitting the model")
+    loadTime: float = Field(..., description="Time spent loading the new version")
+
+class JobSubmissionResponse(BaseModel):
+    jobId: str = Field(..., description="Job identifier")
+    status: JobStatus = Field(..., description="Job status")
+    statusUrl: str = Field(..., description="Where to poll for the result")
+
+class JobStatusResponse(BaseModel):
+    jobId: str = Field(..., description="Job identifier")
+    jobType: JobType = Field(..., description="Kind of processing")
+    status: JobStatus = Field(..., description="Job status")
+    filename: Optional[str] = Field(None, description="Uploaded file name")
+    attempts: int = Field(..., description="Times the job was started")
+    createdAt: float = Field(..., description="Submission time")
+    startedAt: Optional[float] = Field(None, description="Start of the latest attempt")
+    finishedAt: Optional[float] = Field(None, description="Completion time")
+    result: Optional[Dict[str, Any]] = Field(None, description="Processing result, once completed")
+    error: Optional[str] = Field(None, description="Failure reason")
+    webhookStatus: Optional[str] = Field(None, description="Webhook delivery: delivered or failed")
+
+class ImageHashLookupRequest(BaseModel):
+    hashes: List[Dict[str, str]] = Field(..., max_length=1000, description="Hex hashes per image, keyed by kind (phash, dhash, ahash)")
+    maxDistance: Optional[int] = Field(None, ge=0, description="Hamming distance threshold (defaults to the service setting)")
+    limit: int = Field(20, ge=1, le=100, description="Maximum matches per image")
+
+class ImageHashLookupResponse(BaseModel):
+    results: List[Dict[str, Any]] = Field(..., description="Matches for each submitted image, in request order")
+    indexedImages: int = Field(..., description="Images in the index")
+    processingTime: float = Field(..., description="Total processing time")
+
 class HealthClaimAnalysis(BaseModel):
     medicalValidity: float = Field(..., ge=0, le=1, description="Medical validity score")
     treatmentAppropriate: bool = Field(..., description="Treatment appropriateness")
@@ -6,8 +6,20 @@ from datetime import datetime, timedelta
 from loguru import logger
 import hashlib
 
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.extraction import get_extraction_engine
+from utils.keyword_matcher import VocabularyRegistry
+
+# Placeholder text that should never appear in a genuine document
+PLACEHOLDER_PATTERNS = [
+    (pattern, re.compile(pattern, re.IGNORECASE))
+    for pattern in [r'xxx+', r'\[.*\]', r'<.*>', r'placeholder', r'sample', r'lorem ipsum']
+]
+NUMBER_TOKEN_PATTERN = re.compile(r'\d+[,.]?\d*')
+REPEATED_CHAR_PATTERN = re.compile(r'(.)\1{5,}')
+
 class DocumentValidator:
-    def __init__(self):
+    def __init__(self, vocabularies: Optional[VocabularyRegistry] = None):
         # Document type validation rules
         self.validation_rules = {
             "medical_bill": {
@@ -51,16 +63,19 @@ class DocumentValidator:
             }
         }
         
-        # Common validation patterns
-        self.patterns = {
-            "email": r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            "phone": r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
-            "ssn": r'\b\d{3}-\d{2}-\d{4}\b',
-            "credit_card": r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',
-            "vin": r'\b[A-HJ-NPR-Z0-9]{17}\b',
-            "license_plate": r'\b[A-Z0-9]{2,8}\b'
+        # Rule patterns compiled once per document type
+        self.rule_regexes = {
+            document_type: {
+                key: re.compile(rules[key])
+                for key in ("amount_pattern", "date_pattern")
+                if key in rules
+            }
+            for document_type, rules in self.validation_rules.items()
         }
         
+        # Shared single-pass extraction for emails, phones, amounts, dates, VINs and codes
+        self.extraction = get_extraction_engine()
+        
         # Suspicious indicators
         self.suspicious_indicators = [
             "lorem ipsum",
@@ -71,6 +86,35 @@ class DocumentValidator:
             "copy of copy",
             "duplicate"
         ]
+        
+        # Essential sections per document type: section name -> any of these terms
+        self.document_elements = {
+            "medical_bill": {
+                "patient information": ["patient", "name"],
+                "provider information": ["provider", "doctor", "hospital", "clinic"],
+                "service information": ["service", "treatment", "procedure"],
+                "billing information": ["bill", "charge", "amount", "total"]
+            },
+            "vehicle_estimate": {
+                "vehicle information": ["vehicle", "car", "truck", "vin", "year", "make", "model"],
+                "damage description": ["damage", "repair", "replace", "parts"],
+                "cost breakdown": ["labor", "parts", "total", "estimate"]
+            },
+            "invoice": {
+                "header": ["invoice", "receipt", "bill"],
+                "vendor info": ["from", "vendor", "company", "business"],
+                "amount": ["total", "amount", "due", "paid"]
+            }
+        }
+        
+        # Keyword vocabularies are matched with shared automatons and can be
+        # extended from the vocabulary file without a restart
+        self.vocabularies = vocabularies or VocabularyRegistry()
+        self.vocabularies.register("suspicious_indicators", self.suspicious_indicators)
+        for document_type, rules in self.validation_rules.items():
+            self.vocabularies.register(f"expected_keywords:{document_type}", rules.get("expected_keywords", []))
+        for document_type, elements in self.document_elements.items():
+            self.vocabularies.register(f"document_elements:{document_type}", elements)
     
     def is_ready(self) -> bool:
         """Check if document validator is ready"""
@@ -81,9 +125,11 @@ class DocumentValidator:
         content: bytes, 
         filename: str, 
         document_type: str, 
-        extracted_text: str
+        extracted_text: str,
+        deadline: Optional[Deadline] = None,
     ) -> Dict[str, Any]:
-        """Validate document based on type and content"""
+        """Validate document based on type and content; stages not reached before the deadline are skipped"""
+        deadline = deadline or Deadline()
         try:
             logger.info(f"🔍 Validating document: {filename} (type: {document_type})")
             
@@ -98,26 +144,41 @@ class DocumentValidator:
             # Get validation rules for document type
             rules = self.validation_rules.get(document_type, self.validation_rules["general"])
             
-            # Basic text validation
-            text_validation = await self._validate_text_content(extracted_text, rules)
-            validation_result.update(text_validation)
-            
-            # Structure validation
-            structure_validation = await self._validate_document_structure(extracted_text, document_type, rules)
-            self._merge_validation_results(validation_result, structure_validation)
-            
-            # Content validation
-            content_validation = await self._validate_content_authenticity(extracted_text, document_type)
-            self._merge_validation_results(validation_result, content_validation)
-            
-            # Data extraction and validation
-            data_validation = await self._extract_and_validate_data(extracted_text, document_type, rules)
-            validation_result["extracted_data"] = data_validation["data"]
-            self._merge_validation_results(validation_result, data_validation)
+            try:
+                # Basic text validation
+                deadline.check("text validation")
+                text_validation = await self._validate_text_content(extracted_text, document_type, rules)
+                validation_result.update(text_validation)
+                
+                # Structure validation
+                deadline.check("structure validation")
+                structure_validation = await self._validate_document_structure(
+                    extracted_text, document_type, self.rule_regexes.get(document_type, self.rule_regexes["general"])
+                )
+                self._merge_validation_results(validation_result, structure_validation)
+                
+                # Content validation
+                deadline.check("authenticity validation")
+                content_validation = await self._validate_content_authenticity(extracted_text, document_type)
+                self._merge_validation_results(validation_result, content_validation)
+                
+                # Data extraction and validation
+                deadline.check("data extraction")
+                data_validation = await self._extract_and_validate_data(extracted_text, document_type, rules)
+                validation_result["extracted_data"] = data_validation["data"]
+                self._merge_validation_results(validation_result, data_validation)
+                
+            except DeadlineExceeded as e:
+                # Score what was checked in time
+                logger.warning(f"⏱️ Validation of {filename} cut short: {e}")
+                validation_result["partial"] = True
+                validation_result["issues"].append(f"Validation incomplete: {e}")
             
-            # Calculate final validation score
+            # Calculate final validation score; an unfinished validation never passes
             validation_result["validation_score"] = self._calculate_validation_score(validation_result)
-            validation_result["is_valid"] = validation_result["validation_score"] >= 0.6
+            validation_result["is_valid"] = (
+                validation_result["validation_score"] >= 0.6 and not validation_result.get("partial")
+            )
             
             logger.info(f"✅ Document validation completed: {filename} (score: {validation_result['validation_score']:.2f})")
             return validation_result
@@ -132,7 +193,7 @@ class DocumentValidator:
                 "confidence": 0.0
             }
     
-    async def _validate_text_content(self, text: str, rules: Dict[str, Any]) -> Dict[str, Any]:
+    async def _validate_text_content(self, text: str, document_type: str, rules: Dict[str, Any]) -> Dict[str, Any]:
         """Validate basic text content"""
         issues = []
         
@@ -142,15 +203,15 @@ class DocumentValidator:
             issues.append(f"Text too short: {len(text)} characters (minimum: {min_length})")
         
         # Check for suspicious content
-        text_lower = text.lower()
-        for indicator in self.suspicious_indicators:
-            if indicator in text_lower:
-                issues.append(f"Suspicious content detected: {indicator}")
+        for indicator in self.vocabularies.matcher("suspicious_indicators").matched_terms(text):
+            issues.append(f"Suspicious content detected: {indicator}")
         
         # Check for expected keywords
-        expected_keywords = rules.get("expected_keywords", [])
+        if document_type not in self.validation_rules:
+            document_type = "general"
+        expected_keywords = self.vocabularies.terms(f"expected_keywords:{document_type}")
         if expected_keywords:
-            found_keywords = [kw for kw in expected_keywords if kw.lower() in text_lower]
+            found_keywords = self.vocabularies.matcher(f"expected_keywords:{document_type}").matched_terms(text)
             if len(found_keywords) < len(expected_keywords) * 0.5:  # At least 50% of keywords
                 issues.append(f"Missing expected keywords. Found: {found_keywords}")
         
@@ -176,22 +237,22 @@ class DocumentValidator:
             }
         }
     
-    async def _validate_document_structure(self, text: str, document_type: str, rules: Dict[str, Any]) -> Dict[str, Any]:
+    async def _validate_document_structure(self, text: str, document_type: str, rule_regexes: Dict[str, Any]) -> Dict[str, Any]:
         """Validate document structure based on type"""
         issues = []
         
         # Check for required patterns
-        amount_pattern = rules.get("amount_pattern")
-        if amount_pattern:
-            amounts = re.findall(amount_pattern, text)
+        amount_regex = rule_regexes.get("amount_pattern")
+        if amount_regex:
+            amounts = amount_regex.findall(text)
             if not amounts:
                 issues.append("No monetary amounts found in expected format")
             elif len(amounts) > 10:
                 issues.append("Too many monetary amounts detected (possible OCR errors)")
         
-        date_pattern = rules.get("date_pattern")
-        if date_pattern:
-            dates = re.findall(date_pattern, text)
+        date_regex = rule_regexes.get("date_pattern")
+        if date_regex:
+            dates = date_regex.findall(text)
             if not dates:
                 issues.append("No dates found in expected format")
             else:
@@ -219,17 +280,8 @@ class DocumentValidator:
         authenticity_score = 1.0
         
         # Check for placeholder text
-        placeholder_patterns = [
-            r'xxx+',
-            r'\[.*\]',
-            r'<.*>',
-            r'placeholder',
-            r'sample',
-            r'lorem ipsum'
-        ]
-        
-        for pattern in placeholder_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
+        for pattern, regex in PLACEHOLDER_PATTERNS:
+            if regex.search(text):
                 issues.append(f"Placeholder text detected: {pattern}")
                 authenticity_score -= 0.2
         
@@ -260,11 +312,12 @@ class DocumentValidator:
         issues = []
         extracted_data = {}
         
-        # Extract common patterns
-        extracted_data["emails"] = re.findall(self.patterns["email"], text)
-        extracted_data["phones"] = re.findall(self.patterns["phone"], text)
-        extracted_data["amounts"] = self._extract_amounts(text)
-        extracted_data["dates"] = self._extract_dates(text)
+        # Extract common patterns in a single pass
+        entities = self.extraction.scan(text)
+        extracted_data["emails"] = entities["emails"]
+        extracted_data["phones"] = entities["phones"]
+        extracted_data["amounts"] = entities["amounts"]
+        extracted_data["dates"] = entities["dates"]
         
         # Document type specific extraction
         if document_type == "medical_bill":
@@ -295,25 +348,15 @@ class DocumentValidator:
     async def _validate_medical_bill_structure(self, text: str) -> List[str]:
         """Validate medical bill specific structure"""
         issues = []
-        text_lower = text.lower()
         
         # Check for essential medical bill elements
-        medical_elements = [
-            ("patient information", ["patient", "name"]),
-            ("provider information", ["provider", "doctor", "hospital", "clinic"]),
-            ("service information", ["service", "treatment", "procedure"]),
-            ("billing information", ["bill", "charge", "amount", "total"])
-        ]
-        
-        for element_name, keywords in medical_elements:
-            if not any(keyword in text_lower for keyword in keywords):
-                issues.append(f"Missing {element_name} section")
+        for element_name in self._missing_elements(text, "medical_bill"):
+            issues.append(f"Missing {element_name} section")
         
         # Check for medical codes
-        icd_codes = re.findall(r'\b[A-Z]\d{2}(?:\.\d{1,2})?\b', text)
-        cpt_codes = re.findall(r'\b\d{5}\b', text)
+        entities = self.extraction.scan(text)
         
-        if not icd_codes and not cpt_codes:
+        if not entities["icd_codes"] and not entities["cpt_codes"]:
             issues.append("No medical billing codes (ICD/CPT) found")
         
         return issues
@@ -321,22 +364,13 @@ class DocumentValidator:
     async def _validate_vehicle_estimate_structure(self, text: str) -> List[str]:
         """Validate vehicle estimate specific structure"""
         issues = []
-        text_lower = text.lower()
         
         # Check for essential vehicle estimate elements
-        vehicle_elements = [
-            ("vehicle information", ["vehicle", "car", "truck", "vin", "year", "make", "model"]),
-            ("damage description", ["damage", "repair", "replace", "parts"]),
-            ("cost breakdown", ["labor", "parts", "total", "estimate"])
-        ]
-        
-        for element_name, keywords in vehicle_elements:
-            if not any(keyword in text_lower for keyword in keywords):
-                issues.append(f"Missing {element_name} section")
+        for element_name in self._missing_elements(text, "vehicle_estimate"):
+            issues.append(f"Missing {element_name} section")
         
         # Check for VIN
-        vin_pattern = self.patterns["vin"]
-        if not re.search(vin_pattern, text):
+        if not self.extraction.scan(text)["vins"]:
             issues.append("No VIN number found")
         
         return issues
@@ -344,21 +378,19 @@ class DocumentValidator:
     async def _validate_invoice_structure(self, text: str) -> List[str]:
         """Validate invoice/receipt structure"""
         issues = []
-        text_lower = text.lower()
         
         # Check for essential invoice elements
-        invoice_elements = [
-            ("header", ["invoice", "receipt", "bill"]),
-            ("vendor info", ["from", "vendor", "company", "business"]),
-            ("amount", ["total", "amount", "due", "paid"])
-        ]
-        
-        for element_name, keywords in invoice_elements:
-            if not any(keyword in text_lower for keyword in keywords):
-                issues.append(f"Missing {element_name} information")
+        for element_name in self._missing_elements(text, "invoice"):
+            issues.append(f"Missing {element_name} information")
         
         return issues
     
+    def _missing_elements(self, text: str, document_type: str) -> List[str]:
+        """Sections of a document type with none of their terms in the text"""
+        vocabulary = f"document_elements:{document_type}"
+        present = set(self.vocabularies.matcher(vocabulary).matched_labels(text))
+        return [name for name in self.vocabularies.terms(vocabulary) if name not in present]
+    
     def _is_reasonable_date(self, date_str: str) -> bool:
         """Check if date is reasonable"""
         try:
@@ -402,7 +434,7 @@ class DocumentValidator:
                 return True
         
         # Check for mixed number formats
-        amounts = re.findall(r'\d+[,.]?\d*', text)
+        amounts = NUMBER_TOKEN_PATTERN.findall(text)
         if amounts:
             comma_amounts = [a for a in amounts if ',' in a]
             dot_amounts = [a for a in amounts if '.' in a]
@@ -419,7 +451,7 @@ class DocumentValidator:
             return True
         
         # Check for repeated character patterns
-        repeated_patterns = re.findall(r'(.)\1{5,}', text)
+        repeated_patterns = REPEATED_CHAR_PATTERN.findall(text)
         if repeated_patterns:
             return True
         
@@ -427,8 +459,10 @@ class DocumentValidator:
     
     def _has_data_integrity_issues(self, text: str) -> bool:
         """Check for data integrity issues"""
+        entities = self.extraction.scan(text)
+        
         # Check for impossible values
-        amounts = self._extract_amounts(text)
+        amounts = entities["amounts"]
         if amounts:
             # Check for unreasonably large amounts
             max_amount = max(amounts)
@@ -436,7 +470,7 @@ class DocumentValidator:
                 return True
         
         # Check for inconsistent dates
-        dates = self._extract_dates(text)
+        dates = entities["dates"]
         if len(dates) > 1:
             try:
                 parsed_dates = []
@@ -455,76 +489,15 @@ class DocumentValidator:
         
         return False
     
-    def _extract_amounts(self, text: str) -> List[float]:
-        """Extract monetary amounts"""
-        pattern = r'\$?\s*\d{1,3}(?:,\d{3})*(?:\.\d{2})?'
-        matches = re.findall(pattern, text)
-        
-        amounts = []
-        for match in matches:
-            try:
-                clean_amount = re.sub(r'[^\d.]', '', match)
-                if clean_amount and '.' in clean_amount:
-                    amounts.append(float(clean_amount))
-            except ValueError:
-                continue
-        
-        return amounts
-    
-    def _extract_dates(self, text: str) -> List[str]:
-        """Extract dates"""
-        date_patterns = [
-            r'\d{1,2}/\d{1,2}/\d{4}',
-            r'\d{1,2}-\d{1,2}-\d{4}',
-            r'\d{4}-\d{1,2}-\d{1,2}'
-        ]
-        
-        dates = []
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text)
-            dates.extend(matches)
-        
-        return list(set(dates))
-    
     async def _extract_medical_data(self, text: str) -> Dict[str, Any]:
         """Extract medical bill specific data"""
         data = {}
         
-        # Patient name
-        patient_patterns = [
-            r'(?:Patient|Name):\s*([A-Za-z\s]+)',
-            r'Patient Name:\s*([A-Za-z\s]+)'
-        ]
-        
-        for pattern in patient_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                data["patient_name"] = match.group(1).strip()
-                break
-        
-        # Service date
-        service_patterns = [
-            r'(?:Service|Date of Service):\s*(\d{1,2}/\d{1,2}/\d{4})',
-            r'Date:\s*(\d{1,2}/\d{1,2}/\d{4})'
-        ]
-        
-        for pattern in service_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                data["service_date"] = match.group(1)
-                break
-        
-        # Provider
-        provider_patterns = [
-            r'(?:Provider|Doctor|Physician):\s*([A-Za-z\s]+)',
-            r'(?:Hospital|Clinic):\s*([A-Za-z\s]+)'
-        ]
-        
-        for pattern in provider_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                data["provider"] = match.group(1).strip()
-                break
+        # Patient name, service date and provider
+        for field in ("patient_name", "service_date", "provider"):
+            value = self.extraction.first_value(field, text)
+            if value:
+                data[field] = value
         
         return data
     
@@ -533,38 +506,24 @@ class DocumentValidator:
         data = {}
         
         # VIN
-        vin_match = re.search(self.patterns["vin"], text)
-        if vin_match:
-            data["vin"] = vin_match.group()
+        vins = self.extraction.scan(text)["vins"]
+        if vins:
+            data["vin"] = vins[0]
         
         # Vehicle info
-        vehicle_patterns = [
-            r'(\d{4})\s+([A-Za-z]+)\s+([A-Za-z]+)',  # Year Make Model
-            r'Vehicle:\s*([A-Za-z0-9\s]+)'
-        ]
-        
-        for pattern in vehicle_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                if len(match.groups()) == 3:
-                    data["vehicle_year"] = match.group(1)
-                    data["vehicle_make"] = match.group(2)
-                    data["vehicle_model"] = match.group(3)
-                else:
-                    data["vehicle_info"] = match.group(1).strip()
-                break
+        match = self.extraction.first_match("vehicle", text)
+        if match:
+            if len(match.groups()) == 3:
+                data["vehicle_year"] = match.group(1)
+                data["vehicle_make"] = match.group(2)
+                data["vehicle_model"] = match.group(3)
+            else:
+                data["vehicle_info"] = match.group(1).strip()
         
         # Damage description
-        damage_patterns = [
-            r'(?:Damage|Description):\s*([A-Za-z0-9\s,.-]+)',
-            r'(?:Repair|Fix):\s*([A-Za-z0-9\s,.-]+)'
-        ]
-        
-        for pattern in damage_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                data["damage_description"] = match.group(1).strip()
-                break
+        damage_description = self.extraction.first_value("damage_description", text)
+        if damage_description:
+            data["damage_description"] = damage_description
         
         return data
     
@@ -573,28 +532,14 @@ class DocumentValidator:
         data = {}
         
         # Invoice number
-        invoice_patterns = [
-            r'(?:Invoice|Receipt)\s*#?\s*(\w+)',
-            r'(?:Number|No):\s*(\w+)'
-        ]
-        
-        for pattern in invoice_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                data["invoice_number"] = match.group(1)
-                break
+        match = self.extraction.first_match("invoice_number", text)
+        if match:
+            data["invoice_number"] = match.group(1)
         
         # Vendor/Merchant
-        vendor_patterns = [
-            r'(?:From|Vendor|Company):\s*([A-Za-z\s]+)',
-            r'(?:Merchant|Business):\s*([A-Za-z\s]+)'
-        ]
-        
-        for pattern in vendor_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                data["vendor"] = match.group(1).strip()
-                break
+        vendor = self.extraction.first_value("vendor", text)
+        if vendor:
+            data["vendor"] = vendor
         
         return data
     
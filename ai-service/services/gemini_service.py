@@ -6,6 +6,8 @@ import base64
 from PIL import Image
 import io
 
+from utils.deadline import Deadline, DeadlineExceeded
+
 
 class GeminiService:
     """
@@ -48,8 +50,15 @@ class GeminiService:
             logger.error(f"Gemini connection test failed: {str(e)}")
             return False
     
-    async def analyze_claim_advanced(self, document_text: str, claim_type: str, images: List[str] = None) -> Dict[str, Any]:
-        """Advanced claim analysis using Gemini"""
+    async def analyze_claim_advanced(
+        self,
+        document_text: str,
+        claim_type: str,
+        images: List[str] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Dict[str, Any]:
+        """Advanced claim analysis using Gemini; the request is abandoned once the deadline passes"""
+        deadline = deadline or Deadline()
         try:
             if not self.model:
                 return {
@@ -75,7 +84,8 @@ class GeminiService:
             }}
             """
             
-            response = self.model.generate_content(prompt)
+            # The async client call is cancelled by the deadline rather than left running
+            response = await deadline.wait(self.model.generate_content_async(prompt), "gemini analysis")
             result = response.text
             
             # Try to parse JSON, fallback to text response
@@ -98,6 +108,14 @@ class GeminiService:
                 "model": self.model_name
             }
             
+        except DeadlineExceeded as e:
+            logger.warning(f"Gemini analysis cut short: {str(e)}")
+            return {
+                "status": "partial",
+                "message": str(e),
+                "analysis": None,
+                "deadline": deadline.summary()
+            }
         except Exception as e:
             logger.error(f"Error in Gemini analysis: {str(e)}")
             return {
@@ -1,18 +1,58 @@
 import asyncio
 import time
-import io
 from typing import Dict, Any, List, Optional
 import cv2
 import numpy as np
 from PIL import Image, ImageFilter
-import imagehash
 from loguru import logger
 import hashlib
 import base64
 
+from utils.color_analysis import (
+    DOMINANT_COLOR_MODES,
+    UNIQUE_COLOR_PIXEL_BUDGET,
+    count_unique_colors,
+    dominant_colors,
+    sample_pixels,
+)
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.executor import AnalysisExecutor
+from utils.forensics import analyze_edge_discontinuities, analyze_jpeg_blocking
+from utils.image_context import ImageContext
+from utils.image_decoder import DecodedImage, ImageTooLargeError, decode_image
+from utils.hash_index import PerceptualHashIndex
+from utils.perceptual_hash import compute_hashes, to_hex
+from utils.uploads import Buffer
+
 class ImageAnalysisService:
-    def __init__(self):
+    def __init__(
+        self,
+        executor: Optional[AnalysisExecutor] = None,
+        dominant_color_mode: str = "histogram",
+        dominant_color_pixel_budget: int = 65536,
+        max_pixels: Optional[int] = 100_000_000,
+        analysis_max_pixels: Optional[int] = 4_000_000,
+        hash_index: Optional[PerceptualHashIndex] = None,
+    ):
         self.model_ready = False
+        # OpenCV calls release the GIL and run on the thread pool; pure NumPy
+        # loops and clustering hold it and run on the process pool
+        self.executor = executor or AnalysisExecutor()
+        # Dominant colors: "histogram" (quantized 3-D histogram), "minibatch"
+        # (MiniBatchKMeans) or "kmeans" (exhaustive, every pixel); the first
+        # two look at no more than dominant_color_pixel_budget sampled pixels
+        if dominant_color_mode not in DOMINANT_COLOR_MODES:
+            raise ValueError(f"Unknown dominant color mode: {dominant_color_mode}")
+        self.dominant_color_mode = dominant_color_mode
+        self.dominant_color_pixel_budget = dominant_color_pixel_budget
+        # Uploads over max_pixels are rejected from the header alone; the
+        # rest are decoded to at most analysis_max_pixels (None keeps full
+        # resolution), and only the JPEG grid check sees original pixels
+        self.max_pixels = max_pixels
+        self.analysis_max_pixels = analysis_max_pixels
+        # Every analyzed image is looked up in, then added to, the
+        # perceptual hash index to catch photos reused across claims
+        self.hash_index = hash_index
         
         # Image tampering detection parameters
         self.tampering_thresholds = {
@@ -85,55 +125,106 @@ class ImageAnalysisService:
         except Exception as e:
             logger.warning(f"⚠️ Damage models not available: {e}")
     
-    async def analyze_image(self, content: bytes, filename: str, analysis_type: str = "general") -> Dict[str, Any]:
-        """Comprehensive image analysis"""
+    async def analyze_image(
+        self,
+        content: Buffer,
+        filename: str,
+        analysis_type: str = "general",
+        claim_id: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Dict[str, Any]:
+        """Comprehensive image analysis; stages not reached before the deadline are skipped"""
         start_time = time.time()
+        deadline = deadline or Deadline()
         
         try:
             logger.info(f"🖼️ Analyzing image: {filename} (type: {analysis_type})")
             
-            # Load image
-            image = Image.open(io.BytesIO(content))
-            opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            
-            # Basic image analysis
-            basic_analysis = await self._basic_image_analysis(image, opencv_image)
-            
-            # Authenticity analysis
-            authenticity_analysis = await self._analyze_authenticity(image, opencv_image)
-            
-            # Content analysis based on type
-            content_analysis = await self._analyze_content(image, opencv_image, analysis_type)
-            
-            # Damage assessment if relevant
-            damage_analysis = None
-            if analysis_type in ["vehicle", "health", "property"]:
-                damage_analysis = await self._assess_damage(image, opencv_image, analysis_type)
-            
-            # Quality assessment
-            quality_analysis = await self._assess_quality(image, opencv_image)
+            # Decode straight to BGR at analysis resolution; PIL only reads the header
+            decoded = await self.executor.run_thread(
+                decode_image, content, self.max_pixels, self.analysis_max_pixels
+            )
+            if decoded.downscaled:
+                logger.info(
+                    f"📐 Decoded {filename} at {decoded.bgr.shape[1]}x{decoded.bgr.shape[0]} "
+                    f"(original {decoded.original_size[0]}x{decoded.original_size[1]})"
+                )
+            
+            # Derived planes (gray, HSV, LAB, edges, ...) are computed once and shared
+            context = ImageContext(
+                decoded.bgr,
+                original_size=decoded.original_size,
+                full_resolution_gray=decoded.full_resolution_gray,
+            )
+            
+            basic_analysis, duplicate_check, content_analysis, damage_analysis = {}, None, {}, None
+            # Neutral scores for stages the deadline cuts off
+            authenticity_analysis = {"score": 0.5}
+            quality_analysis = {"overall_score": 0.5}
+            
+            try:
+                # Basic image analysis
+                deadline.check("basic analysis")
+                basic_analysis = await self._basic_image_analysis(decoded, context)
+                
+                # Near-duplicates of previously seen images
+                duplicate_check = await self.check_duplicates(
+                    basic_analysis.get("perceptual_hashes", {}),
+                    content_hash or hashlib.sha256(content).hexdigest(),
+                    claim_id,
+                    filename,
+                )
+                
+                # Authenticity analysis (EXIF comes from the original header)
+                deadline.check("authenticity analysis")
+                authenticity_analysis = await self._analyze_authenticity(decoded.source, context)
+                
+                # Content analysis based on type
+                deadline.check("content analysis")
+                content_analysis = await self._analyze_content(context, analysis_type)
+                
+                # Damage assessment if relevant
+                if analysis_type in ["vehicle", "health", "property"]:
+                    deadline.check("damage assessment")
+                    damage_analysis = await self._assess_damage(context, analysis_type)
+                
+                # Quality assessment
+                deadline.check("quality assessment")
+                quality_analysis = await self._assess_quality(context)
+                
+            except DeadlineExceeded as e:
+                logger.warning(f"⏱️ Analysis of {filename} cut short: {e}")
             
             processing_time = time.time() - start_time
             
             result = {
                 "filename": filename,
                 "analysis_type": analysis_type,
+                "status": "partial" if deadline.partial else "success",
                 "authenticity_score": authenticity_analysis["score"],
-                "quality_score": quality_analysis["score"],
+                "quality_score": quality_analysis["overall_score"],
                 "processing_time": processing_time,
                 "basic_info": basic_analysis,
                 "authenticity_details": authenticity_analysis,
                 "content_analysis": content_analysis,
-                "quality_details": quality_analysis
+                "quality_details": quality_analysis,
+                "duplicate_check": duplicate_check,
             }
             
             if damage_analysis:
                 result["damage_assessment"] = damage_analysis
                 result["estimated_cost"] = damage_analysis.get("estimated_cost", 0)
             
+            if deadline.partial:
+                result["deadline"] = deadline.summary()
+            
             logger.info(f"✅ Image analysis completed: {filename}")
             return result
             
+        except ImageTooLargeError:
+            logger.warning(f"⚠️ Rejected oversized image: {filename}")
+            raise
         except Exception as e:
             logger.error(f"❌ Error analyzing image {filename}: {e}")
             return {
@@ -144,66 +235,112 @@ class ImageAnalysisService:
                 "processing_time": time.time() - start_time
             }
     
-    async def _basic_image_analysis(self, image: Image.Image, opencv_image: np.ndarray) -> Dict[str, Any]:
+    async def _basic_image_analysis(self, decoded: DecodedImage, context: ImageContext) -> Dict[str, Any]:
         """Extract basic image information"""
         try:
-            # Image dimensions and properties
-            width, height = image.size
-            channels = len(image.getbands())
-            mode = image.mode
-            
-            # File size estimation
-            img_bytes = io.BytesIO()
-            image.save(img_bytes, format='JPEG')
-            file_size = len(img_bytes.getvalue())
-            
-            # Color analysis
-            colors = image.getcolors(maxcolors=256*256*256)
-            unique_colors = len(colors) if colors else 0
-            
-            # Calculate image hash for deduplication
-            img_hash = str(imagehash.average_hash(image))
-            
-            return {
-                "dimensions": {"width": width, "height": height},
-                "channels": channels,
-                "mode": mode,
-                "file_size_bytes": file_size,
-                "unique_colors": unique_colors,
-                "image_hash": img_hash,
-                "aspect_ratio": width / height if height > 0 else 0
-            }
-            
+            return await self.executor.run_thread(self._basic_image_analysis_kernel, decoded, context)
         except Exception as e:
             logger.error(f"❌ Error in basic image analysis: {e}")
             return {"error": str(e)}
     
-    async def _analyze_authenticity(self, image: Image.Image, opencv_image: np.ndarray) -> Dict[str, Any]:
+    @staticmethod
+    def _basic_image_analysis_kernel(decoded: DecodedImage, context: ImageContext) -> Dict[str, Any]:
+        """Dimensions, colors and perceptual hash (runs in a worker)"""
+        # Original dimensions and properties, from the header
+        width, height = decoded.original_size
+        channels = Image.getmodebands(decoded.original_mode)
+        mode = decoded.original_mode
+        
+        # Size of the upload itself
+        file_size = len(decoded.content)
+        
+        # Color analysis on a bounded sample of packed pixels
+        unique_colors = count_unique_colors(context.bgr)
+        
+        # Perceptual hashes for near-duplicate detection
+        hashes = compute_hashes(context.gray)
+        
+        return {
+            "dimensions": {"width": width, "height": height},
+            "channels": channels,
+            "mode": mode,
+            "file_size_bytes": file_size,
+            "unique_colors": unique_colors,
+            "unique_colors_sampled": context.pixel_count > UNIQUE_COLOR_PIXEL_BUDGET,
+            "image_hash": to_hex(hashes["ahash"]),
+            "perceptual_hashes": {kind: to_hex(value) for kind, value in hashes.items()},
+            "aspect_ratio": width / height if height > 0 else 0,
+            "analysis_dimensions": {"width": context.width, "height": context.height},
+        }
+    
+    async def check_duplicates(
+        self,
+        hashes: Dict[str, str],
+        image_key: str,
+        claim_id: Optional[str] = None,
+        filename: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Look an image's hex hashes up in the index, then register it"""
+        if self.hash_index is None or not hashes:
+            return {"checked": False, "matches": [], "match_count": 0}
+        try:
+            return await self.executor.run_thread(
+                self._check_duplicates_kernel, self.hash_index, hashes, image_key, claim_id, filename
+            )
+        except Exception as e:
+            logger.error(f"❌ Error checking for duplicate images: {e}")
+            return {"checked": False, "matches": [], "match_count": 0, "error": str(e)}
+    
+    @staticmethod
+    def _check_duplicates_kernel(
+        hash_index: PerceptualHashIndex,
+        hashes: Dict[str, str],
+        image_key: str,
+        claim_id: Optional[str],
+        filename: Optional[str],
+    ) -> Dict[str, Any]:
+        """Index lookup followed by registration (runs in a worker)"""
+        values = {kind: int(value, 16) for kind, value in hashes.items()}
+        matches = hash_index.lookup(values, exclude=(image_key, claim_id))
+        hash_index.add(image_key, values, claim_id=claim_id, filename=filename)
+        if matches:
+            logger.warning(f"⚠️ {filename} resembles {len(matches)} previously seen image(s)")
+        return {
+            "checked": True,
+            "max_distance": hash_index.max_distance,
+            "match_count": len(matches),
+            "reused_across_claims": any(m["claim_id"] != claim_id for m in matches),
+            "matches": matches,
+        }
+    
+    async def _analyze_authenticity(self, image: Image.Image, context: ImageContext) -> Dict[str, Any]:
         """Analyze image for signs of tampering or manipulation"""
         try:
             authenticity_indicators = []
             authenticity_score = 1.0  # Start with high authenticity
             
             # Check for compression artifacts
-            compression_score = await self._check_compression_artifacts(opencv_image)
+            compression_analysis = await self._check_compression_artifacts(context)
+            compression_score = compression_analysis["score"]
             if compression_score > self.tampering_thresholds["compression_artifacts"]:
                 authenticity_indicators.append("Suspicious compression artifacts detected")
                 authenticity_score -= 0.2
             
             # Check for noise patterns
-            noise_score = await self._check_noise_patterns(opencv_image)
+            noise_score = await self._check_noise_patterns(context)
             if noise_score > self.tampering_thresholds["noise_patterns"]:
                 authenticity_indicators.append("Unusual noise patterns detected")
                 authenticity_score -= 0.15
             
             # Check for color inconsistencies
-            color_score = await self._check_color_consistency(opencv_image)
+            color_score = await self._check_color_consistency(context)
             if color_score > self.tampering_thresholds["color_inconsistency"]:
                 authenticity_indicators.append("Color inconsistencies detected")
                 authenticity_score -= 0.2
             
             # Check for edge discontinuities
-            edge_score = await self._check_edge_discontinuities(opencv_image)
+            edge_analysis = await self._check_edge_discontinuities(context)
+            edge_score = edge_analysis["score"]
             if edge_score > self.tampering_thresholds["edge_discontinuity"]:
                 authenticity_indicators.append("Edge discontinuities suggest editing")
                 authenticity_score -= 0.25
@@ -221,9 +358,11 @@ class ImageAnalysisService:
                 "score": authenticity_score,
                 "indicators": authenticity_indicators,
                 "compression_score": compression_score,
+                "compression_analysis": compression_analysis,
                 "noise_score": noise_score,
                 "color_score": color_score,
                 "edge_score": edge_score,
+                "edge_analysis": edge_analysis,
                 "exif_analysis": exif_analysis
             }
             
@@ -231,162 +370,123 @@ class ImageAnalysisService:
             logger.error(f"❌ Error in authenticity analysis: {e}")
             return {"score": 0.5, "error": str(e)}
     
-    async def _check_compression_artifacts(self, image: np.ndarray) -> float:
+    async def _check_compression_artifacts(self, context: ImageContext) -> Dict[str, Any]:
         """Check for suspicious compression artifacts"""
         try:
-            # Convert to grayscale for analysis
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Apply DCT to detect compression artifacts
-            dct = cv2.dct(np.float32(gray))
-            
-            # Analyze frequency distribution
-            freq_variance = np.var(dct)
-            
-            # Detect blocking artifacts (8x8 patterns typical of JPEG)
-            block_variance = 0
-            h, w = gray.shape
-            for i in range(0, h-8, 8):
-                for j in range(0, w-8, 8):
-                    block = gray[i:i+8, j:j+8]
-                    block_variance += np.var(block)
-            
-            block_variance /= ((h//8) * (w//8))
-            
-            # Calculate compression artifact score
-            artifact_score = min(1.0, (freq_variance / 1000 + block_variance / 100) / 2)
-            
-            return artifact_score
-            
+            # Vectorized OpenCV/NumPy work; cheaper on a thread than pickling the frame
+            return await self.executor.run_thread(self._check_compression_artifacts_kernel, context)
         except Exception as e:
             logger.error(f"❌ Error checking compression artifacts: {e}")
-            return 0.0
+            return {"score": 0.0, "error": str(e)}
+    
+    @staticmethod
+    def _check_compression_artifacts_kernel(context: ImageContext) -> Dict[str, Any]:
+        """JPEG blocking, grid alignment and double quantization (runs in a worker)"""
+        # Blockwise DCT and 8x8 boundary statistics with a per-block heatmap
+        return analyze_jpeg_blocking(context.full_gray)
     
-    async def _check_noise_patterns(self, image: np.ndarray) -> float:
+    async def _check_noise_patterns(self, context: ImageContext) -> float:
         """Check for unusual noise patterns that might indicate manipulation"""
         try:
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Apply noise analysis
-            blur = cv2.GaussianBlur(gray, (5, 5), 0)
-            noise = cv2.subtract(gray, blur)
-            
-            # Calculate noise statistics
-            noise_mean = np.mean(noise)
-            noise_std = np.std(noise)
-            
-            # Check for periodic patterns in noise
-            fft = np.fft.fft2(noise)
-            fft_magnitude = np.abs(fft)
-            
-            # Look for suspicious peaks in frequency domain
-            sorted_magnitudes = np.sort(fft_magnitude.flatten())
-            top_magnitudes = sorted_magnitudes[-10:]
-            magnitude_ratio = np.max(top_magnitudes) / np.mean(top_magnitudes) if np.mean(top_magnitudes) > 0 else 0
-            
-            # Calculate noise pattern score
-            noise_score = min(1.0, (noise_std / 50 + magnitude_ratio / 100) / 2)
-            
-            return noise_score
-            
+            # Only the gray plane crosses the process boundary
+            gray = await self.executor.run_thread(lambda: context.gray)
+            return await self.executor.run_process(self._check_noise_patterns_kernel, gray)
         except Exception as e:
             logger.error(f"❌ Error checking noise patterns: {e}")
             return 0.0
     
-    async def _check_color_consistency(self, image: np.ndarray) -> float:
+    @staticmethod
+    def _check_noise_patterns_kernel(gray: np.ndarray) -> float:
+        """Noise residual statistics and spectrum peaks (runs in a worker)"""
+        # Apply noise analysis
+        blur = cv2.GaussianBlur(gray, (5, 5), 0)
+        noise = cv2.subtract(gray, blur)
+        
+        # Calculate noise statistics
+        noise_mean = np.mean(noise)
+        noise_std = np.std(noise)
+        
+        # Check for periodic patterns in noise
+        fft = np.fft.fft2(noise)
+        fft_magnitude = np.abs(fft)
+        
+        # Look for suspicious peaks in frequency domain
+        sorted_magnitudes = np.sort(fft_magnitude.flatten())
+        top_magnitudes = sorted_magnitudes[-10:]
+        magnitude_ratio = np.max(top_magnitudes) / np.mean(top_magnitudes) if np.mean(top_magnitudes) > 0 else 0
+        
+        # Calculate noise pattern score
+        noise_score = min(1.0, (noise_std / 50 + magnitude_ratio / 100) / 2)
+        
+        return noise_score
+    
+    async def _check_color_consistency(self, context: ImageContext) -> float:
         """Check for color inconsistencies across the image"""
         try:
-            # Convert to LAB color space for better color analysis
-            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-            
-            # Divide image into regions and analyze color distribution
-            h, w = lab.shape[:2]
-            regions = []
-            
-            # Create 4x4 grid of regions
-            for i in range(4):
-                for j in range(4):
-                    start_y = i * h // 4
-                    end_y = (i + 1) * h // 4
-                    start_x = j * w // 4
-                    end_x = (j + 1) * w // 4
-                    
-                    region = lab[start_y:end_y, start_x:end_x]
-                    regions.append(region)
-            
-            # Calculate color statistics for each region
-            color_stats = []
-            for region in regions:
-                l_mean, a_mean, b_mean = np.mean(region, axis=(0, 1))
-                l_std, a_std, b_std = np.std(region, axis=(0, 1))
-                color_stats.append([l_mean, a_mean, b_mean, l_std, a_std, b_std])
-            
-            color_stats = np.array(color_stats)
-            
-            # Check for outlier regions
-            mean_stats = np.mean(color_stats, axis=0)
-            std_stats = np.std(color_stats, axis=0)
-            
-            outlier_count = 0
-            for stats in color_stats:
-                deviations = np.abs(stats - mean_stats) / (std_stats + 1e-8)
-                if np.any(deviations > 2):  # More than 2 standard deviations
-                    outlier_count += 1
-            
-            # Calculate color consistency score
-            consistency_score = outlier_count / len(regions)
-            
-            return consistency_score
-            
+            return await self.executor.run_thread(self._check_color_consistency_kernel, context)
         except Exception as e:
             logger.error(f"❌ Error checking color consistency: {e}")
             return 0.0
     
-    async def _check_edge_discontinuities(self, image: np.ndarray) -> float:
+    @staticmethod
+    def _check_color_consistency_kernel(context: ImageContext) -> float:
+        """Outlier regions in LAB statistics (runs in a worker)"""
+        # LAB color space for better color analysis
+        lab = context.lab
+        
+        # Divide image into regions and analyze color distribution
+        h, w = lab.shape[:2]
+        regions = []
+        
+        # Create 4x4 grid of regions
+        for i in range(4):
+            for j in range(4):
+                start_y = i * h // 4
+                end_y = (i + 1) * h // 4
+                start_x = j * w // 4
+                end_x = (j + 1) * w // 4
+                
+                region = lab[start_y:end_y, start_x:end_x]
+                regions.append(region)
+        
+        # Calculate color statistics for each region
+        color_stats = []
+        for region in regions:
+            l_mean, a_mean, b_mean = np.mean(region, axis=(0, 1))
+            l_std, a_std, b_std = np.std(region, axis=(0, 1))
+            color_stats.append([l_mean, a_mean, b_mean, l_std, a_std, b_std])
+        
+        color_stats = np.array(color_stats)
+        
+        # Check for outlier regions
+        mean_stats = np.mean(color_stats, axis=0)
+        std_stats = np.std(color_stats, axis=0)
+        
+        outlier_count = 0
+        for stats in color_stats:
+            deviations = np.abs(stats - mean_stats) / (std_stats + 1e-8)
+            if np.any(deviations > 2):  # More than 2 standard deviations
+                outlier_count += 1
+        
+        # Calculate color consistency score
+        consistency_score = outlier_count / len(regions)
+        
+        return consistency_score
+    
+    async def _check_edge_discontinuities(self, context: ImageContext) -> Dict[str, Any]:
         """Check for edge discontinuities that might indicate splicing"""
         try:
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Apply edge detection
-            edges = cv2.Canny(gray, 50, 150)
-            
-            # Find contours
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Analyze edge continuity
-            discontinuity_count = 0
-            total_edges = 0
-            
-            for contour in contours:
-                if len(contour) > 10:  # Only consider significant contours
-                    total_edges += 1
-                    
-                    # Check for sudden direction changes
-                    points = contour.reshape(-1, 2)
-                    
-                    for i in range(2, len(points) - 2):
-                        # Calculate angle changes
-                        v1 = points[i] - points[i-1]
-                        v2 = points[i+1] - points[i]
-                        
-                        # Calculate angle between vectors
-                        angle = np.arccos(np.clip(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2) + 1e-8), -1, 1))
-                        
-                        # Check for sharp angle changes (potential splicing indicators)
-                        if angle > np.pi / 3:  # More than 60 degrees
-                            discontinuity_count += 1
-                            break
-            
-            # Calculate discontinuity score
-            discontinuity_score = discontinuity_count / max(total_edges, 1)
-            
-            return discontinuity_score
-            
+            # Canny/findContours plus vectorized angle math; runs on a thread
+            return await self.executor.run_thread(self._check_edge_discontinuities_kernel, context)
         except Exception as e:
             logger.error(f"❌ Error checking edge discontinuities: {e}")
-            return 0.0
+            return {"score": 0.0, "error": str(e)}
+    
+    @staticmethod
+    def _check_edge_discontinuities_kernel(context: ImageContext) -> Dict[str, Any]:
+        """Sharp turns along Canny contours with a spatial map (runs in a worker)"""
+        # Turning angles for all contours at once
+        return analyze_edge_discontinuities(context.edges)
     
     async def _analyze_exif_data(self, image: Image.Image) -> Dict[str, Any]:
         """Analyze EXIF data for authenticity indicators"""
@@ -432,21 +532,21 @@ class ImageAnalysisService:
             logger.error(f"❌ Error analyzing EXIF data: {e}")
             return {"suspicious": False, "issues": [], "error": str(e)}
     
-    async def _analyze_content(self, image: Image.Image, opencv_image: np.ndarray, analysis_type: str) -> Dict[str, Any]:
+    async def _analyze_content(self, context: ImageContext, analysis_type: str) -> Dict[str, Any]:
         """Analyze image content based on type"""
         try:
             content_analysis = {}
             
             # Object detection (simplified)
-            detected_objects = await self._detect_objects(opencv_image, analysis_type)
+            detected_objects = await self._detect_objects(context, analysis_type)
             content_analysis["detected_objects"] = detected_objects
             
             # Text detection in image
-            detected_text = await self._detect_text_in_image(opencv_image)
+            detected_text = await self._detect_text_in_image(context)
             content_analysis["detected_text"] = detected_text
             
             # Scene analysis
-            scene_analysis = await self._analyze_scene(opencv_image, analysis_type)
+            scene_analysis = await self._analyze_scene(context, analysis_type)
             content_analysis["scene_analysis"] = scene_analysis
             
             return content_analysis
@@ -455,47 +555,51 @@ class ImageAnalysisService:
             logger.error(f"❌ Error in content analysis: {e}")
             return {"error": str(e)}
     
-    async def _detect_objects(self, image: np.ndarray, analysis_type: str) -> List[Dict[str, Any]]:
+    async def _detect_objects(self, context: ImageContext, analysis_type: str) -> List[Dict[str, Any]]:
         """Detect objects relevant to the claim type"""
         try:
-            # This is a simplified implementation
-            # In production, use YOLO, SSD, or other object detection models
-            
-            detected_objects = []
-            
-            # Use color-based detection as a simple example
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            
-            if analysis_type == "vehicle":
-                # Look for car-like shapes and colors
-                # This is very simplified - real implementation would use trained models
-                car_colors = [
-                    ([0, 0, 0], [180, 255, 50]),      # Dark colors (black, dark blue, etc.)
-                    ([0, 0, 200], [180, 30, 255]),    # Light colors (white, silver, etc.)
-                ]
-                
-                for i, (lower, upper) in enumerate(car_colors):
-                    mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
-                    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                    
-                    for contour in contours:
-                        area = cv2.contourArea(contour)
-                        if area > 1000:  # Significant area
-                            x, y, w, h = cv2.boundingRect(contour)
-                            detected_objects.append({
-                                "type": "vehicle_part",
-                                "confidence": 0.6,  # Simplified confidence
-                                "bbox": [x, y, w, h],
-                                "area": area
-                            })
-            
-            return detected_objects[:10]  # Limit to top 10 detections
-            
+            return await self.executor.run_thread(self._detect_objects_kernel, context, analysis_type)
         except Exception as e:
             logger.error(f"❌ Error detecting objects: {e}")
             return []
     
-    async def _detect_text_in_image(self, image: np.ndarray) -> List[str]:
+    @staticmethod
+    def _detect_objects_kernel(context: ImageContext, analysis_type: str) -> List[Dict[str, Any]]:
+        """Color-mask object candidates (runs in a worker)"""
+        # This is a simplified implementation
+        # In production, use YOLO, SSD, or other object detection models
+        
+        detected_objects = []
+        
+        # Use color-based detection as a simple example
+        hsv = context.hsv
+        
+        if analysis_type == "vehicle":
+            # Look for car-like shapes and colors
+            # This is very simplified - real implementation would use trained models
+            car_colors = [
+                ([0, 0, 0], [180, 255, 50]),      # Dark colors (black, dark blue, etc.)
+                ([0, 0, 200], [180, 30, 255]),    # Light colors (white, silver, etc.)
+            ]
+            
+            for i, (lower, upper) in enumerate(car_colors):
+                mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
+                contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                
+                for contour in contours:
+                    area = cv2.contourArea(contour)
+                    if area > 1000:  # Significant area
+                        x, y, w, h = cv2.boundingRect(contour)
+                        detected_objects.append({
+                            "type": "vehicle_part",
+                            "confidence": 0.6,  # Simplified confidence
+                            "bbox": [x, y, w, h],
+                            "area": area
+                        })
+        
+        return detected_objects[:10]  # Limit to top 10 detections
+    
+    async def _detect_text_in_image(self, context: ImageContext) -> List[str]:
         """Detect text in the image"""
         try:
             # This would integrate with OCR service in a real implementation
@@ -505,79 +609,82 @@ class ImageAnalysisService:
             logger.error(f"❌ Error detecting text: {e}")
             return []
     
-    async def _analyze_scene(self, image: np.ndarray, analysis_type: str) -> Dict[str, Any]:
+    async def _analyze_scene(self, context: ImageContext, analysis_type: str) -> Dict[str, Any]:
         """Analyze the scene context"""
         try:
-            scene_analysis = {}
-            
-            # Lighting analysis
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            brightness = np.mean(gray)
-            contrast = np.std(gray)
-            
-            scene_analysis["lighting"] = {
-                "brightness": float(brightness),
-                "contrast": float(contrast),
-                "quality": "good" if 50 < brightness < 200 and contrast > 20 else "poor"
-            }
+            # Lighting and focus analysis
+            scene_analysis = await self.executor.run_thread(self._scene_lighting_kernel, context)
             
             # Color analysis
-            dominant_colors = await self._get_dominant_colors(image)
+            dominant_colors = await self._get_dominant_colors(context.bgr)
             scene_analysis["dominant_colors"] = dominant_colors
             
-            # Focus/blur analysis
-            blur_score = cv2.Laplacian(gray, cv2.CV_64F).var()
-            scene_analysis["focus_quality"] = {
-                "blur_score": float(blur_score),
-                "quality": "sharp" if blur_score > 100 else "blurred"
-            }
-            
             return scene_analysis
             
         except Exception as e:
             logger.error(f"❌ Error analyzing scene: {e}")
             return {"error": str(e)}
     
+    @staticmethod
+    def _scene_lighting_kernel(context: ImageContext) -> Dict[str, Any]:
+        """Lighting and focus statistics (runs in a worker)"""
+        scene_analysis = {}
+        
+        # Lighting analysis
+        brightness, contrast = context.gray_stats
+        
+        scene_analysis["lighting"] = {
+            "brightness": float(brightness),
+            "contrast": float(contrast),
+            "quality": "good" if 50 < brightness < 200 and contrast > 20 else "poor"
+        }
+        
+        # Focus/blur analysis
+        blur_score = context.laplacian_variance
+        scene_analysis["focus_quality"] = {
+            "blur_score": float(blur_score),
+            "quality": "sharp" if blur_score > 100 else "blurred"
+        }
+        
+        return scene_analysis
+    
     async def _get_dominant_colors(self, image: np.ndarray, k: int = 5) -> List[List[int]]:
         """Get dominant colors in the image"""
         try:
-            # Reshape image to be a list of pixels
-            pixels = image.reshape(-1, 3)
-            
-            # Use k-means clustering to find dominant colors
-            from sklearn.cluster import KMeans
-            
-            kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-            kmeans.fit(pixels)
-            
-            # Get the dominant colors
-            dominant_colors = kmeans.cluster_centers_.astype(int)
-            
-            return dominant_colors.tolist()
-            
+            # Only the exhaustive kmeans mode looks at every pixel
+            pixel_budget = None if self.dominant_color_mode == "kmeans" else self.dominant_color_pixel_budget
+            pixels = sample_pixels(image, pixel_budget)
+            if self.dominant_color_mode == "histogram":
+                return await self.executor.run_thread(self._get_dominant_colors_kernel, pixels, k, self.dominant_color_mode)
+            return await self.executor.run_process(self._get_dominant_colors_kernel, pixels, k, self.dominant_color_mode)
         except Exception as e:
             logger.error(f"❌ Error getting dominant colors: {e}")
             return []
     
-    async def _assess_damage(self, image: Image.Image, opencv_image: np.ndarray, damage_type: str) -> Dict[str, Any]:
+    @staticmethod
+    def _get_dominant_colors_kernel(pixels: np.ndarray, k: int, mode: str) -> List[List[int]]:
+        """Quantized histogram or k-means over sampled pixels (runs in a worker)"""
+        return dominant_colors(pixels, k, mode)
+    
+    async def _assess_damage(self, context: ImageContext, damage_type: str) -> Dict[str, Any]:
         """Assess damage based on claim type"""
         try:
             damage_assessment = {}
             
             # Damage severity analysis
-            severity = await self._assess_damage_severity(opencv_image, damage_type)
+            severity = await self._assess_damage_severity(context, damage_type)
             damage_assessment["severity"] = severity
             
             # Cost estimation based on damage
-            estimated_cost = await self._estimate_damage_cost(opencv_image, damage_type, severity)
+            estimated_cost = await self._estimate_damage_cost(context, damage_type, severity)
             damage_assessment["estimated_cost"] = estimated_cost
             
             # Damage location analysis
-            damage_locations = await self._identify_damage_locations(opencv_image, damage_type)
+            damage_locations = await self._identify_damage_locations(context, damage_type)
             damage_assessment["damage_locations"] = damage_locations
             
             # Consistency check
-            consistency_score = await self._check_damage_consistency(opencv_image, damage_type, severity)
+            consistency_score = await self._check_damage_consistency(context, damage_type, severity)
             damage_assessment["consistency_score"] = consistency_score
             
             return damage_assessment
@@ -586,63 +693,62 @@ class ImageAnalysisService:
             logger.error(f"❌ Error assessing damage: {e}")
             return {"error": str(e)}
     
-    async def _assess_damage_severity(self, image: np.ndarray, damage_type: str) -> Dict[str, Any]:
+    async def _assess_damage_severity(self, context: ImageContext, damage_type: str) -> Dict[str, Any]:
         """Assess the severity of damage in the image"""
         try:
-            # Convert to different color spaces for analysis
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            
-            # Edge detection to find damage patterns
-            edges = cv2.Canny(gray, 50, 150)
-            edge_density = np.sum(edges > 0) / (edges.shape[0] * edges.shape[1])
-            
-            # Color variance analysis (damaged areas often have different colors)
-            color_variance = np.var(image, axis=(0, 1))
-            total_variance = np.sum(color_variance)
-            
-            # Texture analysis
-            texture_score = cv2.Laplacian(gray, cv2.CV_64F).var()
-            
-            # Calculate damage indicators
-            damage_indicators = {
-                "edge_density": float(edge_density),
-                "color_variance": float(total_variance),
-                "texture_irregularity": float(texture_score)
-            }
-            
-            # Determine severity based on indicators
-            if damage_type == "vehicle":
-                if edge_density > 0.1 and total_variance > 1000:
-                    severity_level = "severe"
-                    severity_score = 0.8
-                elif edge_density > 0.05 and total_variance > 500:
-                    severity_level = "moderate"
-                    severity_score = 0.5
-                else:
-                    severity_level = "minor"
-                    severity_score = 0.2
-            else:
-                # Generic severity assessment
-                severity_score = min(1.0, (edge_density * 5 + total_variance / 1000) / 2)
-                if severity_score > 0.7:
-                    severity_level = "severe"
-                elif severity_score > 0.4:
-                    severity_level = "moderate"
-                else:
-                    severity_level = "minor"
-            
-            return {
-                "level": severity_level,
-                "score": severity_score,
-                "indicators": damage_indicators
-            }
-            
+            return await self.executor.run_thread(self._assess_damage_severity_kernel, context, damage_type)
         except Exception as e:
             logger.error(f"❌ Error assessing damage severity: {e}")
             return {"level": "unknown", "score": 0.5, "error": str(e)}
     
-    async def _estimate_damage_cost(self, image: np.ndarray, damage_type: str, severity: Dict[str, Any]) -> float:
+    @staticmethod
+    def _assess_damage_severity_kernel(context: ImageContext, damage_type: str) -> Dict[str, Any]:
+        """Edge, color and texture severity indicators (runs in a worker)"""
+        # Edge detection to find damage patterns
+        edge_density = context.edge_density
+        
+        # Color variance analysis (damaged areas often have different colors)
+        color_variance = context.channel_variance
+        total_variance = np.sum(color_variance)
+        
+        # Texture analysis
+        texture_score = context.laplacian_variance
+        
+        # Calculate damage indicators
+        damage_indicators = {
+            "edge_density": float(edge_density),
+            "color_variance": float(total_variance),
+            "texture_irregularity": float(texture_score)
+        }
+        
+        # Determine severity based on indicators
+        if damage_type == "vehicle":
+            if edge_density > 0.1 and total_variance > 1000:
+                severity_level = "severe"
+                severity_score = 0.8
+            elif edge_density > 0.05 and total_variance > 500:
+                severity_level = "moderate"
+                severity_score = 0.5
+            else:
+                severity_level = "minor"
+                severity_score = 0.2
+        else:
+            # Generic severity assessment
+            severity_score = min(1.0, (edge_density * 5 + total_variance / 1000) / 2)
+            if severity_score > 0.7:
+                severity_level = "severe"
+            elif severity_score > 0.4:
+                severity_level = "moderate"
+            else:
+                severity_level = "minor"
+        
+        return {
+            "level": severity_level,
+            "score": severity_score,
+            "indicators": damage_indicators
+        }
+    
+    async def _estimate_damage_cost(self, context: ImageContext, damage_type: str, severity: Dict[str, Any]) -> float:
         """Estimate repair/replacement cost based on damage"""
         try:
             base_costs = {
@@ -664,48 +770,48 @@ class ImageAnalysisService:
             logger.error(f"❌ Error estimating damage cost: {e}")
             return 1000.0  # Default estimate
     
-    async def _identify_damage_locations(self, image: np.ndarray, damage_type: str) -> List[Dict[str, Any]]:
+    async def _identify_damage_locations(self, context: ImageContext, damage_type: str) -> List[Dict[str, Any]]:
         """Identify locations of damage in the image"""
         try:
-            locations = []
-            
-            # Convert to grayscale for analysis
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Find areas with high edge density (potential damage)
-            edges = cv2.Canny(gray, 50, 150)
-            kernel = np.ones((10, 10), np.uint8)
-            dilated = cv2.dilate(edges, kernel, iterations=1)
-            
-            # Find contours
-            contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if area > 500:  # Significant damage area
-                    x, y, w, h = cv2.boundingRect(contour)
-                    
-                    # Calculate relative position
-                    img_h, img_w = image.shape[:2]
-                    rel_x = x / img_w
-                    rel_y = y / img_h
-                    
-                    # Determine location description
-                    location_desc = self._get_location_description(rel_x, rel_y, damage_type)
-                    
-                    locations.append({
-                        "description": location_desc,
-                        "bbox": [x, y, w, h],
-                        "relative_position": [rel_x, rel_y],
-                        "area": area
-                    })
-            
-            return locations[:5]  # Return top 5 damage locations
-            
+            return await self.executor.run_thread(self._identify_damage_locations_kernel, context, damage_type)
         except Exception as e:
             logger.error(f"❌ Error identifying damage locations: {e}")
             return []
     
+    def _identify_damage_locations_kernel(self, context: ImageContext, damage_type: str) -> List[Dict[str, Any]]:
+        """Dilated edge regions large enough to be damage (runs in a worker)"""
+        locations = []
+        
+        # Find areas with high edge density (potential damage)
+        edges = context.edges
+        kernel = np.ones((10, 10), np.uint8)
+        dilated = cv2.dilate(edges, kernel, iterations=1)
+        
+        # Find contours
+        contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area > 500:  # Significant damage area
+                x, y, w, h = cv2.boundingRect(contour)
+                
+                # Calculate relative position
+                img_h, img_w = context.height, context.width
+                rel_x = x / img_w
+                rel_y = y / img_h
+                
+                # Determine location description
+                location_desc = self._get_location_description(rel_x, rel_y, damage_type)
+                
+                locations.append({
+                    "description": location_desc,
+                    "bbox": [x, y, w, h],
+                    "relative_position": [rel_x, rel_y],
+                    "area": area
+                })
+        
+        return locations[:5]  # Return top 5 damage locations
+    
     def _get_location_description(self, rel_x: float, rel_y: float, damage_type: str) -> str:
         """Get location description based on relative position"""
         if damage_type == "vehicle":
@@ -726,87 +832,89 @@ class ImageAnalysisService:
             v_pos = "upper" if rel_y < 0.33 else "lower" if rel_y > 0.66 else "middle"
             return f"{v_pos} {h_pos}"
     
-    async def _check_damage_consistency(self, image: np.ndarray, damage_type: str, severity: Dict[str, Any]) -> float:
+    async def _check_damage_consistency(self, context: ImageContext, damage_type: str, severity: Dict[str, Any]) -> float:
         """Check if damage is consistent with claim type and severity"""
         try:
-            # This is a simplified consistency check
-            # In production, use trained models for specific damage types
-            
-            consistency_score = 1.0
-            
-            # Check if damage patterns match expected type
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            edges = cv2.Canny(gray, 50, 150)
-            
-            # Different damage types have different edge patterns
-            edge_density = np.sum(edges > 0) / (edges.shape[0] * edges.shape[1])
-            expected_edge_density = {
-                "vehicle": 0.05,  # Vehicles have moderate edge density when damaged
-                "health": 0.02,   # Medical images typically have lower edge density
-                "property": 0.08  # Property damage often has high edge density
-            }
-            
-            expected = expected_edge_density.get(damage_type, 0.05)
-            density_diff = abs(edge_density - expected) / expected
-            
-            if density_diff > 0.5:  # More than 50% difference
-                consistency_score -= 0.3
-            
-            # Check severity consistency
-            severity_score = severity.get("score", 0.5)
-            if damage_type == "vehicle" and severity_score > 0.8:
-                # Very severe vehicle damage should have specific characteristics
-                # This is simplified - real implementation would check for specific patterns
-                pass
-            
-            return max(0.0, consistency_score)
-            
+            return await self.executor.run_thread(self._check_damage_consistency_kernel, context, damage_type, severity)
         except Exception as e:
             logger.error(f"❌ Error checking damage consistency: {e}")
             return 0.5
     
-    async def _assess_quality(self, image: Image.Image, opencv_image: np.ndarray) -> Dict[str, Any]:
+    @staticmethod
+    def _check_damage_consistency_kernel(context: ImageContext, damage_type: str, severity: Dict[str, Any]) -> float:
+        """Edge density against the expected profile (runs in a worker)"""
+        # This is a simplified consistency check
+        # In production, use trained models for specific damage types
+        
+        consistency_score = 1.0
+        
+        # Different damage types have different edge patterns
+        edge_density = context.edge_density
+        expected_edge_density = {
+            "vehicle": 0.05,  # Vehicles have moderate edge density when damaged
+            "health": 0.02,   # Medical images typically have lower edge density
+            "property": 0.08  # Property damage often has high edge density
+        }
+        
+        expected = expected_edge_density.get(damage_type, 0.05)
+        density_diff = abs(edge_density - expected) / expected
+        
+        if density_diff > 0.5:  # More than 50% difference
+            consistency_score -= 0.3
+        
+        # Check severity consistency
+        severity_score = severity.get("score", 0.5)
+        if damage_type == "vehicle" and severity_score > 0.8:
+            # Very severe vehicle damage should have specific characteristics
+            # This is simplified - real implementation would check for specific patterns
+            pass
+        
+        return max(0.0, consistency_score)
+    
+    async def _assess_quality(self, context: ImageContext) -> Dict[str, Any]:
         """Assess overall image quality"""
         try:
-            quality_metrics = {}
-            
-            # Resolution quality
-            width, height = image.size
-            total_pixels = width * height
-            quality_metrics["resolution"] = {
-                "width": width,
-                "height": height,
-                "total_pixels": total_pixels,
-                "quality": "high" if total_pixels > 1000000 else "medium" if total_pixels > 300000 else "low"
-            }
-            
-            # Blur detection
-            gray = cv2.cvtColor(opencv_image, cv2.COLOR_BGR2GRAY)
-            blur_score = cv2.Laplacian(gray, cv2.CV_64F).var()
-            quality_metrics["sharpness"] = {
-                "score": float(blur_score),
-                "quality": "sharp" if blur_score > 100 else "acceptable" if blur_score > 50 else "blurred"
-            }
-            
-            # Brightness and contrast
-            brightness = np.mean(gray)
-            contrast = np.std(gray)
-            quality_metrics["exposure"] = {
-                "brightness": float(brightness),
-                "contrast": float(contrast),
-                "quality": "good" if 50 < brightness < 200 and contrast > 20 else "poor"
-            }
-            
-            # Overall quality score
-            resolution_score = min(1.0, total_pixels / 1000000)
-            sharpness_score = min(1.0, blur_score / 200)
-            exposure_score = 1.0 if 50 < brightness < 200 and contrast > 20 else 0.5
-            
-            overall_score = (resolution_score + sharpness_score + exposure_score) / 3
-            quality_metrics["overall_score"] = overall_score
-            
-            return quality_metrics
-            
+            return await self.executor.run_thread(self._assess_quality_kernel, context)
         except Exception as e:
             logger.error(f"❌ Error assessing quality: {e}")
-            return {"overall_score": 0.5, "error": str(e)} 
\ No newline at end of file
+            return {"overall_score": 0.5, "error": str(e)} 
+    
+    @staticmethod
+    def _assess_quality_kernel(context: ImageContext) -> Dict[str, Any]:
+        """Resolution, sharpness and exposure metrics (runs in a worker)"""
+        quality_metrics = {}
+        
+        # Resolution quality of the upload, not of the analysis copy
+        width, height = context.original_size
+        total_pixels = width * height
+        quality_metrics["resolution"] = {
+            "width": width,
+            "height": height,
+            "total_pixels": total_pixels,
+            "quality": "high" if total_pixels > 1000000 else "medium" if total_pixels > 300000 else "low"
+        }
+        
+        # Blur detection
+        blur_score = context.laplacian_variance
+        quality_metrics["sharpness"] = {
+            "score": float(blur_score),
+            "quality": "sharp" if blur_score > 100 else "acceptable" if blur_score > 50 else "blurred"
+        }
+        
+        # Brightness and contrast
+        brightness, contrast = context.gray_stats
+        quality_metrics["exposure"] = {
+            "brightness": float(brightness),
+            "contrast": float(contrast),
+            "quality": "good" if 50 < brightness < 200 and contrast > 20 else "poor"
+        }
+        
+        # Overall quality score
+        resolution_score = min(1.0, total_pixels / 1000000)
+        sharpness_score = min(1.0, blur_score / 200)
+        exposure_score = 1.0 if 50 < brightness < 200 and contrast > 20 else 0.5
+        
+        overall_score = (resolution_score + sharpness_score + exposure_score) / 3
+        quality_metrics["overall_score"] = overall_score
+        
+        return quality_metrics 
\ No newline at end of file
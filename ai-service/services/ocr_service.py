@@ -1,22 +1,73 @@
 import asyncio
 import time
 import os
-import io
-from typing import Dict, Any, List, Optional
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 import cv2
 import numpy as np
 from PIL import Image
 import pytesseract
 import easyocr
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path, pdfinfo_from_path
+from pdf2image.exceptions import PDFPopplerTimeoutError
 from loguru import logger
-import re
+
+from utils.deadline import Deadline, DeadlineExceeded
+from utils.executor import AnalysisExecutor
+from utils.extraction import get_extraction_engine
+from utils.image_decoder import decode_gray
+from utils.micro_batcher import MicroBatcher
+from utils.ocr_router import OCREngineRouter, image_quality
+from utils.pdf_dpi import PageDPIPlanner, estimate_x_height
+from utils.tesseract import TesseractPool, parse_tesseract_data
+from utils.uploads import Buffer
+
+# Pages only share a detector batch when each side is within this factor of
+# the batch's first page, so padding to a common size stays cheap
+EASYOCR_BATCH_SIZE_RATIO = 1.25
+# Text crops per recognizer forward pass (EasyOCR's default is 1)
+EASYOCR_RECOGNIZER_BATCH = 16
 
 class OCRService:
-    def __init__(self):
+    def __init__(
+        self,
+        executor: Optional[AnalysisExecutor] = None,
+        pdf_streaming: bool = True,
+        pdf_page_window: int = 2,
+        router: Optional[OCREngineRouter] = None,
+        tesseract_pool: Optional[TesseractPool] = None,
+        easyocr_batch_size: int = 1,
+        easyocr_batch_window_ms: float = 0.0,
+        dpi_planner: Optional[PageDPIPlanner] = None,
+    ):
         self.tesseract_ready = False
         self.easyocr_ready = False
         self.easyocr_reader = None
+        # OCR engines release the GIL (EasyOCR runs torch kernels, Tesseract is a
+        # subprocess) and the EasyOCR reader cannot leave this process, so all
+        # OCR work goes to the thread pool
+        self.executor = executor or AnalysisExecutor()
+        # Streaming mode rasterizes PDF pages lazily; at most pdf_page_window
+        # pages are decoded and being OCR'd at any time
+        self.pdf_streaming = pdf_streaming
+        self.pdf_page_window = max(1, pdf_page_window)
+        self.extraction = get_extraction_engine()
+        # Chooses which engine reads a page first, from past outcomes
+        self.router = router or OCREngineRouter()
+        # Tesseract engines kept loaded between pages (pytesseract when unavailable)
+        self.tesseract_pool = tesseract_pool
+        # Rasterization DPI per PDF page, from a low-DPI probe of its print size
+        self.dpi_planner = dpi_planner or PageDPIPlanner()
+        # EasyOCR pages from all documents and requests are gathered for up to
+        # easyocr_batch_window_ms and read easyocr_batch_size at a time
+        self.easyocr_batcher = MicroBatcher(
+            self._easyocr_batch_kernel,
+            self.executor,
+            max_batch_size=easyocr_batch_size,
+            max_wait_seconds=easyocr_batch_window_ms / 1000,
+            compatible=self._batchable,
+        )
         
     async def initialize(self):
         """Initialize OCR engines"""
@@ -37,6 +88,9 @@ class OCRService:
     
     async def _init_tesseract(self):
         """Initialize Tesseract OCR"""
+        if self.tesseract_pool and await self.executor.run_thread(self.tesseract_pool.start):
+            self.tesseract_ready = True
+            return
         try:
             # Test Tesseract installation
             version = pytesseract.get_tesseract_version()
@@ -61,9 +115,17 @@ class OCRService:
         """Check if OCR service is ready"""
         return self.tesseract_ready or self.easyocr_ready
     
-    async def process_document(self, content: bytes, filename: str, document_type: str = "general") -> Dict[str, Any]:
-        """Process document with OCR"""
+    async def process_document(
+        self,
+        content: Buffer,
+        filename: str,
+        document_type: str = "general",
+        deadline: Optional[Deadline] = None,
+        path: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Process document with OCR; pages and engines not reached before the deadline are skipped"""
         start_time = time.time()
+        deadline = deadline or Deadline()
         
         try:
             logger.info(f"📄 Processing document: {filename}")
@@ -72,21 +134,33 @@ class OCRService:
             file_ext = filename.lower().split('.')[-1] if '.' in filename else ''
             
             if file_ext == 'pdf':
-                images = await self._pdf_to_images(content)
-                text_results = []
-                confidence_scores = []
+                # Poppler reads from disk; a spooled upload is rendered where it lies
+                with self._pdf_file(content, path) as pdf_path:
+                    if self.pdf_streaming:
+                        page_results = await self._process_pdf_streaming(pdf_path, document_type, deadline)
+                    else:
+                        images = await self._pdf_to_images(pdf_path, document_type, deadline)
+                        page_results = []
+                        for page_number, image in enumerate(images, start=1):
+                            if deadline.expired:
+                                deadline.skip(f"page {page_number}")
+                                page_results.append(self._skipped_page())
+                                continue
+                            image = await self._adapt_page(pdf_path, page_number, image, document_type, deadline)
+                            page_results.append(await self._process_image(image, document_type, deadline))
                 
-                for i, image in enumerate(images):
-                    result = await self._process_image(image, document_type)
-                    text_results.append(result['text'])
-                    confidence_scores.append(result['confidence'])
+                # Pages cut off by the deadline contribute neither text nor confidence
+                done = [result for result in page_results if not result.get("skipped")]
+                text_results = [result['text'] for result in done]
+                confidence_scores = [result['confidence'] for result in done]
                 
                 combined_text = '\n\n--- PAGE BREAK ---\n\n'.join(text_results)
                 avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else 0
                 
             elif file_ext in ['jpg', 'jpeg', 'png', 'bmp', 'tiff']:
-                image = Image.open(io.BytesIO(content))
-                result = await self._process_image(image, document_type)
+                # Decoded straight to the gray plane OCR works on
+                image = await self.executor.run_thread(decode_gray, content)
+                result = await self._process_image(image, document_type, deadline)
                 combined_text = result['text']
                 avg_confidence = result['confidence']
             
@@ -106,8 +180,10 @@ class OCRService:
                     "filename": filename,
                     "document_type": document_type,
                     "file_type": file_ext,
-                    "pages_processed": len(images) if file_ext == 'pdf' else 1
+                    "pages_processed": len(done) if file_ext == 'pdf' else int(not result.get("skipped")),
+                    "pages_total": len(page_results) if file_ext == 'pdf' else 1,
                 },
+                "partial": deadline.partial,
                 "processing_time": processing_time
             }
             
@@ -115,69 +191,225 @@ class OCRService:
             logger.error(f"❌ Error processing document {filename}: {e}")
             raise
     
-    async def _pdf_to_images(self, pdf_bytes: bytes) -> List[Image.Image]:
-        """Convert PDF to images"""
+    @staticmethod
+    @contextmanager
+    def _pdf_file(content: Buffer, path: Optional[str]) -> Iterator[str]:
+        """PDF on disk for poppler: the spooled upload itself, or a temp copy of in-memory content"""
+        if path:
+            yield path
+            return
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+            pdf_file.write(content)
+            pdf_file.flush()
+            yield pdf_file.name
+    
+    async def _render_pages(self, pdf_path: str, dpi: int, deadline: Deadline, page_number: Optional[int] = None) -> List[Image.Image]:
+        """Rasterize one page, or all of them, to gray at dpi"""
+        pages = {"first_page": page_number, "last_page": page_number} if page_number else {}
+        return await self.executor.run_thread(
+            convert_from_path, pdf_path, dpi=dpi, grayscale=True, timeout=deadline.timeout(), **pages
+        )
+    
+    async def _adapt_page(self, pdf_path: str, page_number: int, page: Image.Image, document_type: str, deadline: Deadline) -> Image.Image:
+        """The page at the DPI its print needs: the probe itself, or a fresh render when time allows"""
+        if not self.dpi_planner.should_probe(document_type):
+            self.dpi_planner.record(self.dpi_planner.dpi, probed=False)
+            return page
+        
+        x_height = await self.executor.run_thread(estimate_x_height, np.asarray(page))
+        dpi = self.dpi_planner.choose(x_height, document_type)
+        if dpi != self.dpi_planner.probe_dpi:
+            try:
+                rendered = await self._render_pages(pdf_path, dpi, deadline, page_number)
+            except PDFPopplerTimeoutError:
+                # Reading the probe beats skipping the page
+                logger.warning(f"⏱️ Page {page_number} kept at {self.dpi_planner.probe_dpi} DPI at the deadline")
+                rendered, dpi = [], self.dpi_planner.probe_dpi
+            if rendered:
+                page.close()
+                page = rendered[0]
+        self.dpi_planner.record(dpi, probed=True, page_pixels=page.width * page.height)
+        return page
+    
+    async def _pdf_to_images(self, pdf_path: str, document_type: str, deadline: Deadline) -> List[Image.Image]:
+        """Convert PDF to images (probe resolution when the document type is probed)"""
         try:
-            images = convert_from_bytes(pdf_bytes, dpi=300)
+            deadline.check("pdf rendering")
+            images = await self._render_pages(pdf_path, self.dpi_planner.first_dpi(document_type), deadline)
             logger.info(f"📄 Converted PDF to {len(images)} images")
             return images
+        except PDFPopplerTimeoutError:
+            deadline.skip("pdf rendering")
+            logger.warning("⏱️ PDF rendering stopped at the deadline")
+            return []
+        except DeadlineExceeded:
+            return []
         except Exception as e:
             logger.error(f"❌ Error converting PDF: {e}")
             raise
     
-    async def _process_image(self, image: Image.Image, document_type: str) -> Dict[str, Any]:
-        """Process single image with OCR"""
+    async def _process_pdf_streaming(self, pdf_path: str, document_type: str, deadline: Deadline) -> List[Dict[str, Any]]:
+        """OCR a PDF page by page, keeping at most pdf_page_window pages in memory"""
         try:
-            # Preprocess image
-            processed_image = await self._preprocess_image(image)
-            
-            # Try EasyOCR first (generally more accurate)
-            if self.easyocr_ready:
-                result = await self._easyocr_extract(processed_image)
-                if result['confidence'] > 0.5:  # Good confidence
-                    return result
+            info = await self.executor.run_thread(pdfinfo_from_path, pdf_path)
+            page_count = int(info.get("Pages", 0))
+            logger.info(f"📄 Streaming {page_count} PDF pages (window: {self.pdf_page_window})")
+            
+            window = asyncio.Semaphore(self.pdf_page_window)
+            
+            async def ocr_page(page_number: int) -> Dict[str, Any]:
+                async with window:
+                    # Pages still waiting for the window when time runs out are not rendered
+                    if deadline.expired:
+                        deadline.skip(f"page {page_number}")
+                        return self._skipped_page()
+                    try:
+                        pages = await self._render_pages(pdf_path, self.dpi_planner.first_dpi(document_type), deadline, page_number)
+                        if pages:
+                            pages[0] = await self._adapt_page(pdf_path, page_number, pages[0], document_type, deadline)
+                    except PDFPopplerTimeoutError:
+                        deadline.skip(f"page {page_number}")
+                        return self._skipped_page()
+                    try:
+                        if not pages:
+                            return {"text": "", "confidence": 0.0, "error": f"Page {page_number} not rendered"}
+                        return await self._process_image(pages[0], document_type, deadline)
+                    finally:
+                        # Release the page bitmap before the next page is rendered
+                        for page in pages:
+                            page.close()
+            
+            return await asyncio.gather(*(ocr_page(n) for n in range(1, page_count + 1)))
             
-            # Fallback to Tesseract
-            if self.tesseract_ready:
-                result = await self._tesseract_extract(processed_image, document_type)
+        except Exception as e:
+            logger.error(f"❌ Error streaming PDF: {e}")
+            raise
+    
+    @staticmethod
+    def _skipped_page() -> Dict[str, Any]:
+        return {"text": "", "confidence": 0.0, "skipped": True}
+    
+    async def _process_image(self, image: Union[Image.Image, np.ndarray], document_type: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Process single image with OCR, running the engine the router expects to succeed first"""
+        deadline = deadline or Deadline()
+        result = None
+        try:
+            # Preprocess image
+            deadline.check("preprocessing")
+            processed_image, quality = await self._preprocess_image(image)
+            
+            available = [engine for engine, ready in (("easyocr", self.easyocr_ready), ("tesseract", self.tesseract_ready)) if ready]
+            if not available:
+                raise Exception("No OCR engine available")
+            
+            strategy, engines = self.router.plan(document_type, quality, available)
+            if strategy == "race":
+                return await self._race_engines(engines, processed_image, document_type, quality, deadline)
+            
+            # The next engine only runs when the previous one was not confident
+            for position, engine in enumerate(engines):
+                deadline.check(engine)
+                if position:
+                    self.router.fallbacks += 1
+                candidate = await self._run_engine(engine, processed_image, document_type, quality, deadline)
+                if result is None or candidate["confidence"] > result["confidence"]:
+                    result = candidate
+                if self.router.accepts(candidate):
+                    break
+            return result
+            
+        except DeadlineExceeded:
+            # A low-confidence first pass is still better than nothing
+            if result and result.get("text"):
                 return result
-            
-            raise Exception("No OCR engine available")
-            
+            return self._skipped_page()
         except Exception as e:
             logger.error(f"❌ Error processing image: {e}")
             return {"text": "", "confidence": 0.0, "error": str(e)}
     
-    async def _preprocess_image(self, image: Image.Image) -> np.ndarray:
-        """Preprocess image for better OCR results"""
+    async def _run_engine(self, engine: str, image: np.ndarray, document_type: str, quality: str, deadline: Deadline) -> Dict[str, Any]:
+        """One OCR pass, recorded for the router"""
+        start = time.perf_counter()
+        if engine == "easyocr":
+            result = await self._easyocr_extract(image)
+        else:
+            result = await self._tesseract_extract(image, document_type, deadline)
+        self.router.record(document_type, quality, engine, result, time.perf_counter() - start)
+        return result
+    
+    async def _race_engines(self, engines: List[str], image: np.ndarray, document_type: str, quality: str, deadline: Deadline) -> Dict[str, Any]:
+        """Run every engine at once and keep the first confident result, cancelling the rest"""
+        tasks = {
+            asyncio.ensure_future(self._run_engine(engine, image, document_type, quality, deadline)): engine
+            for engine in engines
+        }
+        pending = set(tasks)
+        best, winner = None, None
         try:
-            # Convert PIL to OpenCV format
-            opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            
-            # Convert to grayscale
-            gray = cv2.cvtColor(opencv_image, cv2.COLOR_BGR2GRAY)
-            
-            # Noise removal
-            denoised = cv2.medianBlur(gray, 5)
-            
-            # Thresholding
-            _, thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            # Dilation and erosion to remove noise
-            kernel = np.ones((1, 1), np.uint8)
-            processed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-            
-            return processed
-            
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=deadline.remaining(), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    deadline.skip("ocr")
+                    break
+                for task in done:
+                    if task.exception() is not None:
+                        # Tesseract killed at the deadline
+                        continue
+                    result = task.result()
+                    if best is None or result["confidence"] > best["confidence"]:
+                        best, winner = result, tasks[task]
+                if best is not None and self.router.accepts(best):
+                    break
+        finally:
+            # A loser still queued never starts; one already inside an engine
+            # finishes in its worker thread and its result is dropped
+            for task in pending:
+                task.cancel()
+            self.router.cancelled += len(pending)
+        
+        if best is None:
+            raise DeadlineExceeded("Time budget exhausted during ocr")
+        self.router.record_race_win(document_type, quality, winner)
+        return best
+    
+    async def _preprocess_image(self, image: Union[Image.Image, np.ndarray]) -> Tuple[np.ndarray, str]:
+        """Preprocess image for better OCR results; also returns its quality bucket for the router"""
+        try:
+            return await self.executor.run_thread(self._preprocess_kernel, image)
         except Exception as e:
             logger.warning(f"⚠️ Image preprocessing failed: {e}")
             # Return original image as numpy array
-            return np.array(image.convert('L'))
+            return self._gray(image), "unknown"
+    
+    @staticmethod
+    def _gray(image: Union[Image.Image, np.ndarray]) -> np.ndarray:
+        """Uploads arrive as gray planes already; PDF pages as PIL images rendered in gray"""
+        if isinstance(image, np.ndarray):
+            return image
+        return np.asarray(image if image.mode == "L" else image.convert("L"))
+    
+    @staticmethod
+    def _preprocess_kernel(image: Union[Image.Image, np.ndarray]) -> Tuple[np.ndarray, str]:
+        """Grayscale, denoise and binarize a page, and bucket its quality (runs in a worker)"""
+        gray = OCRService._gray(image)
+        quality = image_quality(gray)
+        
+        # Noise removal
+        denoised = cv2.medianBlur(gray, 5)
+        
+        # Thresholding
+        _, thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        
+        # Dilation and erosion to remove noise
+        kernel = np.ones((1, 1), np.uint8)
+        processed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+        
+        return processed, quality
     
     async def _easyocr_extract(self, image: np.ndarray) -> Dict[str, Any]:
         """Extract text using EasyOCR"""
         try:
-            results = self.easyocr_reader.readtext(image, detail=1)
+            results = await self.easyocr_batcher.submit(image)
             
             extracted_text = []
             confidence_scores = []
@@ -207,40 +439,68 @@ class OCRService:
             logger.error(f"❌ EasyOCR extraction failed: {e}")
             return {"text": "", "confidence": 0.0, "error": str(e)}
     
-    async def _tesseract_extract(self, image: np.ndarray, document_type: str) -> Dict[str, Any]:
-        """Extract text using Tesseract"""
+    @staticmethod
+    def _batchable(first: np.ndarray, other: np.ndarray) -> bool:
+        """Whether two pages are close enough in size to share a padded batch"""
+        return first.ndim == other.ndim and all(
+            max(a, b) <= min(a, b) * EASYOCR_BATCH_SIZE_RATIO
+            for a, b in zip(first.shape[:2], other.shape[:2])
+        )
+    
+    def _easyocr_batch_kernel(self, images: List[np.ndarray]) -> List[list]:
+        """readtext for several pages with one detector pass (runs in a worker)"""
+        if len(images) == 1:
+            return [self.easyocr_reader.readtext(images[0], detail=1, batch_size=EASYOCR_RECOGNIZER_BATCH)]
+        
+        # readtext_batched needs equal sizes; pages are padded with white at the
+        # right and bottom, so box coordinates stay those of the original page
+        height = max(image.shape[0] for image in images)
+        width = max(image.shape[1] for image in images)
+        padded = []
+        for image in images:
+            canvas = np.full((height, width) + image.shape[2:], 255, dtype=np.uint8)
+            canvas[:image.shape[0], :image.shape[1]] = image
+            padded.append(canvas)
+        try:
+            return self.easyocr_reader.readtext_batched(padded, detail=1, batch_size=EASYOCR_RECOGNIZER_BATCH)
+        except Exception as e:
+            logger.warning(f"⚠️ Batched EasyOCR failed, reading {len(images)} pages one by one: {e}")
+            return [self.easyocr_reader.readtext(image, detail=1, batch_size=EASYOCR_RECOGNIZER_BATCH) for image in images]
+    
+    async def _tesseract_extract(self, image: np.ndarray, document_type: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Extract text using Tesseract in a single run, stopped once the deadline passes"""
+        deadline = deadline or Deadline()
         try:
             # Configure Tesseract based on document type
             config = self._get_tesseract_config(document_type)
             
-            # Extract text
-            text = pytesseract.image_to_string(image, config=config)
-            
-            # Get confidence data
-            data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
-            
-            # Calculate average confidence
-            confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
-            avg_confidence = sum(confidences) / len(confidences) / 100 if confidences else 0
-            
-            # Extract bounding boxes for high-confidence text
-            bounding_boxes = []
-            for i in range(len(data['text'])):
-                if int(data['conf'][i]) > 30 and data['text'][i].strip():
-                    bounding_boxes.append({
-                        "text": data['text'][i],
-                        "confidence": int(data['conf'][i]) / 100,
-                        "bbox": [data['left'][i], data['top'][i], 
-                                data['width'][i], data['height'][i]]
-                    })
+            # One recognition pass; text, confidences and boxes all come from its TSV
+            if self.tesseract_pool and self.tesseract_pool.available:
+                data = await self.executor.run_thread(
+                    self.tesseract_pool.recognize, image, config, deadline.remaining()
+                )
+            else:
+                # pytesseract treats a timeout of 0 as unlimited
+                data = await self.executor.run_thread(
+                    pytesseract.image_to_data, image, config=config, output_type=pytesseract.Output.DICT,
+                    timeout=deadline.timeout(0),
+                )
             
-            return {
-                "text": text.strip(),
-                "confidence": avg_confidence,
-                "bounding_boxes": bounding_boxes,
-                "engine": "tesseract"
-            }
+            return {**parse_tesseract_data(data), "engine": "tesseract"}
             
+        except DeadlineExceeded:
+            raise
+        except TimeoutError as e:
+            # The pool ran out of time waiting for an engine or recognizing
+            deadline.skip("tesseract")
+            raise DeadlineExceeded(str(e)) from e
+        except RuntimeError as e:
+            if deadline.expired:
+                # pytesseract killed the process at the timeout
+                deadline.skip("tesseract")
+                raise DeadlineExceeded(str(e)) from e
+            logger.error(f"❌ Tesseract extraction failed: {e}")
+            return {"text": "", "confidence": 0.0, "error": str(e)}
         except Exception as e:
             logger.error(f"❌ Tesseract extraction failed: {e}")
             return {"text": "", "confidence": 0.0, "error": str(e)}
@@ -261,17 +521,18 @@ class OCRService:
         try:
             structured_data = {}
             
-            # Common patterns
-            structured_data["amounts"] = self._extract_amounts(text)
-            structured_data["dates"] = self._extract_dates(text)
-            structured_data["phone_numbers"] = self._extract_phone_numbers(text)
-            structured_data["emails"] = self._extract_emails(text)
+            # Common patterns, found in a single pass over the text
+            entities = self.extraction.scan(text)
+            structured_data["amounts"] = sorted(entities["amounts"], reverse=True)  # Highest amounts first
+            structured_data["dates"] = entities["dates"]
+            structured_data["phone_numbers"] = entities["phones"]
+            structured_data["emails"] = entities["emails"]
             
             # Document-specific extraction
             if document_type == "medical_bill":
-                structured_data.update(self._extract_medical_data(text))
+                structured_data.update(self._extract_medical_data(text, entities))
             elif document_type == "vehicle_estimate":
-                structured_data.update(self._extract_vehicle_data(text))
+                structured_data.update(self._extract_vehicle_data(text, entities))
             elif document_type in ["invoice", "receipt"]:
                 structured_data.update(self._extract_invoice_data(text))
             
@@ -281,83 +542,31 @@ class OCRService:
             logger.error(f"❌ Error extracting structured data: {e}")
             return {}
     
-    def _extract_amounts(self, text: str) -> List[float]:
-        """Extract monetary amounts from text"""
-        # Pattern for currency amounts
-        pattern = r'\$?\s*\d{1,3}(?:,\d{3})*(?:\.\d{2})?'
-        matches = re.findall(pattern, text)
-        
-        amounts = []
-        for match in matches:
-            try:
-                # Clean and convert to float
-                clean_amount = re.sub(r'[^\d.]', '', match)
-                if clean_amount and '.' in clean_amount:
-                    amounts.append(float(clean_amount))
-            except ValueError:
-                continue
-        
-        return sorted(amounts, reverse=True)  # Return highest amounts first
-    
-    def _extract_dates(self, text: str) -> List[str]:
-        """Extract dates from text"""
-        date_patterns = [
-            r'\d{1,2}/\d{1,2}/\d{4}',  # MM/DD/YYYY
-            r'\d{1,2}-\d{1,2}-\d{4}',  # MM-DD-YYYY
-            r'\d{4}-\d{1,2}-\d{1,2}',  # YYYY-MM-DD
-            r'\w+ \d{1,2}, \d{4}',     # Month DD, YYYY
-        ]
-        
-        dates = []
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text)
-            dates.extend(matches)
-        
-        return list(set(dates))  # Remove duplicates
-    
-    def _extract_phone_numbers(self, text: str) -> List[str]:
-        """Extract phone numbers from text"""
-        pattern = r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'
-        return re.findall(pattern, text)
-    
-    def _extract_emails(self, text: str) -> List[str]:
-        """Extract email addresses from text"""
-        pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        return re.findall(pattern, text)
-    
-    def _extract_medical_data(self, text: str) -> Dict[str, Any]:
+    def _extract_medical_data(self, text: str, entities: Dict[str, List[Any]]) -> Dict[str, Any]:
         """Extract medical-specific data"""
         data = {}
         
         # Look for patient name (after "Patient:" or similar)
-        patient_pattern = r'(?:Patient|Name):\s*([A-Za-z\s]+)'
-        patient_match = re.search(patient_pattern, text, re.IGNORECASE)
-        if patient_match:
-            data["patient_name"] = patient_match.group(1).strip()
-        
-        # Look for diagnosis codes (ICD-10)
-        icd_pattern = r'\b[A-Z]\d{2}(?:\.\d{1,2})?\b'
-        data["diagnosis_codes"] = re.findall(icd_pattern, text)
+        patient_name = self.extraction.first_value("patient_name", text)
+        if patient_name:
+            data["patient_name"] = patient_name
         
-        # Look for procedure codes (CPT)
-        cpt_pattern = r'\b\d{5}\b'
-        data["procedure_codes"] = re.findall(cpt_pattern, text)
+        # Diagnosis (ICD-10) and procedure (CPT) codes
+        data["diagnosis_codes"] = entities["icd_codes"]
+        data["procedure_codes"] = entities["cpt_codes"]
         
         return data
     
-    def _extract_vehicle_data(self, text: str) -> Dict[str, Any]:
+    def _extract_vehicle_data(self, text: str, entities: Dict[str, List[Any]]) -> Dict[str, Any]:
         """Extract vehicle-specific data"""
         data = {}
         
         # Look for VIN
-        vin_pattern = r'\b[A-HJ-NPR-Z0-9]{17}\b'
-        vin_match = re.search(vin_pattern, text)
-        if vin_match:
-            data["vin"] = vin_match.group()
+        if entities["vins"]:
+            data["vin"] = entities["vins"][0]
         
         # Look for license plate
-        plate_pattern = r'\b[A-Z0-9]{2,8}\b'
-        plates = re.findall(plate_pattern, text)
+        plates = self.extraction.findall("license_plate", text)
         if plates:
             data["license_plates"] = plates
         
@@ -368,14 +577,12 @@ class OCRService:
         data = {}
         
         # Look for invoice number
-        invoice_pattern = r'(?:Invoice|Receipt|Bill)\s*#?\s*(\w+)'
-        invoice_match = re.search(invoice_pattern, text, re.IGNORECASE)
+        invoice_match = self.extraction.first_match("invoice_number", text)
         if invoice_match:
             data["invoice_number"] = invoice_match.group(1)
         
         # Look for tax amounts
-        tax_pattern = r'(?:Tax|GST|VAT):\s*\$?(\d+(?:\.\d{2})?)'
-        tax_match = re.search(tax_pattern, text, re.IGNORECASE)
+        tax_match = self.extraction.first_match("tax_amount", text)
         if tax_match:
             data["tax_amount"] = float(tax_match.group(1))
         
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from utils.hash_index import PerceptualHashIndex, _KindTable, _flip_masks
+from utils.perceptual_hash import HASH_KINDS, hamming_distance
+
+
+def flip_bits(value, count, rng):
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def brute_force(stored, query, max_distance):
+    return sorted(
+        (image_id, hamming_distance(value, query))
+        for image_id, value in stored
+        if hamming_distance(value, query) <= max_distance
+    )
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 6, 11])
+def test_search_matches_brute_force(max_distance):
+    rng = random.Random(max_distance)
+    table = _KindTable(tail_capacity=64)
+    bases = [rng.getrandbits(64) for _ in range(50)]
+    stored = []
+    # Random hashes plus near neighbours of a few bases, across bulk load, merges and the tail
+    values = [rng.getrandbits(64) for _ in range(2000)]
+    values += [flip_bits(rng.choice(bases), rng.randint(0, 12), rng) for _ in range(1000)]
+    table.load(values[:1000], list(range(1000)))
+    stored.extend(enumerate(values[:1000]))
+    for image_id, value in enumerate(values[1000:], start=1000):
+        table.add(value, image_id)
+        stored.append((image_id, value))
+        if table.needs_merge and image_id % 3:
+            table.merge()
+    assert table.tail_size > 0 and len(table) == len(values)
+
+    masks = _flip_masks(max_distance // 4)
+    for query in bases + [flip_bits(base, 2, rng) for base in bases] + values[::97]:
+        assert sorted(table.search(query, masks, max_distance)) == brute_force(stored, query, max_distance)
+
+
+def test_merge_built_outside_the_lock_keeps_later_additions():
+    rng = random.Random(7)
+    table = _KindTable(tail_capacity=8)
+    stored = [(image_id, rng.getrandbits(64)) for image_id in range(15)]
+    for image_id, value in stored[:10]:
+        table.add(value, image_id)
+    merged = table.build_merge(table.snapshot())
+    for image_id, value in stored[10:]:
+        table.add(value, image_id)
+    assert table.swap(merged)
+    assert table.tail_size == 5 and len(table) == 15
+
+    # A merge built from a snapshot taken before another swap is dropped
+    stale = table.build_merge(table.snapshot())
+    table.merge()
+    assert not table.swap(stale)
+
+    masks = _flip_masks(1)
+    for _, value in stored:
+        assert sorted(table.search(value, masks, 6)) == brute_force(stored, value, 6)
+
+
+def test_index_lookup_matches_brute_force():
+    rng = random.Random(3)
+    index = PerceptualHashIndex(path=None, max_distance=6)
+    images = {}
+    for n in range(3000):
+        base = rng.getrandbits(64) if n % 3 != 2 else flip_bits(images[f"img{n - 1}"]["phash"], rng.randint(1, 8), rng)
+        images[f"img{n}"] = {kind: base if kind == "phash" else rng.getrandbits(64) for kind in HASH_KINDS}
+        index.add(f"img{n}", images[f"img{n}"])
+
+    for n in range(0, 3000, 37):
+        query = {"phash": flip_bits(images[f"img{n}"]["phash"], 2, rng)}
+        expected = {
+            key for key, hashes in images.items()
+            if hamming_distance(hashes["phash"], query["phash"]) <= 6
+        }
+        found = {match["image_key"] for match in index.lookup(query, limit=len(images))}
+        assert found == expected
+    index.close()
@@ -0,0 +1,79 @@
+import asyncio
+import socket
+
+import httpx
+import pytest
+
+from utils.job_queue import JobQueue, JobStore
+
+PUBLIC = "93.184.216.34"
+
+
+def lookups(*answers):
+    """getaddrinfo stand-in returning one address per call, repeating the last"""
+    calls = []
+
+    async def getaddrinfo(host, port, *args, **kwargs):
+        address = answers[min(len(calls), len(answers) - 1)]
+        calls.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+    return getaddrinfo, calls
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Requests the webhook client would have sent"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200)
+
+    client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: client(transport=httpx.MockTransport(handler), **kwargs))
+    return requests
+
+
+def deliver(url, getaddrinfo):
+    """Submit-time check, then one delivery attempt; returns the job's webhook status"""
+    async def main():
+        asyncio.get_running_loop().getaddrinfo = getaddrinfo
+        queue = JobQueue(JobStore(path=None), {"document": None}, webhook_retries=1)
+        await queue.check_webhook(url)
+        job = await asyncio.to_thread(queue.store.create, "document", "a.png", {}, b"x", url)
+        await queue._notify(await queue.get(job["id"]))
+        return (await queue.get(job["id"]))["webhook_status"]
+    return asyncio.new_event_loop().run_until_complete(main())
+
+
+def test_delivery_connects_to_the_checked_address(sent):
+    getaddrinfo, calls = lookups(PUBLIC)
+
+    assert deliver("https://hooks.example.com:8443/done?x=1", getaddrinfo) == "delivered"
+    assert calls == ["hooks.example.com", "hooks.example.com"]
+    assert len(sent) == 1
+    assert sent[0].url == httpx.URL(f"https://{PUBLIC}:8443/done?x=1")
+    assert sent[0].headers["Host"] == "hooks.example.com:8443"
+    assert sent[0].extensions["sni_hostname"] == "hooks.example.com"
+
+
+def test_rebinding_to_loopback_is_refused(sent):
+    # Public for the submission check, loopback once the job is delivered
+    getaddrinfo, calls = lookups(PUBLIC, "127.0.0.1")
+
+    assert deliver("http://rebind.example.com/hook", getaddrinfo) == "failed"
+    assert len(calls) == 2
+    assert sent == []
+
+
+def test_allowlisted_host_is_posted_by_name(sent):
+    async def getaddrinfo(*args, **kwargs):
+        raise AssertionError("allowlisted hosts are not resolved by the check")
+
+    async def main():
+        asyncio.get_running_loop().getaddrinfo = getaddrinfo
+        queue = JobQueue(JobStore(path=None), {}, webhook_allowed_hosts=[".example.com"])
+        assert await queue.check_webhook("https://hooks.example.com/done") is None
+        with pytest.raises(ValueError):
+            await queue.check_webhook("https://example.org/done")
+    asyncio.new_event_loop().run_until_complete(main())
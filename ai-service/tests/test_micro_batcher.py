@@ -0,0 +1,36 @@
+import asyncio
+
+from utils.executor import AnalysisExecutor
+from utils.micro_batcher import MicroBatcher
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_items_get_their_own_results():
+    async def main():
+        batcher = MicroBatcher(lambda items: [item * 2 for item in items], AnalysisExecutor(), max_batch_size=4)
+        return await asyncio.gather(*(batcher.submit(n) for n in range(10))), batcher.get_stats()
+
+    results, stats = run(main())
+    assert results == [n * 2 for n in range(10)]
+    assert stats["items"] == 10
+    assert stats["largest_batch"] == 4
+
+
+def test_short_result_list_fails_every_caller():
+    async def main():
+        batcher = MicroBatcher(lambda items: [item * 2 for item in items[:-1]], AnalysisExecutor(), max_batch_size=3)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(n) for n in range(3)), return_exceptions=True),
+            timeout=5,
+        )
+        return results, batcher.get_stats()
+
+    results, stats = run(main())
+    assert len(results) == 3
+    for result in results:
+        assert isinstance(result, RuntimeError)
+        assert "2 results for 3 items" in str(result)
+    assert stats["running"] == 0
@@ -0,0 +1,246 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from loguru import logger
+
+
+def content_key(digest: str, kind: str, variant: str, pipeline_version: str) -> str:
+    """Cache key for an upload: its SHA-256 plus everything that changes the result"""
+    return f"{kind}:{variant}:{pipeline_version}:{digest}"
+
+
+class ResultCache:
+    """
+    Content-addressed cache for analysis results.
+
+    Results are stored as serialized JSON in an in-process LRU bounded by
+    total bytes, with an optional SQLite tier on disk so repeated uploads
+    are answered without re-running OCR/forensics, including after restart.
+    get/put may touch SQLite, so callers on the event loop run them in a
+    worker thread; the disk tier has its own lock, so memory hits never
+    wait behind disk I/O.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        disk_path: Optional[str] = None,
+        disk_max_bytes: int = 2 * 1024 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.disk_path = disk_path
+        self.disk_max_bytes = disk_max_bytes
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_writes = 0
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "oversized_skips": 0,
+        }
+
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path: str):
+        """Open (or create) the SQLite tier"""
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed)")
+            logger.info(f"💾 Result cache disk tier: {path}")
+        except Exception as e:
+            logger.warning(f"⚠️ Result cache disk tier unavailable: {e}")
+            self._db = None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a result, promoting disk hits into memory"""
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return json.loads(payload)
+
+        payload = self._disk_get(key)
+        with self._lock:
+            if payload is not None:
+                self.stats["disk_hits"] += 1
+                self._memory_put(key, payload)
+                return json.loads(payload)
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a JSON-serializable result"""
+        try:
+            payload = json.dumps(value, default=str).encode("utf-8")
+        except (TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Result not cacheable: {e}")
+            return
+
+        with self._lock:
+            self.stats["stores"] += 1
+            self._memory_put(key, payload)
+        self._disk_put(key, payload)
+
+    def _memory_put(self, key: str, payload: bytes):
+        if len(payload) > self.max_bytes:
+            self.stats["oversized_skips"] += 1
+            return
+
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+
+        self._memory[key] = payload
+        self._memory_bytes += len(payload)
+
+        while self._memory_bytes > self.max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats["memory_evictions"] += 1
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        try:
+            with self._disk_lock:
+                if not self._db:
+                    return None
+                row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+                return bytes(row[0])
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Result cache disk read failed: {e}")
+            return None
+
+    def _disk_put(self, key: str, payload: bytes):
+        try:
+            with self._disk_lock:
+                if not self._db:
+                    return
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                    (key, payload, len(payload), time.time()),
+                )
+                self._disk_writes += 1
+                if self._disk_writes % 100 == 0:
+                    self._disk_prune()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Result cache disk write failed: {e}")
+
+    def _disk_prune(self):
+        """Drop least recently used rows once the disk tier is over budget (disk lock held)"""
+        total, count = self._db.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM results").fetchone()
+        if total <= self.disk_max_bytes:
+            return
+
+        # Enough of the oldest rows, at the average size, to get back under budget
+        rows = math.ceil((total - self.disk_max_bytes) / (total / count))
+        cursor = self._db.execute(
+            "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed LIMIT ?)", (rows,)
+        )
+        with self._lock:
+            self.stats["disk_evictions"] += cursor.rowcount
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and tier sizes"""
+        disk_entries = 0
+        with self._disk_lock:
+            if self._db:
+                try:
+                    disk_entries = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "hits": hits,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_max_bytes": self.max_bytes,
+                "disk_enabled": self._db is not None,
+                "disk_entries": disk_entries,
+            }
+
+    def close(self):
+        """Close the disk tier"""
+        with self._disk_lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+
+
+class TTLCache:
+    """Count-bounded LRU whose entries also expire after ttl_seconds"""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
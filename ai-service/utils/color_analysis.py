@@ -0,0 +1,116 @@
+from typing import List, Optional
+import cv2
+import numpy as np
+
+DOMINANT_COLOR_MODES = ("histogram", "minibatch", "kmeans")
+UNIQUE_COLOR_PIXEL_BUDGET = 16384
+
+
+def sample_pixels(image: np.ndarray, pixel_budget: Optional[int] = 65536) -> np.ndarray:
+    """(N, 3) pixel array, strided so that N stays within pixel_budget (None keeps every pixel)"""
+    h, w = image.shape[:2]
+    if pixel_budget and h * w > pixel_budget:
+        step = int(np.ceil(np.sqrt(h * w / pixel_budget)))
+        image = image[::step, ::step]
+    return np.ascontiguousarray(image).reshape(-1, 3)
+
+
+def count_unique_colors(image: np.ndarray, pixel_budget: Optional[int] = UNIQUE_COLOR_PIXEL_BUDGET) -> int:
+    """
+    Distinct colors among at most pixel_budget sampled pixels.
+
+    Each pixel is packed into one uint32 (cvtColor to 4 channels, then a
+    view), so counting is a single sort of a small integer array.
+    """
+    sample = np.ascontiguousarray(sample_pixels(image, pixel_budget).reshape(-1, 1, 3))
+    if sample.size == 0:
+        return 0
+    packed = cv2.cvtColor(sample, cv2.COLOR_BGR2BGRA).view(np.uint32).ravel()
+    packed.sort()
+    return int(np.count_nonzero(packed[1:] != packed[:-1]) + 1)
+
+
+def dominant_colors_histogram(pixels: np.ndarray, k: int = 5, bits: int = 4, iterations: int = 8) -> List[List[int]]:
+    """
+    Dominant colors from a 3-D quantized color histogram.
+
+    Pixels are binned to `bits` per channel; the per-bin mean colors,
+    weighted by their counts, are then clustered with a few Lloyd
+    iterations seeded from heavy, well-separated bins. This is weighted
+    k-means over at most 2**(3*bits) points instead of over every pixel.
+    """
+    if len(pixels) == 0:
+        return []
+
+    pixels = pixels.astype(np.int64)
+    shift = 8 - bits
+    levels = 1 << bits
+    bins = ((pixels[:, 0] >> shift) * levels + (pixels[:, 1] >> shift)) * levels + (pixels[:, 2] >> shift)
+
+    counts = np.bincount(bins, minlength=levels ** 3)
+    occupied = np.nonzero(counts)[0]
+    weights = counts[occupied].astype(np.float64)
+    means = np.stack(
+        [np.bincount(bins, weights=pixels[:, c], minlength=levels ** 3)[occupied] for c in range(3)],
+        axis=1,
+    ) / weights[:, None]
+
+    # Deterministic k-means++ style seeding: the heaviest bin, then each
+    # next bin maximizing weight x squared distance to the chosen seeds
+    k = min(k, len(occupied))
+    seeds = [int(np.argmax(weights))]
+    nearest = np.square(means - means[seeds[0]]).sum(axis=1)
+    while len(seeds) < k:
+        index = int(np.argmax(weights * nearest))
+        if nearest[index] == 0:
+            break
+        seeds.append(index)
+        nearest = np.minimum(nearest, np.square(means - means[index]).sum(axis=1))
+    k = len(seeds)
+    centers = means[seeds].copy()
+
+    # Weighted Lloyd iterations on the bin means
+    for _ in range(iterations):
+        distances = np.linalg.norm(means[:, None, :] - centers[None, :, :], axis=2)
+        labels = np.argmin(distances, axis=1)
+        cluster_weights = np.bincount(labels, weights=weights, minlength=k)
+        for c in range(3):
+            sums = np.bincount(labels, weights=weights * means[:, c], minlength=k)
+            centers[:, c] = np.where(cluster_weights > 0, sums / np.maximum(cluster_weights, 1e-12), centers[:, c])
+
+    order = np.argsort(-cluster_weights)
+    return np.rint(centers[order]).astype(int).tolist()
+
+
+def dominant_colors_minibatch(pixels: np.ndarray, k: int = 5, random_state: int = 42) -> List[List[int]]:
+    """MiniBatchKMeans on an already bounded pixel sample, largest cluster first"""
+    from sklearn.cluster import MiniBatchKMeans
+
+    k = min(k, len(pixels))
+    if k == 0:
+        return []
+    kmeans = MiniBatchKMeans(n_clusters=k, random_state=random_state, n_init=3, batch_size=4096)
+    labels = kmeans.fit_predict(pixels.astype(np.float32))
+    order = np.argsort(-np.bincount(labels, minlength=k))
+    return kmeans.cluster_centers_[order].astype(int).tolist()
+
+
+def dominant_colors_kmeans(pixels: np.ndarray, k: int = 5, random_state: int = 42) -> List[List[int]]:
+    """Full KMeans (the original, exhaustive path)"""
+    from sklearn.cluster import KMeans
+
+    k = min(k, len(pixels))
+    if k == 0:
+        return []
+    kmeans = KMeans(n_clusters=k, random_state=random_state, n_init=10)
+    kmeans.fit(pixels)
+    return kmeans.cluster_centers_.astype(int).tolist()
+
+
+def dominant_colors(pixels: np.ndarray, k: int = 5, mode: str = "histogram") -> List[List[int]]:
+    """Dominant colors of a pixel array with the selected method"""
+    if mode == "minibatch":
+        return dominant_colors_minibatch(pixels, k)
+    if mode == "kmeans":
+        return dominant_colors_kmeans(pixels, k)
+    return dominant_colors_histogram(pixels, k)
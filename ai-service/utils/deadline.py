@@ -0,0 +1,71 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, List, Optional
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before a stage could start or finish"""
+
+
+class Deadline:
+    """
+    Time budget of one request, shared by every service it passes through.
+
+    Work is cancelled cooperatively: services call check() between pages
+    and stages and record what they skipped, and calls that support a
+    timeout (Tesseract, pdftoppm, network requests) get remaining(). A
+    Deadline without a budget never expires.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.budget = seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds if seconds is not None else None
+        self.skipped: List[str] = []
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None without a budget"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self, stage: str):
+        """Raise DeadlineExceeded, recording the stage as skipped, once the budget is spent"""
+        if self.expired:
+            self.skip(stage)
+            raise DeadlineExceeded(f"Time budget exhausted before {stage}")
+
+    def skip(self, stage: str):
+        if stage not in self.skipped:
+            self.skipped.append(stage)
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.skipped)
+
+    def timeout(self, unbounded: Any = None) -> Any:
+        """remaining() for calls taking a timeout argument, `unbounded` when there is no budget"""
+        remaining = self.remaining()
+        return unbounded if remaining is None else max(remaining, 0.001)
+
+    async def wait(self, awaitable: Awaitable[Any], stage: str) -> Any:
+        """Await with the remaining budget as timeout; awaitables that are cancellable stop early"""
+        if self.expired and asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        self.check(stage)
+        try:
+            return await asyncio.wait_for(awaitable, self.remaining())
+        except asyncio.TimeoutError:
+            self.skip(stage)
+            raise DeadlineExceeded(f"Time budget exhausted during {stage}")
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "budget_seconds": self.budget,
+            "elapsed_seconds": time.monotonic() - self.started_at,
+            "skipped_stages": list(self.skipped),
+        }
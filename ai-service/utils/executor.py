@@ -0,0 +1,141 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from loguru import logger
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict):
+    """Run fn in the worker and report how long it actually kept the worker busy"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+class _PoolStats:
+    """Counters for a single pool, only mutated from the event loop thread"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+    def as_dict(self, uptime: float) -> Dict[str, Any]:
+        workers = max(self.workers, 1)
+        finished = self.completed + self.failed
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "active": min(self.in_flight, workers),
+            "queue_depth": max(0, self.in_flight - workers),
+            "peak_in_flight": self.peak_in_flight,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "current_utilization": min(self.in_flight, workers) / workers,
+            "lifetime_utilization": min(1.0, self.busy_seconds / (workers * uptime)) if uptime > 0 else 0.0,
+            "avg_task_seconds": self.busy_seconds / finished if finished else 0.0,
+        }
+
+
+class AnalysisExecutor:
+    """
+    Runs blocking analysis work off the event loop.
+
+    GIL-bound kernels (pure NumPy/Python loops) go to a process pool so they
+    scale across cores; OpenCV, OCR engines and PDF rasterization release the
+    GIL and go to a thread pool. A pool configured with 0 workers falls back
+    to the next one (process -> thread -> inline on the loop).
+    """
+
+    def __init__(self, process_workers: int = 0, thread_workers: int = 0):
+        self.process_workers = max(0, process_workers)
+        self.thread_workers = max(0, thread_workers)
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._started_at = time.time()
+        self._stats = {
+            "process": _PoolStats(self.process_workers),
+            "thread": _PoolStats(self.thread_workers),
+            "inline": _PoolStats(1),
+        }
+
+    def start(self):
+        """Create the worker pools"""
+        if self.process_workers > 0 and self._process_pool is None:
+            # spawn keeps torch/OpenCV thread state out of the children
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        if self.thread_workers > 0 and self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_workers,
+                thread_name_prefix="analysis",
+            )
+        self._started_at = time.time()
+        logger.info(
+            f"⚙️ Analysis executor started "
+            f"(processes: {self.process_workers}, threads: {self.thread_workers})"
+        )
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pools"""
+        if self._process_pool:
+            self._process_pool.shutdown(wait=wait, cancel_futures=True)
+            self._process_pool = None
+        if self._thread_pool:
+            self._thread_pool.shutdown(wait=wait, cancel_futures=True)
+            self._thread_pool = None
+        logger.info("⚙️ Analysis executor stopped")
+
+    async def run_process(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a picklable, module-level kernel in the process pool"""
+        if self._process_pool is not None:
+            return await self._submit("process", self._process_pool, fn, args, kwargs)
+        return await self.run_thread(fn, *args, **kwargs)
+
+    async def run_thread(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a GIL-releasing call in the thread pool"""
+        if self._thread_pool is not None:
+            return await self._submit("thread", self._thread_pool, fn, args, kwargs)
+        return await self._submit("inline", None, fn, args, kwargs)
+
+    async def _submit(self, kind: str, pool, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        stats = self._stats[kind]
+        stats.submitted += 1
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        try:
+            if pool is None:
+                result, elapsed = _timed_call(fn, args, kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                result, elapsed = await loop.run_in_executor(pool, _timed_call, fn, args, kwargs)
+        except Exception:
+            stats.failed += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+
+        stats.completed += 1
+        stats.busy_seconds += elapsed
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and worker utilization per pool"""
+        uptime = time.time() - self._started_at
+        return {
+            "uptime_seconds": uptime,
+            "process_pool": self._stats["process"].as_dict(uptime),
+            "thread_pool": self._stats["thread"].as_dict(uptime),
+            "inline": {
+                "completed": self._stats["inline"].completed,
+                "failed": self._stats["inline"].failed,
+            },
+        }
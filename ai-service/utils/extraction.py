@@ -0,0 +1,148 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+MONTH_NAMES = (
+    r'(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?'
+    r'|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)'
+)
+
+# Entity patterns, combined into one alternation. Order matters: at any
+# position the first alternative that matches wins, so the more specific
+# entities (emails, dates, phones, VINs) are tried before bare numbers.
+ENTITY_PATTERNS: List[Tuple[str, str]] = [
+    ("email", r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b'),
+    ("date", r'\b\d{1,2}/\d{1,2}/\d{4}\b'                # MM/DD/YYYY
+             r'|\b\d{1,2}-\d{1,2}-\d{4}\b'               # MM-DD-YYYY
+             r'|\b\d{4}-\d{1,2}-\d{1,2}\b'               # YYYY-MM-DD
+             r'|\b' + MONTH_NAMES + r'\.? \d{1,2}, \d{4}\b'),  # Month DD, YYYY
+    ("phone", r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'),
+    ("vin", r'\b[A-HJ-NPR-Z0-9]{17}\b'),
+    ("amount", r'(?:\$\s*)?(?:\d{1,3}(?:,\d{3})+|\d+)\.\d{2}(?!\d)'),
+    ("icd", r'\b[A-Z]\d{2}(?:\.\d{1,2})?\b'),  # ICD-10 diagnosis codes
+    ("cpt", r'\b\d{5}\b'),                     # CPT procedure codes
+]
+
+# Labelled fields; the first pattern that matches wins
+FIELD_PATTERNS: Dict[str, List[str]] = {
+    "patient_name": [
+        r'(?:Patient|Name):\s*([A-Za-z\s]+)',
+        r'Patient Name:\s*([A-Za-z\s]+)',
+    ],
+    "service_date": [
+        r'(?:Service|Date of Service):\s*(\d{1,2}/\d{1,2}/\d{4})',
+        r'Date:\s*(\d{1,2}/\d{1,2}/\d{4})',
+    ],
+    "provider": [
+        r'(?:Provider|Doctor|Physician):\s*([A-Za-z\s]+)',
+        r'(?:Hospital|Clinic):\s*([A-Za-z\s]+)',
+    ],
+    "vehicle": [
+        r'(\d{4})\s+([A-Za-z]+)\s+([A-Za-z]+)',  # Year Make Model
+        r'Vehicle:\s*([A-Za-z0-9\s]+)',
+    ],
+    "damage_description": [
+        r'(?:Damage|Description):\s*([A-Za-z0-9\s,.-]+)',
+        r'(?:Repair|Fix):\s*([A-Za-z0-9\s,.-]+)',
+    ],
+    "invoice_number": [
+        r'(?:Invoice|Receipt|Bill)\s*#?\s*(\w+)',
+        r'(?:Number|No):\s*(\w+)',
+    ],
+    "vendor": [
+        r'(?:From|Vendor|Company):\s*([A-Za-z\s]+)',
+        r'(?:Merchant|Business):\s*([A-Za-z\s]+)',
+    ],
+    "tax_amount": [
+        r'(?:Tax|GST|VAT):\s*\$?(\d+(?:\.\d{2})?)',
+    ],
+}
+
+# Case-sensitive patterns that are too greedy to share the entity scan
+STANDALONE_PATTERNS: Dict[str, str] = {
+    "license_plate": r'\b[A-Z0-9]{2,8}\b',
+    "ssn": r'\b\d{3}-\d{2}-\d{4}\b',
+    "credit_card": r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',
+}
+
+_ENTITY_KEYS = {
+    "email": "emails",
+    "date": "dates",
+    "phone": "phones",
+    "vin": "vins",
+    "amount": "amounts",
+    "icd": "icd_codes",
+    "cpt": "cpt_codes",
+}
+
+
+class ExtractionEngine:
+    """
+    Precompiled extraction shared by OCRService and DocumentValidator.
+
+    `scan` walks the text once with a single named-group alternation and
+    returns every entity type; repeated scans of the same text (validator,
+    OCR and fraud checks all see the same OCR output) are served from a
+    small LRU.
+    """
+
+    def __init__(self):
+        self.entity_regex = re.compile(
+            "|".join(f"(?P<{name}>{pattern})" for name, pattern in ENTITY_PATTERNS)
+        )
+        self.field_regexes = {
+            name: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for name, patterns in FIELD_PATTERNS.items()
+        }
+        self.standalone_regexes = {
+            name: re.compile(pattern) for name, pattern in STANDALONE_PATTERNS.items()
+        }
+        self._scan_cached = lru_cache(maxsize=64)(self._scan)
+
+    def scan(self, text: str) -> Dict[str, List[Any]]:
+        """All entities in one pass: amounts, dates, phones, emails, VINs, ICD/CPT codes"""
+        return {key: list(values) for key, values in self._scan_cached(text).items()}
+
+    def _scan(self, text: str) -> Dict[str, Tuple[Any, ...]]:
+        found: Dict[str, List[Any]] = {key: [] for key in _ENTITY_KEYS.values()}
+        seen_dates = set()
+
+        for match in self.entity_regex.finditer(text):
+            kind = match.lastgroup
+            value = match.group()
+            if kind == "amount":
+                try:
+                    found["amounts"].append(float(value.replace("$", "").replace(",", "").strip()))
+                except ValueError:
+                    continue
+            elif kind == "date":
+                if value not in seen_dates:
+                    seen_dates.add(value)
+                    found["dates"].append(value)
+            else:
+                found[_ENTITY_KEYS[kind]].append(value)
+
+        return {key: tuple(values) for key, values in found.items()}
+
+    def first_match(self, field: str, text: str) -> Optional[re.Match]:
+        """First match of a labelled field, trying its patterns in order"""
+        for regex in self.field_regexes[field]:
+            match = regex.search(text)
+            if match:
+                return match
+        return None
+
+    def first_value(self, field: str, text: str) -> Optional[str]:
+        """Stripped first capture group of a labelled field"""
+        match = self.first_match(field, text)
+        return match.group(1).strip() if match else None
+
+    def findall(self, name: str, text: str) -> List[str]:
+        """All matches of a standalone pattern"""
+        return self.standalone_regexes[name].findall(text)
+
+
+@lru_cache(maxsize=1)
+def get_extraction_engine() -> ExtractionEngine:
+    """Process-wide engine, compiled on first use"""
+    return ExtractionEngine()
@@ -0,0 +1,257 @@
+from typing import Any, Dict, List, Tuple
+import cv2
+import numpy as np
+
+BLOCK_SIZE = 8
+
+# Low-frequency AC coefficients used for double-quantization analysis
+DQ_COEFFICIENTS = [(0, 1), (1, 0), (1, 1), (0, 2), (2, 0), (1, 2), (2, 1)]
+
+
+def dct_matrix(size: int = BLOCK_SIZE) -> np.ndarray:
+    """Orthonormal DCT-II basis, so blockwise DCT is D @ block @ D.T"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    basis = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2.0 / size)
+    basis[0, :] = np.sqrt(1.0 / size)
+    return basis.astype(np.float32)
+
+
+DCT_8x8 = dct_matrix()
+
+
+def block_view(gray: np.ndarray, size: int = BLOCK_SIZE) -> np.ndarray:
+    """(rows, cols, size, size) view of the non-overlapping blocks, no copy"""
+    h, w = gray.shape[:2]
+    rows, cols = h // size, w // size
+    cropped = gray[:rows * size, :cols * size]
+    return cropped.reshape(rows, size, cols, size).swapaxes(1, 2)
+
+
+def blockwise_dct(blocks: np.ndarray) -> np.ndarray:
+    """2-D DCT of every block as two large matrix products instead of per-block calls"""
+    rows, cols, size, _ = blocks.shape
+    flat = np.ascontiguousarray(blocks, dtype=np.float32).reshape(-1, size, size) - 128.0
+    # Rows then columns: (B @ D.T) then D @ (...)
+    tmp = (flat.reshape(-1, size) @ DCT_8x8.T).reshape(-1, size, size)
+    coeffs = (tmp.transpose(0, 2, 1).reshape(-1, size) @ DCT_8x8.T).reshape(-1, size, size).transpose(0, 2, 1)
+    return coeffs.reshape(rows, cols, size, size)
+
+
+def pool_grid(values: np.ndarray, max_cells: int = 32) -> List[List[float]]:
+    """Mean-pool a 2-D map down to at most max_cells per side for reporting"""
+    rows, cols = values.shape
+    if rows == 0 or cols == 0:
+        return []
+    row_edges = np.linspace(0, rows, min(rows, max_cells) + 1).astype(int)
+    col_edges = np.linspace(0, cols, min(cols, max_cells) + 1).astype(int)
+    # Summed-area table gives every cell mean in O(1)
+    sat = np.pad(values.astype(np.float64), ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+    r0, r1 = row_edges[:-1, None], row_edges[1:, None]
+    c0, c1 = col_edges[None, :-1], col_edges[None, 1:]
+    sums = sat[r1, c1] - sat[r0, c1] - sat[r1, c0] + sat[r0, c0]
+    means = sums / ((r1 - r0) * (c1 - c0))
+    return np.round(means, 3).tolist()
+
+
+def _grid_phase(diff_means: np.ndarray) -> Tuple[int, float]:
+    """Strongest 8-periodic boundary phase and its strength relative to the other phases"""
+    usable = len(diff_means) // BLOCK_SIZE * BLOCK_SIZE
+    if usable < BLOCK_SIZE * 2:
+        return BLOCK_SIZE - 1, 0.0
+    phases = diff_means[:usable].reshape(-1, BLOCK_SIZE).mean(axis=0)
+    phase = int(np.argmax(phases))
+    others = np.delete(phases, phase).mean()
+    return phase, float(max(0.0, phases[phase] / (others + 1e-6) - 1.0))
+
+
+def _quantization_steps(coeffs: np.ndarray, max_step: int = 30) -> Tuple[int, bool]:
+    """
+    Quantization step of one DCT coefficient and whether a second grid is present.
+
+    The step is the q whose multiples the coefficients cluster on best.
+    A smaller step that is not a divisor of q clustering as well means the
+    values went through two different quantization tables.
+    """
+    values = coeffs[np.abs(coeffs) > 0.5]
+    if len(values) < 100:
+        return 1, False
+    clustering = {step: float(np.mean(np.cos(2 * np.pi * values / step))) for step in range(2, max_step + 1)}
+    best = max(clustering.values())
+    if best <= 0.6:
+        return 1, False
+    # Multiples of the step also cluster; prefer the largest near-best one
+    step = max(step for step, score in clustering.items() if score >= best - 0.02)
+    mixed = any(other < step / 2 and step % other and score > 0.6 for other, score in clustering.items())
+    return step, mixed
+
+
+def _histogram_periodicity(coeffs: np.ndarray, step: int, max_bin: int = 16) -> float:
+    """
+    Share of mass in bins that rise above their inner neighbour.
+
+    After a single compression the quantized-coefficient histogram decays
+    monotonically away from zero; recompressing with a different table
+    leaves periodic peaks and empty bins, which show up as rises.
+    """
+    quantized = np.abs(np.rint(coeffs / step)).astype(np.int64)
+    quantized = quantized[(quantized > 0) & (quantized <= max_bin)]
+    if len(quantized) < 200:
+        return 0.0
+    hist = np.bincount(quantized, minlength=max_bin + 1)[1:].astype(np.float64)
+    rises = np.maximum(0.0, np.diff(hist)).sum()
+    return float(rises / hist.sum())
+
+
+def _block_sums(values: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """Sum of every BLOCK_SIZE x BLOCK_SIZE block via an integral image"""
+    integral = cv2.integral(values)
+    ys = np.arange(rows + 1) * BLOCK_SIZE
+    xs = np.arange(cols + 1) * BLOCK_SIZE
+    corners = integral[ys[:, None], xs[None, :]].astype(np.float64)
+    return corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+
+
+def analyze_jpeg_blocking(gray: np.ndarray, heatmap_cells: int = 32, max_dct_blocks: int = 32768) -> Dict[str, Any]:
+    """
+    JPEG blocking and double-quantization analysis of a grayscale image.
+
+    Returns a 0-1 artifact score plus its components and a coarse
+    per-block blocking heatmap (mean-pooled to at most heatmap_cells per
+    side). Everything is computed on whole-array views; no Python loop
+    runs per block. The DCT statistics use a strided sample of at most
+    max_dct_blocks blocks, which is plenty for coefficient histograms.
+    """
+    if gray.dtype != np.uint8:
+        gray = np.clip(gray, 0, 255).astype(np.uint8)
+    h, w = gray.shape
+    # Blocks whose right and bottom boundaries lie inside the image
+    rows, cols = (h - 1) // BLOCK_SIZE, (w - 1) // BLOCK_SIZE
+    if rows < 2 or cols < 2:
+        return {"score": 0.0, "blocking_strength": 0.0, "double_quantization_score": 0.0,
+                "block_variance": 0.0, "grid_aligned": True, "grid_offset": [0, 0],
+                "blocking_inconsistency": 0.0, "heatmap": [], "heatmap_blocks": [0, 0]}
+
+    # Neighbour differences; boundaries between blocks sit at index 7, 15, ...
+    dx = cv2.absdiff(gray[:, 1:], gray[:, :-1])
+    dy = cv2.absdiff(gray[1:, :], gray[:-1, :])
+    col_phase, col_strength = _grid_phase(cv2.reduce(dx, 0, cv2.REDUCE_AVG, dtype=cv2.CV_32F).ravel())
+    row_phase, row_strength = _grid_phase(cv2.reduce(dy, 1, cv2.REDUCE_AVG, dtype=cv2.CV_32F).ravel())
+    blocking_strength = (col_strength + row_strength) / 2
+    grid_aligned = col_phase == BLOCK_SIZE - 1 and row_phase == BLOCK_SIZE - 1
+
+    # Per-block blocking: boundary step vs. the block's interior gradient
+    span_y, span_x = rows * BLOCK_SIZE, cols * BLOCK_SIZE
+    boundary_x = dx[:span_y, BLOCK_SIZE - 1:span_x:BLOCK_SIZE].reshape(rows, BLOCK_SIZE, cols).sum(axis=1, dtype=np.float64)
+    boundary_y = dy[BLOCK_SIZE - 1:span_y:BLOCK_SIZE, :span_x].reshape(rows, cols, BLOCK_SIZE).sum(axis=2, dtype=np.float64)
+    interior_x = _block_sums(dx[:span_y, :span_x], rows, cols) - boundary_x
+    interior_y = _block_sums(dy[:span_y, :span_x], rows, cols) - boundary_y
+    boundary = (boundary_x + boundary_y) / (2 * BLOCK_SIZE)
+    interior = (interior_x + interior_y) / (2 * BLOCK_SIZE * (BLOCK_SIZE - 1))
+    local_blocking = np.maximum(0.0, boundary / (interior + 1.0) - 1.0)
+    heatmap = local_blocking / (1.0 + local_blocking)
+
+    # Regions that carry a different blocking signature than the rest
+    cells = np.array(pool_grid(heatmap, 8))
+    blocking_inconsistency = float(min(1.0, cells.std() / (cells.mean() + 1e-3))) if cells.size > 1 else 0.0
+
+    # Blockwise DCT on a strided sample of aligned blocks
+    blocks = block_view(gray)
+    stride = max(1, int(np.ceil(np.sqrt(blocks.shape[0] * blocks.shape[1] / max_dct_blocks))))
+    coeffs = blockwise_dct(blocks[::stride, ::stride])
+
+    # Orthonormal DCT preserves energy, so AC energy / 64 is the block variance
+    energy = np.square(coeffs).sum(axis=(2, 3)) - np.square(coeffs[:, :, 0, 0])
+    block_variance = float(energy.mean() / (BLOCK_SIZE * BLOCK_SIZE))
+
+    # Double quantization on the low-frequency AC histograms
+    evidence = []
+    for u, v in DQ_COEFFICIENTS:
+        series = coeffs[:, :, u, v].ravel()
+        step, mixed = _quantization_steps(series)
+        if step > 1:
+            evidence.append(1.0 if mixed else min(1.0, _histogram_periodicity(series, step) * 4))
+    double_quantization_score = float(np.mean(evidence)) if evidence else 0.0
+
+    # Misaligned but strong blocking means the image was cropped after compression
+    misalignment = 0.0 if grid_aligned else min(1.0, blocking_strength * 2)
+    score = max(
+        double_quantization_score,
+        blocking_inconsistency * min(1.0, blocking_strength * 5),
+        misalignment,
+    )
+
+    return {
+        "score": float(min(1.0, score)),
+        "blocking_strength": float(blocking_strength),
+        "double_quantization_score": double_quantization_score,
+        "block_variance": block_variance,
+        "grid_aligned": bool(grid_aligned),
+        "grid_offset": [(row_phase + 1) % BLOCK_SIZE, (col_phase + 1) % BLOCK_SIZE],
+        "blocking_inconsistency": blocking_inconsistency,
+        "heatmap": pool_grid(heatmap, heatmap_cells),
+        "heatmap_blocks": [rows, cols],
+    }
+
+
+def analyze_edge_discontinuities(
+    edges: np.ndarray,
+    min_contour_points: int = 10,
+    sharp_turn_radians: float = np.pi / 3,
+    map_cells: int = 16,
+) -> Dict[str, Any]:
+    """
+    Sharp turns along the contours of a Canny edge map, as a score and a spatial map.
+
+    Turning angles for every contour are computed at once on the
+    concatenated point array. The score is the share of significant
+    contours with at least one turn sharper than sharp_turn_radians; the
+    map gives, per grid cell, the share of contour points that are sharp
+    turns, which localizes splice boundaries.
+    """
+    h, w = edges.shape[:2]
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    contours = [contour for contour in contours if len(contour) > min_contour_points]
+
+    rows, cols = min(map_cells, h), min(map_cells, w)
+    if not contours:
+        return {"score": 0.0, "contours_analyzed": 0, "discontinuous_contours": 0,
+                "sharp_turns": 0, "map": np.zeros((rows, cols)).tolist(), "map_cells": [rows, cols]}
+
+    lengths = np.array([len(contour) for contour in contours])
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.float32)
+    contour_ids = np.repeat(np.arange(len(contours)), lengths)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    local_index = np.arange(len(points)) - starts
+
+    # Turning angle at point i from (p[i] - p[i-1]) and (p[i+1] - p[i]); only
+    # interior points whose neighbours belong to the same contour count
+    steps = np.diff(points, axis=0)
+    incoming, outgoing = steps[:-1], steps[1:]
+    dots = np.einsum("ij,ij->i", incoming, outgoing)
+    norms = np.linalg.norm(incoming, axis=1) * np.linalg.norm(outgoing, axis=1)
+    cos_turn = dots / (norms + 1e-8)
+    centre = np.arange(1, len(points) - 1)
+    valid = (local_index[centre] >= 2) & (local_index[centre] <= lengths[contour_ids[centre]] - 3)
+    sharp = valid & (cos_turn < np.cos(sharp_turn_radians))
+    sharp_points = centre[sharp]
+
+    discontinuous = np.bincount(contour_ids[sharp_points], minlength=len(contours)) > 0
+    score = float(discontinuous.sum() / len(contours))
+
+    # Share of contour points that are sharp turns, per grid cell
+    cell_rows = np.minimum(points[:, 1].astype(np.int64) * rows // h, rows - 1)
+    cell_cols = np.minimum(points[:, 0].astype(np.int64) * cols // w, cols - 1)
+    cells = cell_rows * cols + cell_cols
+    totals = np.bincount(cells, minlength=rows * cols)
+    turns = np.bincount(cells[sharp_points], minlength=rows * cols)
+    density = np.where(totals > 0, turns / np.maximum(totals, 1), 0.0).reshape(rows, cols)
+
+    return {
+        "score": score,
+        "contours_analyzed": int(len(contours)),
+        "discontinuous_contours": int(discontinuous.sum()),
+        "sharp_turns": int(len(sharp_points)),
+        "map": np.round(density, 3).tolist(),
+        "map_cells": [rows, cols],
+    }
@@ -0,0 +1,245 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+import joblib
+import numpy as np
+from loguru import logger
+from sklearn.decomposition import TruncatedSVD
+from sklearn.ensemble import IsolationForest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+MODEL_FILE = "model.joblib"
+METADATA_FILE = "metadata.json"
+CURRENT_FILE = "CURRENT"
+TEXT_COMPONENTS = 16
+
+
+def average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """Expected depth of an unsuccessful BST search among n samples (the IsolationForest normalizer)"""
+    n = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n)
+    result[n == 2] = 1.0
+    many = n > 2
+    result[many] = 2.0 * (np.log(n[many] - 1.0) + np.euler_gamma) - 2.0 * (n[many] - 1.0) / n[many]
+    return result
+
+
+class FlatForest:
+    """
+    A fitted IsolationForest as flat node arrays.
+
+    sklearn trees copy their nodes into private buffers when unpickled, so
+    they cannot be memory-mapped. Here every tree's nodes live in shared
+    arrays (leaves point to themselves) and all trees are walked at once,
+    one vectorized step per level, giving sklearn's score_samples.
+    """
+
+    def __init__(self, forest: IsolationForest):
+        lefts, rights, features, thresholds, leaf_depths, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator, estimator_features in zip(forest.estimators_, forest.estimators_features_):
+            tree = estimator.tree_
+            index = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            depth = np.zeros(tree.node_count, dtype=np.int64)
+            # Nodes are stored in preorder, so a parent precedes its children
+            for node in index[~leaf]:
+                depth[tree.children_left[node]] = depth[tree.children_right[node]] = depth[node] + 1
+            roots.append(offset)
+            lefts.append(np.where(leaf, index, tree.children_left) + offset)
+            rights.append(np.where(leaf, index, tree.children_right) + offset)
+            features.append(np.where(leaf, 0, np.asarray(estimator_features)[np.maximum(tree.feature, 0)]))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            # Path length credited to a sample ending in each (leaf) node
+            leaf_depths.append(depth + average_path_length(tree.n_node_samples))
+            max_depth = max(max_depth, int(depth.max()))
+            offset += tree.node_count
+
+        self.left = np.concatenate(lefts).astype(np.int32)
+        self.right = np.concatenate(rights).astype(np.int32)
+        self.feature = np.concatenate(features).astype(np.int32)
+        self.threshold = np.concatenate(thresholds)
+        self.leaf_depth = np.concatenate(leaf_depths)
+        self.roots = np.array(roots, dtype=np.int32)
+        self.max_depth = max_depth
+        self.normalizer = len(roots) * float(average_path_length([forest.max_samples_])[0])
+
+    def score_samples(self, inputs: np.ndarray) -> np.ndarray:
+        """Same as IsolationForest.score_samples: minus the anomaly score"""
+        # sklearn compares float32 inputs against float64 thresholds
+        inputs = np.ascontiguousarray(inputs, dtype=np.float32).astype(np.float64)
+        values = inputs.ravel()
+        row_offsets = np.arange(len(inputs), dtype=np.int64) * inputs.shape[1]
+        nodes = np.repeat(self.roots[:, None], len(inputs), axis=1)
+        for _ in range(self.max_depth):
+            go_left = values.take(row_offsets + self.feature.take(nodes)) <= self.threshold.take(nodes)
+            nodes = np.where(go_left, self.left.take(nodes), self.right.take(nodes))
+        # Tree by tree, so a claim's score does not depend on its batch
+        depths = np.zeros(len(inputs))
+        for tree_depths in self.leaf_depth.take(nodes):
+            depths += tree_depths
+        return -(2.0 ** (-depths / self.normalizer))
+
+
+class FraudModel:
+    """
+    Fitted anomaly model over claim features and claim text.
+
+    Numeric features are log-compressed and joined with a low-rank TF-IDF
+    projection of the text; an IsolationForest scores how unusual a claim
+    is against the claims it was trained on. Scores are calibrated so the
+    (1 - contamination) share of training claims maps to 0 and the most
+    anomalous training claim to 1.
+    """
+
+    def __init__(self, tfidf: Optional[TfidfVectorizer], text_components: Optional[np.ndarray],
+                 forest: FlatForest, threshold: float, ceiling: float, feature_names: Tuple[str, ...]):
+        self.tfidf = tfidf
+        self.text_components = text_components
+        self.forest = forest
+        self.threshold = threshold
+        self.ceiling = ceiling
+        self.feature_names = feature_names
+        self.version: Optional[str] = None
+        self.metadata: Dict[str, Any] = {}
+
+    def _inputs(self, texts: List[str], numeric: np.ndarray) -> np.ndarray:
+        # Every feature is non-negative; amounts and lengths are heavy-tailed
+        inputs = np.log1p(np.maximum(numeric, 0.0))
+        if self.text_components is not None:
+            projected = self.tfidf.transform(texts) @ self.text_components.T
+            inputs = np.hstack([inputs, np.asarray(projected)])
+        return inputs
+
+    def raw_scores(self, texts: List[str], numeric: np.ndarray) -> np.ndarray:
+        """IsolationForest anomaly scores, higher is more unusual"""
+        return -self.forest.score_samples(self._inputs(texts, numeric))
+
+    def anomaly_scores(self, texts: List[str], numeric: np.ndarray) -> np.ndarray:
+        """Calibrated anomaly score in [0, 1] for every claim"""
+        spread = max(self.ceiling - self.threshold, 1e-9)
+        return np.clip((self.raw_scores(texts, numeric) - self.threshold) / spread, 0.0, 1.0)
+
+
+def fit_fraud_model(texts: List[str], numeric: np.ndarray, feature_names: Tuple[str, ...],
+                    contamination: float = 0.1, random_state: int = 42) -> FraudModel:
+    """Fit the text projection and the IsolationForest on historical claims"""
+    tfidf, text_components = None, None
+    try:
+        tfidf = TfidfVectorizer(max_features=1000, stop_words="english", ngram_range=(1, 2))
+        terms = tfidf.fit_transform(texts)
+        components = min(TEXT_COMPONENTS, terms.shape[1] - 1, len(texts) - 1)
+        if components >= 1:
+            svd = TruncatedSVD(n_components=components, random_state=random_state)
+            svd.fit(terms)
+            text_components = np.ascontiguousarray(svd.components_)
+        else:
+            tfidf = None
+    except ValueError:
+        # Nothing but stop words in the training texts
+        tfidf = None
+
+    model = FraudModel(tfidf, text_components, None, 0.0, 1.0, tuple(feature_names))
+    inputs = model._inputs(texts, numeric)
+    model.forest = FlatForest(IsolationForest(contamination=contamination, random_state=random_state).fit(inputs))
+    training_scores = -model.forest.score_samples(inputs)
+    model.threshold = float(np.quantile(training_scores, 1 - contamination))
+    model.ceiling = float(training_scores.max())
+    return model
+
+
+class FraudModelStore:
+    """
+    Versioned fraud model artifacts on disk.
+
+    Each version is a directory holding an uncompressed joblib dump, so its
+    NumPy arrays (forest nodes, text projection) load as read-only memory maps
+    shared through the page cache by every process serving the model. A
+    version directory is renamed into place complete, and the CURRENT
+    pointer is swapped with os.replace, so readers never see a partial
+    model.
+    """
+
+    def __init__(self, root: str = "temp/fraud_models", keep_versions: int = 5):
+        self.root = root
+        self.keep_versions = max(1, keep_versions)
+
+    def current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self) -> List[str]:
+        """Complete versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith(".") and os.path.isfile(os.path.join(self.root, name, MODEL_FILE))
+        )
+
+    def save(self, model: FraudModel, metadata: Dict[str, Any]) -> str:
+        """Write a new version and make it current"""
+        os.makedirs(self.root, exist_ok=True)
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        staging = os.path.join(self.root, f".staging-{version}")
+        os.makedirs(staging)
+        try:
+            model.version = version
+            model.metadata = {**metadata, "version": version, "created_at": time.time()}
+            joblib.dump(model, os.path.join(staging, MODEL_FILE))
+            with open(os.path.join(staging, METADATA_FILE), "w", encoding="utf-8") as f:
+                json.dump(model.metadata, f, indent=2)
+            os.replace(staging, os.path.join(self.root, version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        pointer = os.path.join(self.root, f".{CURRENT_FILE}.{version}")
+        with open(pointer, "w", encoding="utf-8") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer, os.path.join(self.root, CURRENT_FILE))
+        self.prune()
+        return version
+
+    def load(self, version: Optional[str] = None) -> Optional[FraudModel]:
+        """Memory-map a version (the current one by default); None when nothing is stored"""
+        version = version or self.current_version()
+        if not version:
+            return None
+        model = joblib.load(os.path.join(self.root, version, MODEL_FILE), mmap_mode="r")
+        model.version = version
+        return model
+
+    def prune(self):
+        """Drop the oldest versions beyond keep_versions, never the current one"""
+        current = self.current_version()
+        stale = [v for v in self.versions() if v != current]
+        for version in stale[:max(0, len(stale) - (self.keep_versions - 1))]:
+            shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+            logger.info(f"🗑️ Removed fraud model version {version}")
+
+
+def train_and_save(root: str, keep_versions: int, texts: List[str], numeric: np.ndarray,
+                   feature_names: Tuple[str, ...], contamination: float = 0.1) -> Dict[str, Any]:
+    """Fit and persist a model (runs in a training process); returns the new version's metadata"""
+    start = time.time()
+    model = fit_fraud_model(texts, numeric, feature_names, contamination=contamination)
+    metadata = {
+        "training_samples": len(texts),
+        "training_seconds": time.time() - start,
+        "contamination": contamination,
+        "features": list(feature_names),
+        "text_components": len(model.text_components) if model.text_components is not None else 0,
+    }
+    store = FraudModelStore(root, keep_versions)
+    store.save(model, metadata)
+    return model.metadata
@@ -0,0 +1,353 @@
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+from utils.perceptual_hash import HASH_KINDS, hamming_distance, to_hex
+
+CHUNKS = 4
+CHUNK_BITS = 16
+# Probe radius floor(k / CHUNKS) <= 2 keeps a lookup at 4 x 137 bucket probes
+MAX_SEARCH_DISTANCE = 3 * CHUNKS - 1
+# Unsorted additions scanned linearly before they are merged into the chunk tables
+TAIL_CAPACITY = 1024
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Set bits of each uint64 (NumPy < 2 has no bitwise_count)"""
+    return _POPCOUNT[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _to_signed(value: int) -> int:
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(radius: int) -> np.ndarray:
+    """Every 16-bit mask with at most `radius` bits set"""
+    masks = [0]
+    for bits in range(1, radius + 1):
+        for positions in itertools.combinations(range(CHUNK_BITS), bits):
+            masks.append(sum(1 << p for p in positions))
+    return np.array(masks, dtype=np.uint16)
+
+
+class _KindTable:
+    """
+    Multi-index hash tables for one hash kind.
+
+    Each 16-bit chunk of the stored hashes is kept sorted alongside the
+    permutation back to the rows, so probing a chunk value is a binary
+    search. Additions go to a preallocated unsorted tail that is scanned
+    linearly. Once tail_capacity entries are waiting, a merge sorts just
+    the tail and splices it into the chunk tables with searchsorted/insert
+    (a linear copy, no re-sort of the stored hashes). The merged tables
+    are built into new arrays from a snapshot, so the caller can build
+    them outside its lock and only swap them in under it; the tail keeps
+    room for another tail_capacity additions meanwhile, and merges inline
+    only if that fills up too.
+    """
+
+    def __init__(self, tail_capacity: int = TAIL_CAPACITY):
+        self.tail_capacity = tail_capacity
+        self.values = np.empty(0, dtype=np.uint64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.sorted_chunks = [np.empty(0, dtype=np.uint16) for _ in range(CHUNKS)]
+        self.orders = [np.empty(0, dtype=np.int32) for _ in range(CHUNKS)]
+        self.tail_values = np.empty(2 * tail_capacity, dtype=np.uint64)
+        self.tail_ids = np.empty(2 * tail_capacity, dtype=np.int64)
+        self.tail_size = 0
+        # Bumped by every swap; a merge built from an older snapshot is dropped
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self.values) + self.tail_size
+
+    @property
+    def needs_merge(self) -> bool:
+        return self.tail_size >= self.tail_capacity
+
+    def load(self, values: List[int], ids: List[int]):
+        """Replace the tables with a bulk load, sorting each chunk once"""
+        self.values = np.array(values, dtype=np.uint64)
+        self.ids = np.array(ids, dtype=np.int64)
+        self.tail_size = 0
+        self.generation += 1
+        for i in range(CHUNKS):
+            chunk = (self.values >> np.uint64(CHUNK_BITS * i)).astype(np.uint16)
+            order = np.argsort(chunk, kind="stable").astype(np.int32)
+            self.orders[i] = order
+            self.sorted_chunks[i] = chunk[order]
+
+    def add(self, value: int, image_id: int):
+        if self.tail_size == len(self.tail_values):
+            self.merge()
+        self.tail_values[self.tail_size] = value
+        self.tail_ids[self.tail_size] = image_id
+        self.tail_size += 1
+
+    def snapshot(self) -> Tuple[int, np.ndarray, np.ndarray]:
+        """(generation, tail values, tail ids) to build a merge from (lock held)"""
+        return self.generation, self.tail_values[:self.tail_size].copy(), self.tail_ids[:self.tail_size].copy()
+
+    def build_merge(self, snapshot: Tuple[int, np.ndarray, np.ndarray]) -> Tuple[Any, ...]:
+        """New tables with the snapshot's tail spliced in; only reads the current ones"""
+        generation, tail, tail_ids = snapshot
+        values, ids = self.values, self.ids
+        sorted_chunks, orders = list(self.sorted_chunks), list(self.orders)
+        rows = np.arange(len(values), len(values) + len(tail), dtype=np.int32)
+        for i in range(CHUNKS):
+            chunk = (tail >> np.uint64(CHUNK_BITS * i)).astype(np.uint16)
+            order = np.argsort(chunk, kind="stable")
+            positions = np.searchsorted(sorted_chunks[i], chunk[order], side="right")
+            sorted_chunks[i] = np.insert(sorted_chunks[i], positions, chunk[order])
+            orders[i] = np.insert(orders[i], positions, rows[order])
+        return generation, len(tail), np.concatenate([values, tail]), np.concatenate([ids, tail_ids]), sorted_chunks, orders
+
+    def swap(self, merged: Tuple[Any, ...]) -> bool:
+        """Install a built merge and drop its entries from the tail (lock held)"""
+        generation, count, values, ids, sorted_chunks, orders = merged
+        if generation != self.generation:
+            return False
+        self.values, self.ids, self.sorted_chunks, self.orders = values, ids, sorted_chunks, orders
+        # Additions made while the merge was being built stay in the tail
+        remaining = self.tail_size - count
+        self.tail_values[:remaining] = self.tail_values[count:self.tail_size]
+        self.tail_ids[:remaining] = self.tail_ids[count:self.tail_size]
+        self.tail_size = remaining
+        self.generation += 1
+        return True
+
+    def merge(self):
+        """Splice the tail into the sorted tables in place (lock held)"""
+        if self.tail_size:
+            self.swap(self.build_merge(self.snapshot()))
+
+    def search(self, value: int, masks: np.ndarray, max_distance: int) -> List[Tuple[int, int]]:
+        """(image_id, distance) for every stored hash within max_distance"""
+        query = np.uint64(value)
+        found = []
+
+        if len(self.values):
+            positions = []
+            for i in range(CHUNKS):
+                probes = np.uint16((value >> (CHUNK_BITS * i)) & 0xFFFF) ^ masks
+                lo = np.searchsorted(self.sorted_chunks[i], probes, side="left")
+                hi = np.searchsorted(self.sorted_chunks[i], probes, side="right")
+                lengths = hi - lo
+                total = int(lengths.sum())
+                if total:
+                    # Expand the [lo, hi) bucket ranges into row positions
+                    starts = np.repeat(lo - (np.cumsum(lengths) - lengths), lengths)
+                    positions.append(self.orders[i][starts + np.arange(total)])
+            if positions:
+                candidates = np.unique(np.concatenate(positions))
+                distances = popcount(self.values[candidates] ^ query)
+                keep = distances <= max_distance
+                found.extend(zip(self.ids[candidates[keep]].tolist(), distances[keep].tolist()))
+
+        if self.tail_size:
+            distances = popcount(self.tail_values[:self.tail_size] ^ query)
+            keep = distances <= max_distance
+            found.extend(zip(self.tail_ids[:self.tail_size][keep].tolist(), distances[keep].tolist()))
+
+        return found
+
+
+class PerceptualHashIndex:
+    """
+    Persistent near-duplicate index over 64-bit perceptual hashes.
+
+    Multi-index hashing: every hash is split into four 16-bit chunks. Two
+    hashes within Hamming distance k agree to within floor(k/4) bits on at
+    least one chunk, so a lookup probes the chunk values within that radius
+    and verifies the few candidates exactly; cost follows the bucket sizes,
+    not the index size. SQLite is the durable store and the probe tables
+    are rebuilt from it at startup.
+    """
+
+    def __init__(self, path: Optional[str] = "temp/image_hashes.sqlite3", max_distance: int = 6):
+        if not 0 <= max_distance <= MAX_SEARCH_DISTANCE:
+            raise ValueError(f"max_distance must be between 0 and {MAX_SEARCH_DISTANCE}")
+        self.path = path
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._tables = {kind: _KindTable() for kind in HASH_KINDS}
+        self._merging = False
+        self._images = 0
+        self.stats = {"lookups": 0, "matches": 0, "added": 0, "lookup_seconds": 0.0}
+
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            "id INTEGER PRIMARY KEY, image_key TEXT UNIQUE NOT NULL, claim_id TEXT, "
+            "filename TEXT, created_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "image_id INTEGER NOT NULL, kind TEXT NOT NULL, value INTEGER NOT NULL, "
+            "PRIMARY KEY (image_id, kind))"
+        )
+        self._load()
+
+    def _load(self):
+        """Build the probe tables from everything on disk"""
+        start = time.time()
+        loaded: Dict[str, Tuple[List[int], List[int]]] = {kind: ([], []) for kind in HASH_KINDS}
+        for image_id, kind, value in self._db.execute("SELECT image_id, kind, value FROM hashes"):
+            if kind in loaded:
+                loaded[kind][0].append(_to_unsigned(value))
+                loaded[kind][1].append(image_id)
+        for kind, (values, ids) in loaded.items():
+            self._tables[kind].load(values, ids)
+        self._images = self._db.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+        logger.info(
+            f"🔎 Perceptual hash index: {self.path or 'in-memory'} "
+            f"({self._images} images, loaded in {time.time() - start:.2f}s)"
+        )
+
+    def __len__(self) -> int:
+        return self._images
+
+    def add(self, image_key: str, hashes: Dict[str, int], claim_id: Optional[str] = None,
+            filename: Optional[str] = None) -> bool:
+        """Index an image once per image_key; returns False if it was already known"""
+        hashes = {kind: value for kind, value in hashes.items() if kind in HASH_KINDS}
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO images (image_key, claim_id, filename, created_at) VALUES (?, ?, ?, ?)",
+                    (image_key, claim_id, filename, time.time()),
+                )
+                image_id = cursor.lastrowid if cursor.rowcount == 1 else None
+                if image_id is not None:
+                    self._db.executemany(
+                        "INSERT INTO hashes (image_id, kind, value) VALUES (?, ?, ?)",
+                        [(image_id, kind, _to_signed(value)) for kind, value in hashes.items()],
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+            if image_id is None:
+                return False
+            for kind, value in hashes.items():
+                self._tables[kind].add(value, image_id)
+            self._images += 1
+            self.stats["added"] += 1
+
+        self._merge_tails()
+        return True
+
+    def _merge_tails(self):
+        """Merge full tails, building the new tables outside the lock so lookups keep running"""
+        with self._lock:
+            full = [kind for kind, table in self._tables.items() if table.needs_merge]
+            if not full or self._merging:
+                return
+            self._merging = True
+            snapshots = {kind: self._tables[kind].snapshot() for kind in full}
+        try:
+            merged = {kind: self._tables[kind].build_merge(snapshot) for kind, snapshot in snapshots.items()}
+            with self._lock:
+                for kind, tables in merged.items():
+                    self._tables[kind].swap(tables)
+        finally:
+            with self._lock:
+                self._merging = False
+
+    def lookup(self, hashes: Dict[str, int], max_distance: Optional[int] = None,
+               exclude: Optional[Tuple[str, Optional[str]]] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Indexed images within max_distance of any of the given hashes.
+
+        `exclude` is an (image_key, claim_id) pair to leave out, so an
+        upload does not match its own earlier registration by the same
+        claim. Matches are ordered by their smallest distance.
+        """
+        k = self.max_distance if max_distance is None else max_distance
+        if not 0 <= k <= MAX_SEARCH_DISTANCE:
+            raise ValueError(f"max_distance must be between 0 and {MAX_SEARCH_DISTANCE}")
+        masks = _flip_masks(k // CHUNKS)
+        start = time.perf_counter()
+
+        with self._lock:
+            matched: Dict[int, Dict[str, int]] = {}
+            for kind, value in hashes.items():
+                if kind not in self._tables:
+                    continue
+                for image_id, distance in self._tables[kind].search(value, masks, k):
+                    matched.setdefault(image_id, {})[kind] = distance
+
+            results = self._describe(matched, hashes, exclude) if matched else []
+            self.stats["lookups"] += 1
+            self.stats["matches"] += len(results)
+            self.stats["lookup_seconds"] += time.perf_counter() - start
+
+        results.sort(key=lambda m: (min(m["distances"][kind] for kind in m["matched_on"]), m["first_seen"]))
+        return results[:limit]
+
+    def _describe(self, matched: Dict[int, Dict[str, int]], hashes: Dict[str, int],
+                  exclude: Optional[Tuple[str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """Metadata and all-kind distances for matched image ids (lock held)"""
+        ids = list(matched)
+        placeholders = ", ".join("?" * len(ids))
+        stored: Dict[int, Dict[str, int]] = {}
+        for image_id, kind, value in self._db.execute(
+            f"SELECT image_id, kind, value FROM hashes WHERE image_id IN ({placeholders})", ids
+        ):
+            stored.setdefault(image_id, {})[kind] = _to_unsigned(value)
+
+        results = []
+        for image_id, image_key, claim_id, filename, created_at in self._db.execute(
+            f"SELECT id, image_key, claim_id, filename, created_at FROM images WHERE id IN ({placeholders})", ids
+        ):
+            if exclude and (image_key, claim_id) == exclude:
+                continue
+            results.append({
+                "image_key": image_key,
+                "claim_id": claim_id,
+                "filename": filename,
+                "first_seen": created_at,
+                "exact": exclude is not None and image_key == exclude[0],
+                "matched_on": sorted(matched[image_id]),
+                "distances": {
+                    kind: hamming_distance(hashes[kind], value)
+                    for kind, value in stored.get(image_id, {}).items() if kind in hashes
+                },
+                "hashes": {kind: to_hex(value) for kind, value in stored.get(image_id, {}).items()},
+            })
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["lookups"]
+        return {
+            "images": self._images,
+            "max_distance": self.max_distance,
+            "lookups": lookups,
+            "matches": self.stats["matches"],
+            "added": self.stats["added"],
+            "avg_lookup_ms": (self.stats["lookup_seconds"] / lookups * 1000) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
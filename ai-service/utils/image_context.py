@@ -0,0 +1,93 @@
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+import cv2
+import numpy as np
+
+
+class ImageContext:
+    """
+    One decoded upload plus its derived planes, computed on first use.
+
+    Every check in an analysis pulls gray/HSV/LAB/Canny/Laplacian
+    statistics from here, so each conversion runs once per request
+    instead of once per check. Planes are plain NumPy arrays and safe to
+    read from worker threads; only the small planes a check needs should
+    be shipped to the process pool, never the context itself.
+    """
+
+    def __init__(
+        self,
+        bgr: np.ndarray,
+        original_size: Optional[Tuple[int, int]] = None,
+        full_resolution_gray: Optional[Callable[[], np.ndarray]] = None,
+    ):
+        self.bgr = bgr
+        # (width, height) of the upload before decode-time downscaling
+        self.original_size = original_size or (bgr.shape[1], bgr.shape[0])
+        self._full_resolution_gray = full_resolution_gray
+        self._memo: Dict[Any, Any] = {}
+        self._lock = threading.RLock()
+
+    def _get(self, key: Any, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = compute()
+            return self._memo[key]
+
+    @property
+    def height(self) -> int:
+        return self.bgr.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.bgr.shape[1]
+
+    @property
+    def pixel_count(self) -> int:
+        return self.height * self.width
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self._get("gray", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def full_gray(self) -> np.ndarray:
+        """Gray plane at original resolution, for checks tied to the native pixel grid"""
+        if self._full_resolution_gray is None or self.original_size == (self.width, self.height):
+            return self.gray
+        return self._get("full_gray", self._full_resolution_gray)
+
+    @property
+    def hsv(self) -> np.ndarray:
+        return self._get("hsv", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV))
+
+    @property
+    def lab(self) -> np.ndarray:
+        return self._get("lab", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2LAB))
+
+    @property
+    def edges(self) -> np.ndarray:
+        """Canny(gray, 50, 150), the edge map every check uses"""
+        return self._get("edges", lambda: cv2.Canny(self.gray, 50, 150))
+
+    @property
+    def edge_density(self) -> float:
+        return self._get("edge_density", lambda: cv2.countNonZero(self.edges) / self.pixel_count)
+
+    @property
+    def laplacian_variance(self) -> float:
+        """Variance of the 64-bit Laplacian; the plane itself is not kept"""
+        return self._get("laplacian_variance", lambda: float(cv2.Laplacian(self.gray, cv2.CV_64F).var()))
+
+    @property
+    def gray_stats(self) -> Tuple[float, float]:
+        """(mean, standard deviation) of the gray plane"""
+        def compute():
+            mean, std = cv2.meanStdDev(self.gray)
+            return float(mean[0][0]), float(std[0][0])
+        return self._get("gray_stats", compute)
+
+    @property
+    def channel_variance(self) -> np.ndarray:
+        """Per-channel BGR variance"""
+        return self._get("channel_variance", lambda: np.square(cv2.meanStdDev(self.bgr)[1].ravel()))
@@ -0,0 +1,206 @@
+import math
+from typing import Optional, Tuple
+import cv2
+import numpy as np
+from PIL import Image
+
+from utils.uploads import Buffer, open_buffer
+
+# libjpeg DCT scaling, keyed by (grayscale, denominator)
+REDUCED_FLAGS = {
+    (False, 2): cv2.IMREAD_REDUCED_COLOR_2,
+    (False, 4): cv2.IMREAD_REDUCED_COLOR_4,
+    (False, 8): cv2.IMREAD_REDUCED_COLOR_8,
+    (True, 2): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (True, 4): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (True, 8): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+# Header modes that imdecode only returns faithfully with IMREAD_UNCHANGED
+ALPHA_MODES = {"RGBA", "RGBa", "LA", "La", "PA"}
+HIGH_DEPTH_MODES = {"I", "I;16", "I;16B", "I;16L", "F"}
+FLATTEN_ROWS = 256
+
+
+class ImageTooLargeError(ValueError):
+    """Upload declares more pixels than the configured hard limit"""
+
+
+class DecodedImage:
+    """
+    An upload decoded at analysis resolution.
+
+    `bgr` is at most analysis_max_pixels; `source` is the opened original,
+    kept for its header (format, mode, EXIF) only and never decoded.
+    Checks that depend on the native pixel grid call full_resolution_gray()
+    instead, which decodes luma at original size on demand.
+    """
+
+    def __init__(self, content: Buffer, source: Image.Image, bgr: np.ndarray,
+                 original_size: Tuple[int, int], original_mode: str):
+        self.content = content
+        self.source = source
+        self.bgr = bgr
+        self.original_size = original_size
+        self.original_mode = original_mode
+        self.format = source.format
+        self._image: Optional[Image.Image] = None
+
+    @property
+    def image(self) -> Image.Image:
+        """RGB PIL copy of `bgr`, built only for callers that still want one"""
+        if self._image is None:
+            self._image = Image.fromarray(cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB))
+        return self._image
+
+    @property
+    def scale(self) -> float:
+        """Analysis width / original width (1.0 when nothing was reduced)"""
+        return self.bgr.shape[1] / self.original_size[0] if self.original_size[0] else 1.0
+
+    @property
+    def downscaled(self) -> bool:
+        return (self.bgr.shape[1], self.bgr.shape[0]) != self.original_size
+
+    def full_resolution_gray(self) -> np.ndarray:
+        """Luma plane at original size; JPEG decodes only the Y channel"""
+        if not self.downscaled:
+            return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+        return decode_pixels(self.content, self.source, grayscale=True)
+
+
+def analysis_size(width: int, height: int, max_pixels: Optional[int]) -> Tuple[int, int]:
+    """Largest size with the original aspect ratio that fits max_pixels"""
+    if not max_pixels or width * height <= max_pixels:
+        return width, height
+    scale = math.sqrt(max_pixels / (width * height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def reduction_factor(width: int, height: int, max_pixels: Optional[int]) -> int:
+    """Mildest JPEG DCT scale (1, 2, 4 or 8) whose output fits max_pixels, 8 if none does"""
+    if not max_pixels or width * height <= max_pixels:
+        return 1
+    for denominator in (2, 4, 8):
+        if math.ceil(width / denominator) * math.ceil(height / denominator) <= max_pixels:
+            return denominator
+    return 8
+
+
+def has_alpha(source: Image.Image) -> bool:
+    return source.mode in ALPHA_MODES or "transparency" in source.info
+
+
+def read_header(content: Buffer, max_pixels: Optional[int] = 100_000_000) -> Image.Image:
+    """Open an upload with PIL for its header only, rejecting anything over max_pixels"""
+    try:
+        source = Image.open(open_buffer(content))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from e
+
+    width, height = source.size
+    if max_pixels and width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"Image has {width}x{height} = {width * height} pixels, limit is {max_pixels}"
+        )
+    return source
+
+
+def _decode_with_pil(content: Buffer, alpha: bool) -> Optional[np.ndarray]:
+    """BGR(A) pixels for formats this OpenCV build cannot decode (e.g. GIF)"""
+    try:
+        image = Image.open(open_buffer(content))
+        if alpha:
+            return cv2.cvtColor(np.asarray(image.convert("RGBA")), cv2.COLOR_RGBA2BGRA)
+        return cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+    except Exception:
+        return None
+
+
+def _to_8bit(pixels: np.ndarray) -> np.ndarray:
+    if pixels.dtype == np.uint8:
+        return pixels
+    if pixels.dtype == np.uint16:
+        return (pixels >> 8).astype(np.uint8)
+    return cv2.normalize(pixels, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+
+
+def _flatten_alpha(color: np.ndarray, alpha: np.ndarray) -> np.ndarray:
+    """Composite over white in place, so transparent backgrounds read as paper rather than black"""
+    # In row strips: the 16-bit intermediates stay small next to the frame
+    for top in range(0, color.shape[0], FLATTEN_ROWS):
+        weight = alpha[top:top + FLATTEN_ROWS].astype(np.uint16)
+        if color.ndim == 3:
+            weight = weight[:, :, None]
+        blended = color[top:top + FLATTEN_ROWS] * weight
+        blended += (255 - weight) * 255 + 127
+        blended //= 255
+        color[top:top + FLATTEN_ROWS] = blended
+    return color
+
+
+def decode_pixels(content: Buffer, source: Image.Image, grayscale: bool = False,
+                  max_pixels: Optional[int] = None) -> np.ndarray:
+    """
+    Decode an upload straight from its buffer into BGR or gray.
+
+    cv2.imdecode reads a NumPy view of the buffer (no copy, also for a
+    memory-mapped spool file) and produces the requested color space in
+    one pass: gray output skips chroma entirely for JPEGs, and anything
+    over max_pixels is decoded through libjpeg's DCT scaling at the
+    mildest 1/2, 1/4 or 1/8 scale that fits, so a large JPEG is never
+    materialized at full size. Other formats, and JPEGs still too large
+    at 1/8, are resized with INTER_AREA. Transparent images are
+    composited over white, 16-bit images are reduced to 8 bits, and
+    orientation follows the stored pixel grid like the header size does.
+    """
+    width, height = source.size
+    target = analysis_size(width, height, max_pixels)
+    alpha = has_alpha(source)
+
+    if alpha or source.mode in HIGH_DEPTH_MODES:
+        flags = cv2.IMREAD_UNCHANGED
+    else:
+        denominator = reduction_factor(width, height, max_pixels) if source.format in ("JPEG", "MPO") else 1
+        if denominator > 1:
+            flags = REDUCED_FLAGS[(grayscale, denominator)]
+        else:
+            flags = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+        flags |= cv2.IMREAD_IGNORE_ORIENTATION
+
+    pixels = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), flags)
+    if pixels is None:
+        pixels = _decode_with_pil(content, alpha)
+        if pixels is None:
+            raise ValueError(f"Cannot decode {source.format or 'unknown'} image")
+
+    pixels = _to_8bit(pixels)
+    if pixels.ndim == 3 and pixels.shape[2] == 4:
+        # Drop to the output channels first; only those get blended
+        code = cv2.COLOR_BGRA2GRAY if grayscale else cv2.COLOR_BGRA2BGR
+        pixels = _flatten_alpha(cv2.cvtColor(pixels, code), pixels[:, :, 3])
+    if grayscale and pixels.ndim == 3:
+        pixels = cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY)
+    elif not grayscale and pixels.ndim == 2:
+        pixels = cv2.cvtColor(pixels, cv2.COLOR_GRAY2BGR)
+
+    if pixels.shape[0] * pixels.shape[1] > target[0] * target[1]:
+        pixels = cv2.resize(pixels, target, interpolation=cv2.INTER_AREA)
+    return pixels
+
+
+def decode_image(content: Buffer, max_pixels: Optional[int] = 100_000_000,
+                 analysis_max_pixels: Optional[int] = 4_000_000) -> DecodedImage:
+    """
+    Decode an upload to BGR at most analysis_max_pixels.
+
+    The header is parsed first and anything over max_pixels is rejected
+    before a single pixel buffer is allocated.
+    """
+    source = read_header(content, max_pixels)
+    bgr = decode_pixels(content, source, max_pixels=analysis_max_pixels)
+    return DecodedImage(content, source, bgr, source.size, source.mode)
+
+
+def decode_gray(content: Buffer, max_pixels: Optional[int] = 100_000_000) -> np.ndarray:
+    """Decode an upload to a full-resolution gray plane, e.g. for OCR"""
+    return decode_pixels(content, read_header(content, max_pixels), grayscale=True)
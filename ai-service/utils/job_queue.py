@@ -0,0 +1,392 @@
+import asyncio
+import ipaddress
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+import httpx
+from loguru import logger
+
+JOB_STATUSES = ("queued", "running", "completed", "failed")
+
+# Handler for one job kind: (job record, uploaded content) -> JSON-serializable result
+JobHandler = Callable[[Dict[str, Any], bytes], Awaitable[Dict[str, Any]]]
+
+
+class JobStore:
+    """
+    Durable job records in SQLite.
+
+    Uploads are kept in a separate payload table until their job finishes,
+    so a queued or interrupted job can be run again after a restart.
+    Finished jobs (and their results) are kept for retention_seconds.
+    """
+
+    def __init__(self, path: Optional[str] = "temp/jobs.sqlite3", retention_seconds: float = 86400):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, filename TEXT, "
+            "params TEXT NOT NULL, result TEXT, error TEXT, webhook_url TEXT, webhook_status TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS payloads (job_id TEXT PRIMARY KEY, content BLOB NOT NULL)")
+
+    def create(self, kind: str, filename: Optional[str], params: Dict[str, Any], content: bytes,
+               webhook_url: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a new job with its upload"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute(
+                    "INSERT INTO jobs (id, kind, status, filename, params, webhook_url, created_at) "
+                    "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                    (job_id, kind, filename, json.dumps(params), webhook_url, time.time()),
+                )
+                self._db.execute("INSERT INTO payloads (job_id, content) VALUES (?, ?)", (job_id, content))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._record(row) if row else None
+
+    def payload(self, job_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute("SELECT content FROM payloads WHERE job_id = ?", (job_id,)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job running and return it"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (time.time(), row["id"]),
+            )
+            job = self._db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        return self._record(job)
+
+    def finish(self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """Store the outcome of a job and drop its upload"""
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                    (
+                        "failed" if error is not None else "completed",
+                        json.dumps(result, default=str) if result is not None else None,
+                        error,
+                        time.time(),
+                        job_id,
+                    ),
+                )
+                self._db.execute("DELETE FROM payloads WHERE job_id = ?", (job_id,))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def set_webhook_status(self, job_id: str, status: str):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET webhook_status = ? WHERE id = ?", (status, job_id))
+
+    def recover(self, max_attempts: int) -> Dict[str, int]:
+        """
+        Requeue jobs left running by a previous process.
+
+        Jobs that have already been started max_attempts times are failed
+        instead, so an upload that crashes the worker is not retried forever.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT id, attempts FROM jobs WHERE status = 'running'").fetchall()
+        requeued, failed = 0, 0
+        for row in rows:
+            if row["attempts"] >= max_attempts:
+                self.finish(row["id"], error=f"Interrupted {row['attempts']} times, giving up")
+                failed += 1
+            else:
+                with self._lock:
+                    self._db.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE id = ?", (row["id"],))
+                requeued += 1
+        return {"requeued": requeued, "failed": failed}
+
+    def purge(self) -> int:
+        """Delete finished jobs past the retention period"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND finished_at < ?", (cutoff,)
+            )
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        found = {status: count for status, count in rows}
+        return {status: found.get(status, 0) for status in JOB_STATUSES}
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class JobQueue:
+    """
+    Runs queued jobs on a fixed number of asyncio workers.
+
+    Workers take jobs from the store oldest first, dispatch them to the
+    handler registered for their kind and record the result; the heavy
+    work inside handlers already runs on the analysis executor. When a
+    job has a webhook URL, its final record is POSTed there.
+
+    Webhook URLs are checked on submission and again before every
+    delivery: a host must be on webhook_allowed_hosts (".example.com"
+    also covers its subdomains), or, when no allowlist is configured,
+    resolve only to public addresses. In that case the POST goes to the
+    address that was checked (with the original Host header and TLS
+    server name), so a DNS change between the check and the connection
+    cannot turn an accepted host internal. Redirects are not followed.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handlers: Dict[str, JobHandler],
+        workers: int = 2,
+        max_attempts: int = 3,
+        webhook_timeout_seconds: float = 10,
+        webhook_retries: int = 3,
+        webhook_allowed_hosts: Optional[Iterable[str]] = None,
+        purge_interval_seconds: float = 300,
+    ):
+        self.store = store
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.webhook_timeout_seconds = webhook_timeout_seconds
+        self.webhook_retries = webhook_retries
+        self.webhook_allowed_hosts = [host.lower() for host in webhook_allowed_hosts or []]
+        self.purge_interval_seconds = purge_interval_seconds
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.active = 0
+        self.stats = {"completed": 0, "failed": 0, "webhooks_delivered": 0, "webhooks_failed": 0, "busy_seconds": 0.0}
+
+    async def start(self):
+        """Recover interrupted jobs and start the workers"""
+        self._wakeup = asyncio.Event()
+        recovered = await asyncio.to_thread(self.store.recover, self.max_attempts)
+        purged = await asyncio.to_thread(self.store.purge)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._purge_loop()))
+        logger.info(
+            f"📬 Job queue started ({self.workers} workers, {recovered['requeued']} jobs requeued, "
+            f"{recovered['failed']} abandoned, {purged} expired)"
+        )
+        if recovered["requeued"]:
+            self._wakeup.set()
+
+    async def stop(self):
+        """Stop the workers; running jobs are requeued at the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("📬 Job queue stopped")
+
+    async def submit(self, kind: str, filename: Optional[str], params: Dict[str, Any], content: bytes,
+                     webhook_url: Optional[str] = None) -> Dict[str, Any]:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job type: {kind}")
+        job = await asyncio.to_thread(self.store.create, kind, filename, params, content, webhook_url)
+        if self._wakeup:
+            self._wakeup.set()
+        return job
+
+    async def check_webhook(self, url: str) -> Optional[str]:
+        """
+        Raise ValueError unless the service may POST results to url.
+
+        Returns the public address deliveries must connect to, or None
+        for an allowlisted host, which is trusted by name.
+        """
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        if parts.scheme not in ("http", "https") or not host:
+            raise ValueError("webhook_url must be an http(s) URL")
+
+        if self.webhook_allowed_hosts:
+            if not any(host == allowed.lstrip(".") or (allowed.startswith(".") and host.endswith(allowed))
+                       for allowed in self.webhook_allowed_hosts):
+                raise ValueError(f"webhook host {host} is not allowed")
+            return None
+
+        try:
+            addresses = await asyncio.get_running_loop().getaddrinfo(host, parts.port or (443 if parts.scheme == "https" else 80))
+        except OSError:
+            raise ValueError(f"webhook host {host} cannot be resolved")
+        for *_, sockaddr in addresses:
+            address = ipaddress.ip_address(sockaddr[0])
+            if getattr(address, "ipv4_mapped", None):
+                address = address.ipv4_mapped
+            # Loopback, private, link-local (cloud metadata) and other reserved ranges
+            if not address.is_global:
+                raise ValueError(f"webhook host {host} resolves to a non-public address")
+        if not addresses:
+            raise ValueError(f"webhook host {host} cannot be resolved")
+        return addresses[0][4][0]
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                self._wakeup.clear()
+                # Re-check after clearing, so a submit in between is not missed
+                job = await asyncio.to_thread(self.store.claim_next)
+                if job is None:
+                    await self._wakeup.wait()
+                    continue
+            self._wakeup.set()  # let an idle worker look for the next job
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Job worker {worker_id} error: {e}")
+                await asyncio.sleep(1)
+
+    async def _run(self, job: Dict[str, Any]):
+        start = time.time()
+        self.active += 1
+        logger.info(f"📬 Running {job['kind']} job {job['id']} (attempt {job['attempts']})")
+        result, error = None, None
+        try:
+            content = await asyncio.to_thread(self.store.payload, job["id"])
+            if content is None:
+                raise RuntimeError("Job upload is missing")
+            result = await self.handlers[job["kind"]](job, content)
+        except asyncio.CancelledError:
+            # Shutdown: left running, requeued by recover() on the next start
+            raise
+        except Exception as e:
+            error = str(getattr(e, "detail", None) or e)
+            logger.error(f"❌ Job {job['id']} failed: {error}")
+        finally:
+            self.active -= 1
+            self.stats["busy_seconds"] += time.time() - start
+
+        await asyncio.to_thread(self.store.finish, job["id"], result, error)
+        self.stats["failed" if error is not None else "completed"] += 1
+        if job.get("webhook_url"):
+            await self._notify(await self.get(job["id"]))
+
+    async def _notify(self, job: Dict[str, Any]):
+        """POST the finished job to its webhook, retrying with backoff"""
+        delay = 1.0
+        async with httpx.AsyncClient(timeout=self.webhook_timeout_seconds, follow_redirects=False) as client:
+            for attempt in range(1, self.webhook_retries + 1):
+                try:
+                    address = await self.check_webhook(job["webhook_url"])
+                except ValueError as e:
+                    logger.warning(f"⚠️ Webhook for job {job['id']} refused: {e}")
+                    break
+                try:
+                    response = await client.post(**self._pinned_request(job["webhook_url"], address), json=self.describe(job))
+                    if response.status_code < 400:
+                        self.stats["webhooks_delivered"] += 1
+                        await asyncio.to_thread(self.store.set_webhook_status, job["id"], "delivered")
+                        return
+                    reason = f"HTTP {response.status_code}"
+                except httpx.HTTPError as e:
+                    reason = str(e) or type(e).__name__
+                logger.warning(f"⚠️ Webhook for job {job['id']} failed (attempt {attempt}): {reason}")
+                if attempt < self.webhook_retries:
+                    await asyncio.sleep(delay)
+                    delay *= 2
+        self.stats["webhooks_failed"] += 1
+        await asyncio.to_thread(self.store.set_webhook_status, job["id"], "failed")
+
+    @staticmethod
+    def _pinned_request(url: str, address: Optional[str]) -> Dict[str, Any]:
+        """post() arguments that connect to address without resolving url's host again"""
+        if address is None:
+            return {"url": url}
+        parsed = httpx.URL(url)
+        request = {"url": parsed.copy_with(host=address), "headers": {"Host": parsed.netloc.decode("ascii")}}
+        if parsed.scheme == "https":
+            # Certificate checks and SNI still use the webhook's host name
+            request["extensions"] = {"sni_hostname": parsed.host}
+        return request
+
+    async def _purge_loop(self):
+        while True:
+            await asyncio.sleep(self.purge_interval_seconds)
+            try:
+                purged = await asyncio.to_thread(self.store.purge)
+                if purged:
+                    logger.info(f"🗑️ Removed {purged} expired jobs")
+            except Exception as e:
+                logger.warning(f"⚠️ Job purge failed: {e}")
+
+    @staticmethod
+    def describe(job: Dict[str, Any]) -> Dict[str, Any]:
+        """API view of a job record"""
+        return {
+            "jobId": job["id"],
+            "jobType": job["kind"],
+            "status": job["status"],
+            "filename": job["filename"],
+            "attempts": job["attempts"],
+            "createdAt": job["created_at"],
+            "startedAt": job["started_at"],
+            "finishedAt": job["finished_at"],
+            "result": job["result"],
+            "error": job["error"],
+            "webhookStatus": job["webhook_status"],
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        finished = self.stats["completed"] + self.stats["failed"]
+        return {
+            "workers": self.workers,
+            "active": self.active,
+            "jobs": self.store.counts(),
+            **{k: v for k, v in self.stats.items() if k != "busy_seconds"},
+            "avg_job_seconds": self.stats["busy_seconds"] / finished if finished else 0.0,
+            "retention_seconds": self.store.retention_seconds,
+        }
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from loguru import logger
+
+# A vocabulary is either a flat list of terms or a mapping of label -> terms
+Vocabulary = Union[List[str], Dict[str, List[str]]]
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed vocabulary.
+
+    Built once, it finds every occurrence of every term in a single pass
+    over the text, so scan cost no longer grows with the vocabulary size.
+    Matching is case-insensitive substring matching, the same semantics as
+    `keyword in text.lower()`.
+    """
+
+    def __init__(self, vocabulary: Vocabulary):
+        if isinstance(vocabulary, dict):
+            labelled = [(term, label) for label, terms in vocabulary.items() for term in terms]
+        else:
+            labelled = [(term, term) for term in vocabulary]
+
+        # Trie: per-state transition dicts, failure links and output terms
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        self.labels: Dict[str, List[str]] = {}
+
+        for term, label in labelled:
+            term = term.lower()
+            if not term:
+                continue
+            self.labels.setdefault(term, [])
+            if label not in self.labels[term]:
+                self.labels[term].append(label)
+            self._insert(term)
+
+        self._build_failure_links()
+
+    def _insert(self, term: str):
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        if term not in self._out[state]:
+            self._out[state].append(term)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def find_all(self, text: str) -> List[Tuple[int, str]]:
+        """Every (start_position, term) occurrence, in order of where each match ends"""
+        hits = []
+        if not self.labels:
+            return hits
+
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for position, char in enumerate(text.lower()):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for term in out[state]:
+                hits.append((position - len(term) + 1, term))
+        return hits
+
+    def matched_terms(self, text: str) -> List[str]:
+        """Distinct terms present in the text, in order of first occurrence"""
+        return list(dict.fromkeys(term for _, term in self.find_all(text)))
+
+    def matched_labels(self, text: str) -> List[str]:
+        """Distinct labels with at least one term present in the text"""
+        return list(dict.fromkeys(
+            label for term in self.matched_terms(text) for label in self.labels[term]
+        ))
+
+
+class VocabularyRegistry:
+    """
+    Named vocabularies with compiled matchers and hot reload.
+
+    Services register their built-in vocabularies; an optional JSON file of
+    the same shape (`{"fraud_keywords": [...], "document_elements:invoice":
+    {"header": [...]}}`) extends them. The file's mtime is checked at most
+    every check_interval_seconds and matchers are rebuilt lazily after a
+    change, so the lexicon can grow without restarting the service.
+    """
+
+    def __init__(self, path: Optional[str] = None, check_interval_seconds: float = 5.0):
+        self.path = path
+        self.check_interval_seconds = check_interval_seconds
+
+        self._defaults: Dict[str, Vocabulary] = {}
+        self._overrides: Dict[str, Vocabulary] = {}
+        self._matchers: Dict[str, KeywordMatcher] = {}
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+
+        self.version = 0
+        self.fingerprint = "default"
+        self.reloads = 0
+        self.reload_errors = 0
+
+        if path:
+            self.reload(force=True)
+
+    def register(self, name: str, vocabulary: Vocabulary):
+        """Register a built-in vocabulary (file entries are merged on top)"""
+        with self._lock:
+            self._defaults[name] = vocabulary
+            self._matchers.pop(name, None)
+
+    def terms(self, name: str) -> Vocabulary:
+        """Effective vocabulary: built-in terms plus any configured additions"""
+        self.refresh()
+        with self._lock:
+            return self._merged(name)
+
+    def matcher(self, name: str) -> KeywordMatcher:
+        """Compiled matcher for a vocabulary, rebuilt only after it changes"""
+        self.refresh()
+        with self._lock:
+            matcher = self._matchers.get(name)
+            if matcher is None:
+                matcher = KeywordMatcher(self._merged(name))
+                self._matchers[name] = matcher
+            return matcher
+
+    def _merged(self, name: str) -> Vocabulary:
+        default = self._defaults.get(name, [])
+        extra = self._overrides.get(name)
+        if extra is None:
+            return default
+
+        if isinstance(default, dict):
+            # Labelled vocabularies only accept labelled additions
+            merged = {label: list(terms) for label, terms in default.items()}
+            if isinstance(extra, dict):
+                for label, terms in extra.items():
+                    merged[label] = _dedupe(merged.get(label, []) + list(terms))
+            return merged
+        if isinstance(extra, dict):
+            return default
+
+        return _dedupe(list(default) + list(extra))
+
+    def refresh(self):
+        """Reload the vocabulary file if it is due for a check and has changed"""
+        if not self.path:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval_seconds:
+            return
+        self.reload()
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read the vocabulary file if it changed; returns True on reload"""
+        self._last_check = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+
+        if not force and mtime == self._mtime:
+            return False
+
+        overrides: Dict[str, Any] = {}
+        raw = b""
+        if mtime is not None:
+            try:
+                with open(self.path, "rb") as f:
+                    raw = f.read()
+                overrides = json.loads(raw)
+                if not isinstance(overrides, dict):
+                    raise ValueError("vocabulary file must contain a JSON object")
+            except Exception as e:
+                self.reload_errors += 1
+                self._mtime = mtime
+                logger.warning(f"⚠️ Keeping previous vocabularies, failed to load {self.path}: {e}")
+                return False
+
+        with self._lock:
+            self._overrides = overrides
+            self._matchers.clear()
+            self._mtime = mtime
+            self.version += 1
+            self.fingerprint = hashlib.sha256(raw).hexdigest()[:12] if raw else "default"
+        self.reloads += 1
+
+        if mtime is not None:
+            logger.info(f"📚 Loaded vocabularies from {self.path} ({len(overrides)} entries)")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Registered vocabularies, term counts and reload counters"""
+        with self._lock:
+            names = sorted(set(self._defaults) | set(self._overrides))
+            sizes = {}
+            for name in names:
+                merged = self._merged(name)
+                sizes[name] = sum(len(terms) for terms in merged.values()) if isinstance(merged, dict) else len(merged)
+            return {
+                "path": self.path,
+                "version": self.version,
+                "fingerprint": self.fingerprint,
+                "reloads": self.reloads,
+                "reload_errors": self.reload_errors,
+                "compiled": len(self._matchers),
+                "vocabularies": sizes,
+            }
+
+
+def _dedupe(terms: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(terms))
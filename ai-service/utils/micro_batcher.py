@@ -0,0 +1,121 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.executor import AnalysisExecutor
+
+
+class MicroBatcher:
+    """
+    Collects single-item calls into batches for a batched kernel.
+
+    Items submitted from any request wait at most max_wait_seconds (or
+    until max_batch_size are queued) and then run together through
+    run_batch(items) -> results on the thread pool; each caller gets its
+    own result back. While max_concurrent batches are running new items
+    keep queueing, so under load batches fill up on their own. A batch is
+    built around the oldest item and only takes items compatible(oldest,
+    item) with it. Callers that are cancelled while queued drop out before
+    their batch starts. State is only touched from the event loop thread.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        executor: AnalysisExecutor,
+        max_batch_size: int = 4,
+        max_wait_seconds: float = 0.01,
+        max_concurrent: int = 1,
+        compatible: Optional[Callable[[Any, Any], bool]] = None,
+    ):
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max(0.0, max_wait_seconds)
+        self.max_concurrent = max(1, max_concurrent)
+        self.compatible = compatible
+        self._pending: List[Tuple[Any, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = 0
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.wait_seconds = 0.0
+        self.cancelled = 0
+
+    async def submit(self, item: Any) -> Any:
+        """Run one item as part of the next batch it fits in"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future, time.monotonic()))
+        self._dispatch()
+        return await future
+
+    def _dispatch(self):
+        # Callers cancelled while waiting never reach a kernel
+        before = len(self._pending)
+        self._pending = [entry for entry in self._pending if not entry[1].done()]
+        self.cancelled += before - len(self._pending)
+
+        while self._pending and self._running < self.max_concurrent:
+            batch = self._take_batch(force=time.monotonic() - self._pending[0][2] >= self.max_wait_seconds)
+            if not batch:
+                break
+            self._running += 1
+            asyncio.ensure_future(self._run(batch))
+
+        if self._pending and self._timer is None and self._running < self.max_concurrent:
+            delay = max(0.0, self._pending[0][2] + self.max_wait_seconds - time.monotonic())
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _take_batch(self, force: bool) -> List[Tuple[Any, asyncio.Future, float]]:
+        """Oldest item plus compatible followers; empty while a partial batch may still wait"""
+        oldest = self._pending[0]
+        batch = [oldest] + [
+            entry for entry in self._pending[1:]
+            if self.compatible is None or self.compatible(oldest[0], entry[0])
+        ][:self.max_batch_size - 1]
+        if len(batch) < self.max_batch_size and not force:
+            return []
+        taken = {id(entry) for entry in batch}
+        self._pending = [entry for entry in self._pending if id(entry) not in taken]
+        return batch
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future, float]]):
+        started = time.monotonic()
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.wait_seconds += sum(started - enqueued for _, _, enqueued in batch)
+        try:
+            results = await self.executor.run_thread(self.run_batch, [item for item, _, _ in batch])
+            # A short result list would otherwise leave callers waiting forever
+            if len(results) != len(batch):
+                raise RuntimeError(f"run_batch returned {len(results)} results for {len(batch)} items")
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._running -= 1
+            self._dispatch()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_seconds * 1000,
+            "pending": len(self._pending),
+            "running": self._running,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "avg_wait_ms": self.wait_seconds / self.items * 1000 if self.items else 0.0,
+            "cancelled": self.cancelled,
+        }
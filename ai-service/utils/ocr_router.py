@@ -0,0 +1,157 @@
+import math
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+
+# Pixels the quality probe looks at; enough for stable sharpness/contrast buckets
+QUALITY_SAMPLE_PIXELS = 1_000_000
+# Weight of the newest run in the moving averages
+EWMA_ALPHA = 0.1
+
+
+def image_quality(gray: np.ndarray) -> str:
+    """Coarse quality bucket of a gray page: poor, fair or good"""
+    step = max(1, int(math.sqrt(gray.size / QUALITY_SAMPLE_PIXELS)))
+    sample = gray[::step, ::step]
+    sharpness = float(cv2.Laplacian(sample, cv2.CV_64F).var())
+    contrast = float(sample.std())
+    if sharpness < 50 or contrast < 25:
+        return "poor"
+    if sharpness > 300 and contrast > 50:
+        return "good"
+    return "fair"
+
+
+class _EngineStats:
+    """Outcomes of one engine on one route, only mutated from the event loop thread"""
+
+    def __init__(self):
+        self.runs = 0
+        self.accepted = 0
+        self.race_wins = 0
+        self.avg_latency = 0.0
+        self.avg_confidence = 0.0
+
+    def record(self, accepted: bool, confidence: float, latency: float):
+        self.runs += 1
+        self.accepted += int(accepted)
+        alpha = 1.0 if self.runs == 1 else EWMA_ALPHA
+        self.avg_latency += alpha * (latency - self.avg_latency)
+        self.avg_confidence += alpha * (confidence - self.avg_confidence)
+
+    @property
+    def success_rate(self) -> float:
+        """Share of runs good enough to skip the other engine (Laplace-smoothed)"""
+        return (self.accepted + 1) / (self.runs + 2)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "accepted": self.accepted,
+            "success_rate": self.success_rate,
+            "race_wins": self.race_wins,
+            "avg_latency_seconds": self.avg_latency,
+            "avg_confidence": self.avg_confidence,
+        }
+
+
+class OCREngineRouter:
+    """
+    Picks the OCR engine to try first for a page.
+
+    Outcomes are tracked per route, a (document type, image quality) pair:
+    how often each engine's result was confident enough to stand alone,
+    and how long it took. Once both engines have min_samples runs on a
+    route, the engine with the lowest expected latency goes first, counting
+    the fallback run its failures cost; the other engine only runs when the
+    first is not confident, so accuracy matches the old always-fallback
+    order. Cold routes alternate the first engine so both are measured on
+    the same pages, and every explore_every-th decision tries the runner-up
+    first to notice drift. With race enabled, routes where the first engine
+    fails often run both engines at once and keep the first confident one.
+    """
+
+    def __init__(self, accept_confidence: float = 0.5, min_samples: int = 10,
+                 explore_every: int = 20, race: bool = False, race_below: float = 0.8):
+        self.accept_confidence = accept_confidence
+        self.min_samples = max(1, min_samples)
+        self.explore_every = max(0, explore_every)
+        self.race = race
+        self.race_below = race_below
+        self._routes: Dict[Tuple[str, str], Dict[str, _EngineStats]] = defaultdict(lambda: defaultdict(_EngineStats))
+        self._decisions: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.strategies: Dict[str, int] = defaultdict(int)
+        self.fallbacks = 0
+        self.cancelled = 0
+
+    def accepts(self, result: Dict[str, Any]) -> bool:
+        return "error" not in result and result.get("confidence", 0.0) > self.accept_confidence
+
+    def expected_latency(self, route: Tuple[str, str], first: str, second: str) -> float:
+        stats = self._routes[route]
+        return stats[first].avg_latency + (1 - stats[first].success_rate) * stats[second].avg_latency
+
+    def plan(self, document_type: str, quality: str, available: List[str]) -> Tuple[str, List[str]]:
+        """(strategy, engines in the order to run them) for one page"""
+        if len(available) < 2:
+            self.strategies["single"] += 1
+            return "single", list(available)
+
+        route = (document_type, quality)
+        decision = self._decisions[route]
+        self._decisions[route] += 1
+        stats = self._routes[route]
+
+        if any(stats[engine].runs < self.min_samples for engine in available):
+            # Cold route: alternate which engine goes first
+            first = available[decision % len(available)]
+            strategy = "race" if self.race else "explore"
+        else:
+            first = min(
+                available,
+                key=lambda engine: self.expected_latency(route, engine, next(e for e in available if e != engine)),
+            )
+            strategy = "fallback"
+            if self.race and stats[first].success_rate < self.race_below:
+                strategy = "race"
+            elif self.explore_every and decision % self.explore_every == self.explore_every - 1:
+                first = next(engine for engine in available if engine != first)
+                strategy = "explore"
+
+        self.strategies[strategy] += 1
+        return strategy, [first] + [engine for engine in available if engine != first]
+
+    def record(self, document_type: str, quality: str, engine: str, result: Dict[str, Any], latency: float):
+        self._routes[(document_type, quality)][engine].record(
+            self.accepts(result), float(result.get("confidence", 0.0)), latency
+        )
+
+    def record_race_win(self, document_type: str, quality: str, engine: str):
+        self._routes[(document_type, quality)][engine].race_wins += 1
+
+    def preferred(self, document_type: str, quality: str) -> Optional[str]:
+        """Engine the route currently sends first, None while it is still cold"""
+        stats = self._routes.get((document_type, quality))
+        if not stats or len(stats) < 2 or any(s.runs < self.min_samples for s in stats.values()):
+            return None
+        engines = list(stats)
+        return min(engines, key=lambda engine: self.expected_latency(
+            (document_type, quality), engine, next(e for e in engines if e != engine)
+        ))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "race": self.race,
+            "accept_confidence": self.accept_confidence,
+            "strategies": dict(self.strategies),
+            "fallbacks": self.fallbacks,
+            "cancelled": self.cancelled,
+            "routes": {
+                f"{document_type}/{quality}": {
+                    "preferred": self.preferred(document_type, quality),
+                    "engines": {engine: s.as_dict() for engine, s in stats.items()},
+                }
+                for (document_type, quality), stats in self._routes.items()
+            },
+        }
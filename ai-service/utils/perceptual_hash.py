@@ -0,0 +1,63 @@
+from typing import Dict, Tuple
+import cv2
+import numpy as np
+from PIL import Image
+
+HASH_KINDS = ("phash", "dhash", "ahash")
+
+
+def thumbnail(gray: np.ndarray, size: Tuple[int, int], oversample: int = 8) -> np.ndarray:
+    """
+    (width, height) Lanczos thumbnail of a gray plane.
+
+    The plane is first strided down to about size*oversample pixels per
+    side, so the filter runs over a few thousand samples instead of every
+    pixel; at 8x oversampling the hash bits stay within a couple of
+    Hamming units of imagehash on the full image.
+    """
+    h, w = gray.shape[:2]
+    step = max(1, min(h // (size[1] * oversample), w // (size[0] * oversample)))
+    sample = Image.fromarray(np.ascontiguousarray(gray[::step, ::step]))
+    return np.asarray(sample.resize(size, Image.LANCZOS))
+
+
+def bits_to_int(bits: np.ndarray) -> int:
+    """Row-major boolean array to an integer, first bit most significant (imagehash's hex order)"""
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def average_hash(gray: np.ndarray, hash_size: int = 8) -> int:
+    """aHash: thumbnail pixels brighter than their mean"""
+    pixels = thumbnail(gray, (hash_size, hash_size)).astype(np.float64)
+    return bits_to_int(pixels > pixels.mean())
+
+
+def difference_hash(gray: np.ndarray, hash_size: int = 8) -> int:
+    """dHash: horizontal gradient signs of a (hash_size+1) x hash_size thumbnail"""
+    pixels = thumbnail(gray, (hash_size + 1, hash_size)).astype(np.int16)
+    return bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def perceptual_hash(gray: np.ndarray, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """pHash: low-frequency DCT coefficients of a 32x32 thumbnail above their median"""
+    size = hash_size * highfreq_factor
+    pixels = thumbnail(gray, (size, size), oversample=2).astype(np.float32)
+    low = cv2.dct(pixels)[:hash_size, :hash_size]
+    return bits_to_int(low > np.median(low))
+
+
+def compute_hashes(gray: np.ndarray) -> Dict[str, int]:
+    """All 64-bit hashes in HASH_KINDS for one gray plane"""
+    return {
+        "phash": perceptual_hash(gray),
+        "dhash": difference_hash(gray),
+        "ahash": average_hash(gray),
+    }
+
+
+def to_hex(value: int) -> str:
+    return format(value, "016x")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
@@ -0,0 +1,242 @@
+import os
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from loguru import logger
+
+# One core per engine, the pool provides the parallelism; read when the
+# library loads. tesserocr is imported here because it installs signal
+# handlers, which only works from the main thread.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+try:
+    import tesserocr
+except ImportError:  # Optional: without it Tesseract runs through pytesseract
+    tesserocr = None
+
+# image_to_data row levels
+WORD_LEVEL = 5
+# Words below this confidence (0-100) are left out of the bounding boxes
+BOX_MIN_CONFIDENCE = 30
+# GetTSVText columns, the same as image_to_data minus the header row
+TSV_COLUMNS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+               "left", "top", "width", "height", "conf", "text")
+# Where distributions install the language data
+TESSDATA_DIRS = (
+    "/usr/share/tesseract-ocr/5/tessdata",
+    "/usr/share/tesseract-ocr/4.00/tessdata",
+    "/usr/share/tessdata",
+    "/usr/local/share/tessdata",
+    "/opt/homebrew/share/tessdata",
+)
+DEFAULT_PSM = 3  # Tesseract's own default: fully automatic page segmentation
+
+
+def parse_tesseract_data(data: Dict[str, List[Any]]) -> Dict[str, Any]:
+    """
+    Text, mean confidence and word boxes from one image_to_data result.
+
+    The text is rebuilt from the TSV layout the way image_to_string prints
+    it: words of a line joined by spaces, lines by newlines, and a blank
+    line between paragraphs and blocks. A second Tesseract run for the
+    plain text is therefore not needed.
+    """
+    paragraphs: List[List[str]] = []
+    line: List[str] = []
+    line_key, paragraph_key = None, None
+    confidences: List[float] = []
+    bounding_boxes: List[Dict[str, Any]] = []
+
+    for i, level in enumerate(data["level"]):
+        word = str(data["text"][i]).strip()
+        if int(level) != WORD_LEVEL or not word:
+            continue
+        confidence = float(data["conf"][i])
+
+        key = (data["page_num"][i], data["block_num"][i], data["par_num"][i])
+        if key != paragraph_key:
+            if line:
+                paragraphs[-1].append(" ".join(line))
+            paragraphs.append([])
+            line, paragraph_key, line_key = [], key, None
+        if data["line_num"][i] != line_key:
+            if line:
+                paragraphs[-1].append(" ".join(line))
+            line, line_key = [], data["line_num"][i]
+        line.append(word)
+
+        if confidence > 0:
+            confidences.append(confidence)
+        if confidence > BOX_MIN_CONFIDENCE:
+            bounding_boxes.append({
+                "text": word,
+                "confidence": confidence / 100,
+                "bbox": [data["left"][i], data["top"][i], data["width"][i], data["height"][i]],
+            })
+
+    if line:
+        paragraphs[-1].append(" ".join(line))
+
+    return {
+        "text": "\n\n".join("\n".join(lines) for lines in paragraphs),
+        "confidence": sum(confidences) / len(confidences) / 100 if confidences else 0,
+        "bounding_boxes": bounding_boxes,
+    }
+
+
+def parse_tsv(tsv: str) -> Dict[str, List[Any]]:
+    """GetTSVText output in the layout of pytesseract's image_to_data dict"""
+    data: Dict[str, List[Any]] = {column: [] for column in TSV_COLUMNS}
+    for row in tsv.splitlines():
+        fields = row.split("\t")
+        if len(fields) < len(TSV_COLUMNS) - 1:
+            continue
+        fields += [""] * (len(TSV_COLUMNS) - len(fields))
+        for column, value in zip(TSV_COLUMNS, fields):
+            if column == "text":
+                data[column].append(value)
+            elif column == "conf":
+                data[column].append(float(value))
+            else:
+                data[column].append(int(value))
+    return data
+
+
+def parse_psm(config: str) -> int:
+    """Page segmentation mode of a pytesseract config string"""
+    psm = re.search(r"--psm\s+(\d+)", config or "")
+    return int(psm.group(1)) if psm else DEFAULT_PSM
+
+
+def find_tessdata(lang: str) -> Optional[str]:
+    """First known tessdata directory holding the language's model"""
+    candidates = [os.environ.get("TESSDATA_PREFIX")] + list(TESSDATA_DIRS)
+    for directory in candidates:
+        if directory and os.path.isfile(os.path.join(directory, f"{lang}.traineddata")):
+            return directory
+    return None
+
+
+class TesseractPool:
+    """
+    Long-lived Tesseract engines in this process.
+
+    pytesseract starts a tesseract process per call, hands it the page as
+    a temp PNG and reloads the language model every time. Here each worker
+    is a tesserocr engine initialized once; pages are passed as raw gray
+    bytes in memory and results come back as TSV, so a page costs only its
+    recognition. Engines are not thread-safe, so each call checks one out
+    of an idle queue for its duration; tesserocr releases the GIL while
+    recognizing, so workers run in parallel on the shared thread pool.
+    Without tesserocr or language data the pool stays unavailable and
+    callers fall back to pytesseract.
+    """
+
+    def __init__(self, workers: int = 2, lang: str = "eng", tessdata_path: Optional[str] = None):
+        self.workers = max(1, workers)
+        self.lang = lang
+        self.tessdata_path = tessdata_path
+        self._engines: List[Any] = []
+        self._idle: "queue.Queue[Any]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.busy = 0
+        self.waiting = 0
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def start(self) -> bool:
+        """Load one engine per worker; False when tesserocr or the language data is missing"""
+        if tesserocr is None:
+            logger.info("📖 tesserocr not installed, Tesseract runs as one process per page")
+            return False
+
+        path = self.tessdata_path or find_tessdata(self.lang)
+        try:
+            for _ in range(self.workers):
+                engine = tesserocr.PyTessBaseAPI(path=path, lang=self.lang) if path else tesserocr.PyTessBaseAPI(lang=self.lang)
+                self._engines.append(engine)
+                self._idle.put(engine)
+        except RuntimeError as e:
+            logger.warning(f"⚠️ Tesseract engines could not be loaded: {e}")
+            self.close()
+            return False
+
+        logger.info(f"📖 {self.workers} Tesseract engines loaded ({self.lang}, {path or 'default tessdata'})")
+        return True
+
+    @property
+    def available(self) -> bool:
+        return bool(self._engines)
+
+    def recognize(self, image: np.ndarray, config: str = "", timeout: Optional[float] = None) -> Dict[str, List[Any]]:
+        """image_to_data for a gray page on the next free engine; TimeoutError once timeout seconds pass"""
+        start = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        try:
+            engine = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self.waiting -= 1
+                self.timeouts += 1
+            raise TimeoutError("No Tesseract engine became free in time")
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.waiting -= 1
+            self.busy += 1
+            self.wait_seconds += waited
+        failed = False
+        try:
+            # Only the segmentation mode is taken from the config: variables
+            # set on an engine would leak into every later page it reads
+            engine.SetPageSegMode(parse_psm(config))
+
+            pixels = np.ascontiguousarray(image if image.ndim == 2 else image[:, :, 0], dtype=np.uint8)
+            height, width = pixels.shape
+            engine.SetImageBytes(pixels.tobytes(), width, height, 1, width)
+
+            # Tesseract treats a timeout of 0 as unlimited
+            budget_ms = 0 if timeout is None else max(1, int((timeout - waited) * 1000))
+            if not engine.Recognize(timeout=budget_ms):
+                if budget_ms and (time.perf_counter() - start - waited) * 1000 >= budget_ms:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise TimeoutError("Tesseract recognition timed out")
+                raise RuntimeError("Tesseract recognition failed")
+            return parse_tsv(engine.GetTSVText(0))
+        except Exception:
+            failed = True
+            raise
+        finally:
+            engine.Clear()
+            self._idle.put(engine)
+            with self._lock:
+                self.busy -= 1
+                self.calls += 1
+                self.failures += int(failed)
+                self.busy_seconds += time.perf_counter() - start - waited
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "tesserocr" if self.available else "pytesseract",
+                "workers": len(self._engines),
+                "busy": self.busy,
+                "waiting": self.waiting,
+                "calls": self.calls,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "avg_recognize_seconds": self.busy_seconds / self.calls if self.calls else 0.0,
+                "avg_wait_seconds": self.wait_seconds / self.calls if self.calls else 0.0,
+            }
+
+    def close(self):
+        engines, self._engines = self._engines, []
+        for engine in engines:
+            engine.End()
@@ -0,0 +1,208 @@
+import hashlib
+import io
+import json
+import mmap
+import tempfile
+import time
+from typing import Dict, Optional, Union
+from fastapi import HTTPException, UploadFile
+
+# What the decoders accept: upload bytes, or a read-only map of a spilled upload
+Buffer = Union[bytes, mmap.mmap]
+
+
+class UploadTooLargeError(ValueError):
+    """Upload crossed the configured size limit while it was being read"""
+
+
+class _BufferReader(io.RawIOBase):
+    """Seekable read-only file over a buffer, reading straight out of it"""
+
+    def __init__(self, buffer: Buffer):
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        count = max(0, min(len(target), len(self._view) - self._position))
+        target[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        self._view.release()
+        super().close()
+
+
+def open_buffer(buffer: Buffer) -> io.BufferedReader:
+    """File object over upload content; unlike io.BytesIO it never copies a mapped upload"""
+    return io.BufferedReader(_BufferReader(buffer))
+
+
+class SpooledUpload:
+    """
+    An upload read in chunks and hashed on the fly.
+
+    Small uploads stay in memory. Past spool_max_bytes the content goes to
+    a temp file instead and `content` is a read-only mmap of it, so pages
+    are loaded on demand and belong to the page cache, not the request.
+    `path` gives file-based consumers (pdf2image) the spooled file directly.
+    """
+
+    def __init__(self, filename: Optional[str], content_type: Optional[str] = None,
+                 spool_max_bytes: int = 4 * 1024 * 1024, spool_dir: Optional[str] = None):
+        self.filename = filename or ""
+        self.content_type = content_type
+        self.spool_max_bytes = spool_max_bytes
+        self.spool_dir = spool_dir
+        self.size = 0
+        self.digest: Optional[str] = None
+        self._hash = hashlib.sha256()
+        self._memory: Optional[bytearray] = bytearray()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+
+    @classmethod
+    def from_bytes(cls, content: bytes, filename: Optional[str], content_type: Optional[str] = None) -> "SpooledUpload":
+        """Wrap content that is already in memory (e.g. a queued job's payload)"""
+        upload = cls(filename, content_type, spool_max_bytes=len(content) + 1)
+        upload.write(content)
+        upload.finish()
+        return upload
+
+    def write(self, chunk: bytes):
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        if self._file is None and self.size > self.spool_max_bytes:
+            self._file = tempfile.NamedTemporaryFile(prefix="upload-", dir=self.spool_dir)
+            self._file.write(self._memory)
+            self._memory = None
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._memory += chunk
+
+    def finish(self):
+        self.digest = self._hash.hexdigest()
+        if self._file is not None:
+            self._file.flush()
+        else:
+            self._memory = bytes(self._memory)
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    @property
+    def content(self) -> Buffer:
+        """The upload as a buffer: bytes in memory, or an mmap of the spooled file"""
+        if self._file is None:
+            return self._memory
+        if self._map is None:
+            if self.size == 0:
+                return b""
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    @property
+    def path(self) -> str:
+        """Path of the content on disk, spilling an in-memory upload on first use"""
+        if self._file is None:
+            self._file = tempfile.NamedTemporaryFile(prefix="upload-", dir=self.spool_dir)
+            self._file.write(self._memory)
+            self._file.flush()
+            self._memory = None
+        return self._file.name
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Still referenced by a decoder; released with it
+                pass
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._memory = None
+
+
+async def read_upload(file: UploadFile, max_bytes: int, spool_max_bytes: int = 4 * 1024 * 1024,
+                      chunk_size: int = 1024 * 1024, spool_dir: Optional[str] = None) -> SpooledUpload:
+    """Read an upload chunk by chunk, hashing as it goes and stopping at the first byte over max_bytes"""
+    upload = SpooledUpload(file.filename, file.content_type, spool_max_bytes, spool_dir)
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            if upload.size + len(chunk) > max_bytes:
+                raise UploadTooLargeError(f"File too large (limit {max_bytes / (1024 * 1024):g}MB)")
+            upload.write(chunk)
+    except BaseException:
+        upload.close()
+        raise
+    upload.finish()
+    return upload
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Rejects request bodies over a byte limit before they are parsed.
+
+    A declared Content-Length over the limit is answered with 413 at once;
+    bodies without one are counted as they stream in. Without this the
+    multipart parser would spool the whole body before any endpoint runs.
+    """
+
+    def __init__(self, app, max_bytes: int, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        limit = self.path_limits.get(scope.get("path"), self.max_bytes)
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            return await self._reject(send, limit)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        return await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    async def _reject(send, limit: int):
+        body = json.dumps({"error": f"Request body too large (limit {limit / (1024 * 1024):g}MB)", "timestamp": time.time()}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})